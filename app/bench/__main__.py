@@ -0,0 +1,124 @@
+"""Нагрузочные замеры сервиса
+
+Запуск из корня репозитория(база данных из app/src/config/.env):
+    python -m app.bench seed --links 100000 --clicks 1000000
+    python -m app.bench run --requests 2000 --concurrency 20 --out before.json
+    python -m app.bench compare before.json after.json --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from tortoise import Tortoise
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def seed(args: argparse.Namespace):
+    from app.bench.seed import seed_clicks, seed_links
+    from app.src.config.load_env import load_environment, validate_environment
+    from app.src.db import migrate, tortoise_config
+
+    load_environment()
+    validate_environment()
+    await Tortoise.init(config=tortoise_config())
+    await migrate()
+    try:
+        link_ids = await seed_links(args.links, inactive_ratio=args.inactive_ratio)
+        print(f"links:  {len(link_ids)}")
+        await seed_clicks(link_ids, args.clicks, skew=args.skew)
+        print(f"clicks: {args.clicks}")
+    finally:
+        await Tortoise.close_connections()
+
+
+async def run(args: argparse.Namespace):
+    from app.bench.runner import run as run_scenarios
+    from app.src.server import create_app
+
+    results = await run_scenarios(
+        create_app(),
+        requests=args.requests,
+        concurrency=args.concurrency,
+        size=args.size,
+        hot_links=args.hot_links,
+        only=args.only,
+    )
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(
+        json.dumps(
+            {
+                "meta": {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "commit": _git_commit(),
+                    "python": platform.python_version(),
+                    "args": {k: v for k, v in vars(args).items() if k != "func"},
+                },
+                "scenarios": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"saved: {out}")
+
+
+def compare(args: argparse.Namespace):
+    from app.bench.runner import compare as compare_results
+
+    baseline = json.loads(Path(args.baseline).read_text())["scenarios"]
+    current = json.loads(Path(args.current).read_text())["scenarios"]
+    regressions = compare_results(baseline, current, threshold=args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("no regressions")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description=__doc__)
+    commands = parser.add_subparsers(required=True)
+
+    seed_parser = commands.add_parser("seed", help="наполнить базу данных")
+    seed_parser.add_argument("--links", type=int, default=100_000)
+    seed_parser.add_argument("--clicks", type=int, default=1_000_000)
+    seed_parser.add_argument("--inactive-ratio", type=float, default=0.1)
+    seed_parser.add_argument("--skew", type=float, default=3.0, help="перекос популярности ссылок")
+    seed_parser.set_defaults(func=lambda args: asyncio.run(seed(args)))
+
+    run_parser = commands.add_parser("run", help="запустить сценарии")
+    run_parser.add_argument("--requests", type=int, default=2_000)
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--size", type=int, default=30, help="размер страницы списков")
+    run_parser.add_argument("--hot-links", type=int, default=1_000)
+    run_parser.add_argument("--only", nargs="*", help="имена сценариев")
+    run_parser.add_argument("--out", help="файл результатов(JSON)")
+    run_parser.set_defaults(func=lambda args: asyncio.run(run(args)))
+
+    compare_parser = commands.add_parser("compare", help="сравнить два запуска")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
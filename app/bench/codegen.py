@@ -0,0 +1,79 @@
+"""Замер скорости генерации коротких ссылок(ссылок в секунду)
+
+Запуск из корня репозитория:
+    python -m app.bench.codegen --links 20000 --concurrency 50
+
+Без --db замеряется только генерация кодов, с --db - полное создание ссылок
+через services.generate_url в базе данных из .env. Режим sequence ставит шаг
+последовательности кодов равным --block-size(CODE_BLOCK_SIZE вернёт python -m app.migrate)
+"""
+
+import argparse
+import asyncio
+import time
+
+from tortoise import Tortoise
+
+from app.src.codegen import configure_code_generator
+from app.src.db import prepare_code_sequence
+
+
+async def bench_codes(mode: str, links: int, block_size: int) -> float:
+    generator = configure_code_generator(mode=mode, block_size=block_size, secret="bench")  # type: ignore
+    if mode == "sequence":
+        await prepare_code_sequence(block_size)
+        await generator.prepare()
+
+    start = time.perf_counter()
+    for _ in range(links // block_size):
+        await generator.allocate(block_size)
+    await generator.allocate(links % block_size)
+
+    return links / (time.perf_counter() - start)
+
+
+async def bench_links(mode: str, links: int, concurrency: int, block_size: int) -> float:
+    from app.src.services import generate_url
+
+    generator = configure_code_generator(mode=mode, block_size=block_size, secret="bench")  # type: ignore
+    if mode == "sequence":
+        await prepare_code_sequence(block_size)
+    await generator.prepare()
+    counter = iter(range(links))
+
+    async def worker():
+        for i in counter:
+            await generate_url(f"https://bench.example.com/{mode}/{i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return links / (time.perf_counter() - start)
+
+
+async def main(args: argparse.Namespace):
+    from app.src.config.load_env import load_environment
+    from app.src.db import migrate, tortoise_config
+
+    load_environment()
+    await Tortoise.init(config=tortoise_config())
+    await migrate()
+
+    try:
+        for mode in ("random", "sequence"):
+            rate = await bench_codes(mode, args.links, args.block_size)
+            print(f"{mode:>8} codes: {rate:12,.0f} links/s")
+            if args.db:
+                rate = await bench_links(mode, args.links, args.concurrency, args.block_size)
+                print(f"{mode:>8} links: {rate:12,.0f} links/s")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--block-size", type=int, default=1000)
+    parser.add_argument("--db", action="store_true", help="создавать ссылки в базе данных")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,172 @@
+"""Проверка планов горячих запросов: ни один не должен читать таблицу целиком
+
+Запуск из корня репозитория на наполненной базе(python -m app.bench seed):
+    python -m app.bench.plans
+
+Планы строятся с enable_seqscan = off: Seq Scan остаётся в плане, только если
+подходящего индекса нет, поэтому результат не зависит от размера таблиц.
+Код возврата 1, если в плане хотя бы одного запроса есть Seq Scan.
+"""
+
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+from tortoise import Tortoise, connections
+from tortoise.transactions import in_transaction
+
+from app.src.db.models import URLInfo
+
+
+def _nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+async def explain(
+    sql: str, params: List[Any] | None = None, using_db: Any = None
+) -> List[Tuple[str, str]]:
+    """План запроса без выполнения
+
+    Args:
+        sql (str): запрос
+        params (List[Any] | None, optional): параметры запроса($1, $2, ...). Defaults to None.
+        using_db (Any, optional): соединение(транзакция), по умолчанию основная база. Defaults to None.
+
+    Returns:
+        List[Tuple[str, str]]: узлы плана (тип узла, таблица или индекс)
+    """
+    conn = using_db or connections.get("default")
+    _, rows = await conn.execute_query(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    plan = rows[0]["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return [
+        (node["Node Type"], node.get("Index Name") or node.get("Relation Name") or "")
+        for node in _nodes(plan[0]["Plan"])
+    ]
+
+
+async def hot_queries() -> Dict[str, Tuple[str, List[Any] | None]]:
+    """Горячие запросы сервиса с параметрами из базы данных
+
+    Returns:
+        Dict[str, Tuple[str, List[Any] | None]]: имя -> (запрос, параметры)
+    """
+    conn = connections.get("default")
+    _, rows = await conn.execute_query(
+        "SELECT id, link FROM urlinfo WHERE is_active ORDER BY id DESC LIMIT 1"
+    )
+    if not rows:
+        raise RuntimeError("База данных пуста! Выполните python -m app.bench seed")
+    url_id, token = rows[0]["id"], rows[0]["link"]
+    now = datetime.now(timezone.utc)
+
+    return {
+        # Переходы по коротким ссылкам пачкой(repository.get_orig_links)
+        "redirect_lookup": (
+            "SELECT id, link, original_link, due_date FROM urlinfo "
+            "WHERE link = ANY($1::text[]) AND is_active",
+            [[token]],
+        ),
+        # Деактивация ссылки(repository.change_activate_status)
+        "deactivate_lookup": (
+            URLInfo.filter(link=token, is_active=True).update(is_active=False).sql(params_inline=True),
+            None,
+        ),
+        # Дозагрузка сроков в expiry(repository.get_expiring_links)
+        "expiring_links": (
+            URLInfo.filter(is_active=True, due_date__lt=now + timedelta(minutes=1))
+            .values_list("link", "due_date")
+            .sql(params_inline=True),
+            None,
+        ),
+        # Деактивация истёкших ссылок(repository.deactivate_expired_links)
+        "deactivate_expired": (
+            "UPDATE urlinfo SET is_active = FALSE "
+            "WHERE link = ANY($1::text[]) AND is_active AND due_date <= now()",
+            [[token]],
+        ),
+        # Поиск ссылки на тот же адрес(repository.find_reusable_link)
+        "reuse_lookup": (
+            URLInfo.filter(url_hash=url_id, is_active=True, due_date__gt=now)
+            .values_list("link", "original_link", "due_date")
+            .sql(params_inline=True),
+            None,
+        ),
+        # Счётчики переходов за сутки для статистики(repository.get_stats)
+        "stats_buckets": (
+            "SELECT url_id, SUM(clicks) FILTER (WHERE bucket_start >= $1), SUM(clicks) "
+            "FROM urlclickbucket WHERE bucket_start >= $2 GROUP BY url_id",
+            [now - timedelta(hours=1), now - timedelta(days=1)],
+        ),
+        # Переходы ссылки за период
+        "link_clicks": (
+            "SELECT count(*) FROM urlredirect "
+            "WHERE url_id = $1 AND clicked_at >= $2 AND clicked_at < $3",
+            [url_id, now - timedelta(hours=1), now],
+        ),
+        # Страница ссылок по курсору(repository.get_all_links с after_id)
+        "links_page_cursor": (
+            URLInfo.filter(is_active=True, id__gt=max(0, url_id - 100))
+            .order_by("id")
+            .limit(31)
+            .sql(params_inline=True),
+            None,
+        ),
+        # Версии списков для ETag(repository.get_links_version, get_clicks_version)
+        "links_version": ("SELECT max(id), max(updated_at) FROM urlinfo", None),
+        "clicks_version": ("SELECT max(id) FROM urlredirect", None),
+    }
+
+
+async def explain_hot_queries() -> Dict[str, List[Tuple[str, str]]]:
+    """Планы горячих запросов с enable_seqscan = off
+
+    Returns:
+        Dict[str, List[Tuple[str, str]]]: имя -> узлы плана (тип узла, таблица или индекс)
+    """
+    queries = await hot_queries()
+    async with in_transaction("default") as conn:
+        await conn.execute_script("SET LOCAL enable_seqscan = off")
+        return {name: await explain(sql, params, using_db=conn) for name, (sql, params) in queries.items()}
+
+
+async def check() -> List[str]:
+    """Поиск Seq Scan в планах горячих запросов
+
+    Returns:
+        List[str]: описания запросов с Seq Scan
+    """
+    failures = []
+    for name, nodes in (await explain_hot_queries()).items():
+        seq_scans = [target for node_type, target in nodes if node_type == "Seq Scan"]
+        plan = ", ".join(f"{node_type}({target})" if target else node_type for node_type, target in nodes)
+        print(f"{'SEQ SCAN' if seq_scans else 'ok':>8}  {name:>20}: {plan}")
+        if seq_scans:
+            failures.append(f"{name}: Seq Scan on {', '.join(seq_scans)}")
+
+    return failures
+
+
+async def main():
+    from app.src.config.load_env import load_environment
+    from app.src.db import tortoise_config
+
+    load_environment()
+    await Tortoise.init(config=tortoise_config())
+    try:
+        failures = await check()
+    finally:
+        await Tortoise.close_connections()
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
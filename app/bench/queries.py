@@ -0,0 +1,17 @@
+"""Подсчёт запросов к базе данных во время замеров"""
+
+from app.src.metrics import HTTP_DB_QUERIES
+
+
+class QueryCounter:
+    """Счётчик запросов к базе данных, выполненных при обработке HTTP запросов
+
+    Берётся из метрики `http_request_db_queries`(MetricsMiddleware): запросы считаются
+    журналом запросов asyncpg внутри HTTP запроса, поэтому фоновые задачи(запись
+    переходов, синхронизация фильтра и индекса) и служебный сброс соединения в пул
+    в замер не попадают.
+    """
+
+    @property
+    def count(self) -> float:
+        return HTTP_DB_QUERIES.total()
@@ -0,0 +1,204 @@
+"""Замер задержек и пропускной способности эндпоинтов приложения в том же процессе"""
+
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+from fastapi import FastAPI
+from tortoise import connections
+
+from app.bench.queries import QueryCounter
+
+RequestFactory = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль(линейная интерполяция)
+
+    Args:
+        values (List[float]): отсортированные значения
+        q (float): перцентиль от 0 до 100
+
+    Returns:
+        float: значение перцентиля
+    """
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    make_request: RequestFactory,
+    requests: int,
+    concurrency: int,
+    counter: QueryCounter,
+    warmup: int = 50,
+) -> Dict[str, Any]:
+    """Замер одного сценария
+
+    Args:
+        client (httpx.AsyncClient): клиент приложения
+        make_request (RequestFactory): функция выполнения i-го запроса
+        requests (int): кол-во запросов
+        concurrency (int): кол-во одновременных запросов
+        counter (QueryCounter): счётчик запросов к базе данных
+        warmup (int, optional): кол-во запросов прогрева(не учитываются). Defaults to 50.
+
+    Returns:
+        Dict[str, Any]: метрики сценария
+    """
+    for i in range(warmup):
+        await make_request(client, i)
+
+    latencies: List[float] = []
+    errors = 0
+    numbers = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in numbers:
+            start = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    queries_before = counter.count
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    queries = counter.count - queries_before
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "queries_per_request": queries / requests,
+    }
+
+
+async def _scenarios(size: int, hot_links: int) -> Dict[str, RequestFactory]:
+    conn = connections.get("default")
+    rows = await conn.execute_query_dict(
+        "SELECT link FROM urlinfo WHERE is_active AND due_date > now() + interval '10 minutes' "
+        "ORDER BY id LIMIT $1",
+        [hot_links],
+    )
+    tokens = [row["link"] for row in rows]
+    stats = await conn.execute_query_dict("SELECT count(*) AS total, max(id) AS max_id FROM urlinfo")
+    total, max_id = stats[0]["total"], stats[0]["max_id"] or 0
+    deep_page = max(1, total // size - 1)
+    deep_after_id = max(0, max_id - 2 * size)
+
+    async def follow_the_link(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(f"/{random.choice(tokens)}")
+
+    async def generate_short_url(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post(
+            "/api/private/generate_link", json={"url": f"https://bench.example.com/new/{i}"}
+        )
+
+    async def get_all_links_deep(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(f"/api/private/all_links?page={deep_page}&size={size}")
+
+    async def get_all_links_cursor(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(
+            f"/api/private/all_links?after_id={deep_after_id}&size={size}&total=estimate"
+        )
+
+    async def get_links_stats(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get(f"/api/private/links_stats?page=1&size={size}")
+
+    scenarios: Dict[str, RequestFactory] = {
+        "generate_short_url": generate_short_url,
+        "get_all_links_deep": get_all_links_deep,
+        "get_all_links_cursor": get_all_links_cursor,
+        "get_links_stats": get_links_stats,
+    }
+    if tokens:
+        scenarios["follow_the_link"] = follow_the_link
+
+    return scenarios
+
+
+async def run(
+    app: FastAPI,
+    requests: int,
+    concurrency: int,
+    size: int = 30,
+    hot_links: int = 1000,
+    only: List[str] | None = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Запуск сценариев на приложении(с его lifespan) через httpx без сети
+
+    Args:
+        app (FastAPI): приложение из server.create_app
+        requests (int): кол-во запросов в каждом сценарии
+        concurrency (int): кол-во одновременных запросов
+        size (int, optional): размер страницы для списков. Defaults to 30.
+        hot_links (int, optional): из скольких ссылок выбирать при переходах. Defaults to 1000.
+        only (List[str] | None, optional): запустить только эти сценарии. Defaults to None.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: метрики по сценариям
+    """
+    counter = QueryCounter()
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", auth=("bench", "bench")
+        ) as client:
+            for name, make_request in (await _scenarios(size, hot_links)).items():
+                if only and name not in only:
+                    continue
+                results[name] = await measure(client, make_request, requests, concurrency, counter)
+                print(
+                    f"{name:>22}: {results[name]['rps']:9.1f} rps  "
+                    f"p50 {results[name]['p50_ms']:7.2f} ms  "
+                    f"p95 {results[name]['p95_ms']:7.2f} ms  "
+                    f"p99 {results[name]['p99_ms']:7.2f} ms  "
+                    f"{results[name]['queries_per_request']:5.2f} q/req"
+                )
+
+    return results
+
+
+def compare(
+    baseline: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]], threshold: float
+) -> List[str]:
+    """Сравнение двух запусков
+
+    Args:
+        baseline (Dict[str, Dict[str, Any]]): метрики базового запуска
+        current (Dict[str, Dict[str, Any]]): метрики текущего запуска
+        threshold (float): допустимое ухудшение(доля, например 0.1 = 10%)
+
+    Returns:
+        List[str]: описания регрессий
+    """
+    regressions = []
+    for name, metrics in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms", "queries_per_request"):
+            if base[key] and metrics[key] > base[key] * (1 + threshold):
+                regressions.append(f"{name}.{key}: {base[key]:.2f} -> {metrics[key]:.2f}")
+        if metrics["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}.rps: {base['rps']:.1f} -> {metrics['rps']:.1f}")
+
+    return regressions
@@ -0,0 +1,87 @@
+"""Наполнение базы данных ссылками и переходами для нагрузочных замеров"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from tortoise import connections
+
+from app.src.codegen import CodeScrambler, encode_base62
+
+SEED_HOST = "https://bench.example.com"
+
+
+async def seed_links(links: int, inactive_ratio: float = 0.1, batch_size: int = 10_000) -> List[int]:
+    """Создание ссылок
+
+    Args:
+        links (int): кол-во ссылок
+        inactive_ratio (float, optional): доля неактивных ссылок. Defaults to 0.1.
+        batch_size (int, optional): размер пачки вставки. Defaults to 10_000.
+
+    Returns:
+        List[int]: ID созданных ссылок
+    """
+    conn = connections.get("default")
+    scrambler = CodeScrambler(f"seed-{time.time_ns()}")
+    due_date = datetime.now(timezone.utc) + timedelta(days=1)
+    inactive_every = round(1 / inactive_ratio) if inactive_ratio > 0 else 0
+
+    ids: List[int] = []
+    for start in range(0, links, batch_size):
+        numbers = range(start, min(start + batch_size, links))
+        rows = await conn.execute_query_dict(
+            """
+            INSERT INTO urlinfo (link, original_link, is_active, due_date)
+            SELECT link, original_link, is_active, $4 FROM unnest($1::text[], $2::text[], $3::bool[])
+                AS t (link, original_link, is_active)
+            ON CONFLICT (link) DO NOTHING
+            RETURNING id
+            """,
+            [
+                [encode_base62(scrambler.scramble(n)) for n in numbers],
+                [f"{SEED_HOST}/page/{n}" for n in numbers],
+                [not inactive_every or n % inactive_every != 0 for n in numbers],
+                due_date,
+            ],
+        )
+        ids.extend(row["id"] for row in rows)
+
+    return ids
+
+
+async def seed_clicks(link_ids: List[int], clicks: int, skew: float = 3.0, batch_size: int = 200_000):
+    """Создание переходов за последние сутки вместе с поминутными счётчиками
+
+    Переходы распределены неравномерно: чем больше `skew`, тем сильнее выделяются
+    популярные ссылки(первые в списке).
+
+    Args:
+        link_ids (List[int]): ID ссылок
+        clicks (int): кол-во переходов
+        skew (float, optional): степень перекоса популярности. Defaults to 3.0.
+        batch_size (int, optional): размер пачки вставки. Defaults to 200_000.
+    """
+    if not link_ids:
+        return
+
+    conn = connections.get("default")
+    for start in range(0, clicks, batch_size):
+        await conn.execute_query(
+            """
+            WITH inserted AS (
+                INSERT INTO urlredirect (url_id, clicked_at)
+                SELECT ($1::int[])[1 + floor(power(random(), $2) * $3)::int],
+                       now() - random() * interval '1 day'
+                FROM generate_series(1, $4)
+                RETURNING url_id, clicked_at
+            )
+            INSERT INTO urlclickbucket (url_id, bucket_start, clicks)
+            SELECT url_id, date_trunc('minute', clicked_at), count(*) FROM inserted GROUP BY 1, 2
+            ON CONFLICT (url_id, bucket_start)
+            DO UPDATE SET clicks = urlclickbucket.clicks + EXCLUDED.clicks
+            """,
+            [link_ids, skew, len(link_ids), min(batch_size, clicks - start)],
+        )
+
+    await conn.execute_script("ANALYZE urlinfo; ANALYZE urlredirect; ANALYZE urlclickbucket;")
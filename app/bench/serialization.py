@@ -0,0 +1,83 @@
+"""Замер процессорного времени на страницу списка ссылок(запрос, сборка ответа, JSON)
+
+Запуск из корня репозитория на наполненной базе(python -m app.bench seed):
+    python -m app.bench.serialization --size 1000 --repeat 50
+
+before - объекты модели Tortoise, валидация в LinkInfo и Message, JSON через Pydantic.
+after - кортежи из repository.get_all_links, словари из services.get_all_links и
+serialization.dumps(orjson, если установлен).
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable
+
+from tortoise import Tortoise
+
+from app.src.db.models import URLInfo
+from app.src.schemas import LinkInfo, Message, PaginationInfo
+
+
+async def page_before(size: int) -> bytes:
+    links = await URLInfo.all().order_by("id").limit(size + 1)
+    domen = os.getenv("DOMEN")
+    return (
+        Message(
+            links=[
+                LinkInfo(
+                    id=link.id,
+                    link=f"{domen}/{link.link}",
+                    original_link=link.original_link,
+                    is_active=link.is_active,
+                    due_date=link.due_date,
+                )
+                for link in links[:size]
+            ],
+            info=PaginationInfo(page=1, size=size, next=len(links) > size, prev=False),
+        )
+        .model_dump_json()
+        .encode()
+    )
+
+
+async def page_after(size: int) -> bytes:
+    from app.src.serialization import dumps
+    from app.src.services import get_all_links
+
+    return dumps(await get_all_links(filter="all", page=1, size=size, total="none"))
+
+
+async def cpu_per_page(page: Callable[[int], Awaitable[bytes]], size: int, repeat: int) -> float:
+    """Среднее процессорное время процесса на страницу(в миллисекундах)"""
+    await page(size)
+    start = time.process_time()
+    for _ in range(repeat):
+        await page(size)
+    return (time.process_time() - start) / repeat * 1000
+
+
+async def main(args: argparse.Namespace):
+    from app.src.config.load_env import load_environment
+    from app.src.db import tortoise_config
+    from app.src.serialization import orjson
+
+    load_environment()
+    await Tortoise.init(config=tortoise_config())
+    try:
+        before = await cpu_per_page(page_before, args.size, args.repeat)
+        after = await cpu_per_page(page_after, args.size, args.repeat)
+    finally:
+        await Tortoise.close_connections()
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"before: {before:8.2f} ms CPU / {args.size} rows")
+    print(f" after: {after:8.2f} ms CPU / {args.size} rows ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""Микрозамеры проверки ссылок и перехода по ссылке без базы данных(мкс на вызов)
+
+Запуск из корня репозитория(настройки из app/src/config/.env):
+    python -m app.bench.validators --number 200000
+
+before - прежняя реализация(регулярные выражения и os.getenv на каждый вызов),
+after - текущая(готовые регулярные выражения и настройки из get_settings).
+Переход замеряется через services.get_original_url при попадании в кэш переходов.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import time
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from app.src.config.load_env import load_environment
+from app.src.config.settings import get_settings
+
+
+def is_url_before(value: str) -> str:
+    value = value.strip()
+    http_and_https_pattern = re.compile(r"(?:(?:https?|ftp):\/\/)?[\w/\-?=%.]+\.[\w/\-?=%.]+")
+    if not http_and_https_pattern.match(value):
+        raise ValueError("URL адрес не является корректным!")
+    return value
+
+
+def is_my_url_before(value: str) -> str:
+    value = value.strip()
+    domen = f"{os.getenv('DOMEN')}/"
+    my_url = re.compile(r"^%s.{9}$" % domen)
+    if not my_url.match(value):
+        raise ValueError("URL адрес сгенерирован не этим сервисом")
+    return value
+
+
+def token_before(short_url: str) -> str:
+    return short_url.rsplit("/", 1)[-1]
+
+
+def short_url_before(token: str) -> str:
+    return f"{os.getenv('DOMEN')}/{token}"
+
+
+def micro(func, arg, number: int) -> float:
+    """Время одного вызова(в микросекундах)"""
+    return timeit.timeit(lambda: func(arg), number=number) / number * 1e6
+
+
+async def redirect(number: int) -> float:
+    """Время перехода по ссылке из кэша(в микросекундах): поиск, учёт перехода, заголовки"""
+    from app.src.cache import CachedLink, redirect_cache
+    from app.src.clicks import click_buffer
+    from app.src.httpcache import redirect_policy
+    from app.src.services import get_original_url
+
+    # Буфер переходов не пишет в базу данных во время замера
+    click_buffer.configure(batch_size=number + 1, flush_interval=3600, max_lost=number + 1)
+    redirect_cache.configure(max_size=10, ttl=3600)
+    due_date = datetime.now(timezone.utc) + timedelta(hours=1)
+    redirect_cache.put("benchTok1", CachedLink(1, "https://example.com", True, due_date))
+
+    start = time.perf_counter()
+    for _ in range(number):
+        link = await get_original_url("benchTok1")
+        redirect_policy.headers(link.due_date)  # type: ignore
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main(args: argparse.Namespace):
+    from app.src.schemas import is_my_url, is_url
+    from app.src.services import _short_url
+
+    load_environment()
+    short_url = f"{get_settings().short_url_prefix}benchTok1"
+    cases = [
+        ("is_url", is_url_before, is_url, "https://example.com/some/path?q=1"),
+        ("is_my_url", is_my_url_before, is_my_url, short_url),
+        ("short_url", short_url_before, _short_url, "benchTok1"),
+        ("token", token_before, lambda url: url.removeprefix(get_settings().short_url_prefix), short_url),
+    ]
+    for name, before, after, arg in cases:
+        old, new = micro(before, arg, args.number), micro(after, arg, args.number)
+        print(f"{name:>10}: before {old:6.3f} us, after {new:6.3f} us ({old / new:.1f}x)")
+
+    print(f"{'redirect':>10}: {asyncio.run(redirect(args.number)):6.3f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200_000)
+    main(parser.parse_args())
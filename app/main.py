@@ -1,10 +1,33 @@
+import logging
+from importlib.util import find_spec
+
 import uvicorn
 
+from app.src.config.load_env import configure_logging, load_environment, validate_environment
+
+logger = logging.getLogger("app.main")
+
+
 def main():
+    configure_logging()
+    load_environment()
+    settings = validate_environment()
+    workers = settings.server_workers
+    # uvloop и httptools быстрее стандартных, но ставятся отдельно(pip install app[prod])
+    loop = "uvloop" if find_spec("uvloop") else "asyncio"
+    http = "httptools" if find_spec("httptools") else "h11"
+    logger.info("workers=%d loop=%s http=%s", workers, loop, http)
+
     uvicorn.run(
         app="app.src.server:app",
-        host="localhost",
-        port=8080,
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.server_backlog,
+        # При остановке новые подключения не принимаются, текущие запросы дорабатывают
+        timeout_graceful_shutdown=settings.server_graceful_seconds,
     )
 
 
@@ -0,0 +1,25 @@
+import asyncio
+import logging
+
+from tortoise import Tortoise
+
+from app.src.config.load_env import configure_logging, load_environment, validate_environment
+from app.src.db import migrate, tortoise_config
+
+logger = logging.getLogger("app.migrate")
+
+
+async def main():
+    configure_logging()
+    load_environment()
+    validate_environment()
+    await Tortoise.init(config=tortoise_config())
+    try:
+        await migrate()
+        logger.info("schema is up to date")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,302 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Literal, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+RouteClass = Literal["redirect", "private"]
+# Классы в порядке приоритета: освободившийся слот сначала получает переход по ссылке
+ROUTE_CLASSES: Tuple[RouteClass, ...] = ("redirect", "private")
+PRIVATE_PREFIX = "/api/private/"
+# Служебные маршруты не ограничиваются: метрики нужны именно во время перегрузки
+EXEMPT_PATHS = frozenset(("/api/private/metrics", "/docs", "/docs/oauth2-redirect", "/openapi.json"))
+
+
+def route_class(path: str) -> RouteClass | None:
+    """Класс маршрута для ограничений
+
+    Args:
+        path (str): путь запроса
+
+    Returns:
+        RouteClass | None: класс маршрута или None, если маршрут не ограничивается
+    """
+    if path in EXEMPT_PATHS:
+        return None
+    return "private" if path.startswith(PRIVATE_PREFIX) else "redirect"
+
+
+class TokenBuckets:
+    """Token bucket на каждого клиента(IP) с ограничением кол-ва клиентов в памяти
+
+    Args:
+        rate (float): запросов в секунду на клиента(0 - без ограничения)
+        burst (int): запас запросов для всплеска
+        max_clients (int): сколько клиентов хранить(давно не обращавшиеся вытесняются)
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        # Клиент -> [токены, время последнего пополнения]
+        self._buckets: OrderedDict[str, List[float]] = OrderedDict()
+
+    def take(self, client: str, now: float) -> float:
+        """Списание токена
+
+        Args:
+            client (str): клиент
+            now (float): текущее время(time.monotonic())
+
+        Returns:
+            float: 0, если запрос разрешён, иначе через сколько секунд появится токен
+        """
+        if self.rate <= 0:
+            return 0.0
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [float(self.burst), now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class PriorityLimiter:
+    """Ограничение кол-ва одновременно обрабатываемых запросов с приоритетом переходов
+
+    Переходы могут занять все `limit` слотов, закрытые маршруты - не больше `private_limit`,
+    поэтому часть слотов всегда остаётся переходам. Запросы сверх лимита ждут в очереди
+    не дольше `queue_timeout` секунд, освободившийся слот сначала получает переход.
+
+    Args:
+        limit (int): всего слотов(0 - без ограничения)
+        private_limit (int): слотов для закрытых маршрутов
+        max_queue (int): максимальная длина очереди
+        queue_timeout (float): максимальное ожидание в очереди(в секундах)
+    """
+
+    def __init__(self, limit: int, private_limit: int, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.private_limit = private_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight: Dict[RouteClass, int] = {cls: 0 for cls in ROUTE_CLASSES}
+        self._waiters: Dict[RouteClass, Deque[asyncio.Future]] = {cls: deque() for cls in ROUTE_CLASSES}
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def _has_slot(self, cls: RouteClass) -> bool:
+        total = sum(self.in_flight.values())
+        if cls == "private":
+            return total < self.limit and self.in_flight["private"] < self.private_limit
+        return total < self.limit
+
+    async def acquire(self, cls: RouteClass) -> bool:
+        """Занятие слота
+
+        Args:
+            cls (RouteClass): класс маршрута
+
+        Returns:
+            bool: False, если слот не освободился(очередь заполнена или время ожидания вышло)
+        """
+        if self.limit <= 0:
+            return True
+        # Без очереди слот занимается, только если его не ждут запросы того же или выше приоритета
+        ahead = ROUTE_CLASSES[: ROUTE_CLASSES.index(cls) + 1]
+        if self._has_slot(cls) and not any(self._waiters[other] for other in ahead):
+            self.in_flight[cls] += 1
+            return True
+        if self.queued >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[cls].append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except BaseException as e:
+            # Слот мог быть выдан одновременно с истечением ожидания или отменой запроса
+            granted = waiter.done() and not waiter.cancelled()
+            if not granted and waiter in self._waiters[cls]:
+                self._waiters[cls].remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                return granted
+            if granted:
+                self.release(cls)
+            raise
+
+    def release(self, cls: RouteClass) -> None:
+        """Освобождение слота и передача его ожидающим по приоритету
+
+        Args:
+            cls (RouteClass): класс маршрута
+        """
+        if self.limit <= 0:
+            return
+        self.in_flight[cls] -= 1
+        for waiting_cls in ROUTE_CLASSES:
+            waiters = self._waiters[waiting_cls]
+            while waiters and self._has_slot(waiting_cls):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.in_flight[waiting_cls] += 1
+                    waiter.set_result(True)
+
+
+class AdmissionControl:
+    """Ограничение нагрузки: частота запросов клиента и кол-во одновременных запросов
+
+    Частота ограничивается token bucket'ом на IP клиента отдельно для переходов и для
+    закрытых маршрутов(ответ 429), одновременные запросы - общим лимитом с приоритетом
+    переходов(ответ 503). Оба ответа содержат Retry-After.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trust_forwarded = False
+        self.buckets: Dict[RouteClass, TokenBuckets] = {
+            cls: TokenBuckets(rate=0, burst=1, max_clients=1) for cls in ROUTE_CLASSES
+        }
+        self.limiter = PriorityLimiter(limit=0, private_limit=0, max_queue=0, queue_timeout=0)
+        self.admitted: Dict[RouteClass, int] = {cls: 0 for cls in ROUTE_CLASSES}
+        self.rate_limited: Dict[RouteClass, int] = {cls: 0 for cls in ROUTE_CLASSES}
+        self.shed: Dict[RouteClass, int] = {cls: 0 for cls in ROUTE_CLASSES}
+
+    def configure(
+        self,
+        enabled: bool,
+        redirect_rate: float,
+        redirect_burst: int,
+        private_rate: float,
+        private_burst: int,
+        max_clients: int,
+        max_in_flight: int,
+        private_share: float,
+        max_queue: int,
+        queue_timeout: float,
+        trust_forwarded: bool,
+    ) -> None:
+        """Изменение параметров
+
+        Args:
+            enabled (bool): ограничивать нагрузку
+            redirect_rate (float): переходов в секунду на клиента(0 - без ограничения)
+            redirect_burst (int): запас переходов для всплеска
+            private_rate (float): запросов к закрытым маршрутам в секунду на клиента(0 - без ограничения)
+            private_burst (int): запас запросов к закрытым маршрутам для всплеска
+            max_clients (int): сколько клиентов хранить для каждого класса маршрутов
+            max_in_flight (int): одновременно обрабатываемых запросов(0 - без ограничения)
+            private_share (float): доля слотов, доступная закрытым маршрутам
+            max_queue (int): максимальная длина очереди на слот
+            queue_timeout (float): максимальное ожидание слота(в секундах)
+            trust_forwarded (bool): брать IP клиента из X-Forwarded-For(за прокси)
+        """
+        self.enabled = enabled
+        self.trust_forwarded = trust_forwarded
+        self.buckets = {
+            "redirect": TokenBuckets(rate=redirect_rate, burst=redirect_burst, max_clients=max_clients),
+            "private": TokenBuckets(rate=private_rate, burst=private_burst, max_clients=max_clients),
+        }
+        self.limiter = PriorityLimiter(
+            limit=max_in_flight,
+            private_limit=max(1, int(max_in_flight * private_share)),
+            max_queue=max_queue,
+            queue_timeout=queue_timeout,
+        )
+
+    def client(self, scope: Scope) -> str:
+        """IP клиента
+
+        Args:
+            scope (Scope): ASGI scope запроса
+
+        Returns:
+            str: IP клиента
+        """
+        if self.trust_forwarded:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",", 1)[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def stats(self) -> Dict[str, int]:
+        """Пропущенные и отклонённые запросы по классам маршрутов
+
+        Returns:
+            Dict[str, int]: пропущенные, отклонённые по частоте(429) и по перегрузке(503),
+            занятые слоты, длина очереди, кол-во клиентов
+        """
+        stats: Dict[str, int] = {}
+        for cls in ROUTE_CLASSES:
+            stats[f"{cls}_admitted"] = self.admitted[cls]
+            stats[f"{cls}_rate_limited"] = self.rate_limited[cls]
+            stats[f"{cls}_shed"] = self.shed[cls]
+            stats[f"{cls}_in_flight"] = self.limiter.in_flight[cls]
+            stats[f"{cls}_clients"] = len(self.buckets[cls])
+        stats["queued"] = self.limiter.queued
+        return stats
+
+
+admission = AdmissionControl()
+
+
+async def _reject(send: Send, status: int, detail: bytes, retry_after: float) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": b'{"detail":"' + detail + b'"}'})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware: ограничение нагрузки(см. AdmissionControl)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        cls = route_class(scope["path"]) if scope["type"] == "http" and admission.enabled else None
+        if cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = admission.buckets[cls].take(admission.client(scope), time.monotonic())
+        if wait > 0:
+            admission.rate_limited[cls] += 1
+            await _reject(send, 429, b"too many requests", wait)
+            return
+
+        limiter = admission.limiter
+        if not await limiter.acquire(cls):
+            admission.shed[cls] += 1
+            await _reject(send, 503, b"server is overloaded", limiter.queue_timeout)
+            return
+        admission.admitted[cls] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(cls)
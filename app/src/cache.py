@@ -0,0 +1,168 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+
+@dataclass(slots=True)
+class CachedLink:
+    id: int
+    original_link: str
+    is_active: bool
+    due_date: datetime
+
+
+class RedirectCache:
+    """Ограниченный по размеру LRU-кэш коротких ссылок с временем жизни записей
+
+    Ключ - токен короткой ссылки(без домена). Запись живёт не дольше `ttl` секунд
+    и не дольше `due_date` самой ссылки, поэтому истёкшая ссылка не будет отдана из кэша.
+
+    Каждое удаление записи увеличивает эпоху кэша. Чтение из базы данных запоминает эпоху
+    до запроса(`epoch`) и передаёт её в `put`: если ссылку удалили из кэша после начала
+    чтения, прочитанная строка могла устареть и в кэш не записывается. Ещё `hold` секунд
+    после удаления ссылка не кэшируется совсем(строка с отстающей реплики).
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 60.0, hold: float = 0.0):
+        self._data: OrderedDict[str, Tuple[float, CachedLink]] = OrderedDict()
+        # Код -> (эпоха, время удаления) последних удалений
+        self._invalidated: OrderedDict[str, Tuple[int, float]] = OrderedDict()
+        self._epoch = 0
+        self._forgotten_epoch = 0
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hold = hold
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def configure(self, max_size: int, ttl: float, hold: float = 0.0) -> None:
+        """Изменение параметров кэша(очищает кэш)
+
+        Args:
+            max_size (int): максимальное кол-во записей, 0 - кэш выключен
+            ttl (float): время жизни записи в секундах
+            hold (float, optional): сколько секунд не кэшировать ссылку после удаления. Defaults to 0.0.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hold = hold
+        self._data.clear()
+
+    @property
+    def epoch(self) -> int:
+        """Эпоха кэша: запоминается перед чтением ссылки из базы данных и передаётся в put"""
+        return self._epoch
+
+    def get(self, token: str) -> CachedLink | None:
+        """Получение ссылки из кэша
+
+        Args:
+            token (str): токен короткой ссылки
+
+        Returns:
+            CachedLink | None: данные ссылки или None, если записи нет или она устарела
+        """
+        entry = self._data.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, link = entry
+        if expires_at <= time.monotonic():
+            del self._data[token]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(token)
+        self.hits += 1
+        return link
+
+    def put(self, token: str, link: CachedLink, epoch: int | None = None) -> None:
+        """Запись ссылки в кэш
+
+        Args:
+            token (str): токен короткой ссылки
+            link (CachedLink): данные ссылки
+            epoch (int | None, optional): эпоха кэша до чтения ссылки из базы данных. Defaults to None.
+        """
+        if self.max_size <= 0 or not link.is_active:
+            return
+        if epoch is not None and self._changed_since(token, epoch):
+            self.stale_puts += 1
+            return
+
+        ttl = min(self.ttl, (link.due_date - datetime.now(timezone.utc)).total_seconds())
+        if ttl <= 0:
+            return
+
+        self._data[token] = (time.monotonic() + ttl, link)
+        self._data.move_to_end(token)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        """Удаление ссылки из кэша(например, после деактивации)
+
+        Args:
+            token (str): токен короткой ссылки
+        """
+        if self._data.pop(token, None) is not None:
+            self.invalidations += 1
+
+        self._epoch += 1
+        self._invalidated[token] = (self._epoch, time.monotonic())
+        self._invalidated.move_to_end(token)
+        # Помним не больше max_size удалений: более ранние эпохи считаются изменёнными
+        while len(self._invalidated) > max(self.max_size, 1):
+            _, (epoch, _) = self._invalidated.popitem(last=False)
+            self._forgotten_epoch = epoch
+
+    def _changed_since(self, token: str, epoch: int) -> bool:
+        if epoch < self._forgotten_epoch:
+            return True
+        entry = self._invalidated.get(token)
+        if entry is None:
+            return False
+        invalidated_epoch, invalidated_at = entry
+        return invalidated_epoch > epoch or time.monotonic() - invalidated_at < self.hold
+
+    def evict_expired(self) -> int:
+        """Удаление из кэша всех ссылок, у которых истёк срок действия
+
+        Returns:
+            int: кол-во удалённых записей
+        """
+        now = datetime.now(timezone.utc)
+        expired = [token for token, (_, link) in self._data.items() if link.due_date <= now]
+        for token in expired:
+            del self._data[token]
+        self.expirations += len(expired)
+
+        return len(expired)
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики работы кэша
+
+        Returns:
+            Dict[str, int]: попадания, промахи, вытеснения и текущий размер
+        """
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+        }
+
+
+redirect_cache = RedirectCache()
@@ -0,0 +1,135 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Tuple
+
+import app.src.repository as URLRepository
+from app.src.metrics import observe_job
+
+logger = logging.getLogger(__name__)
+
+
+class ClickBuffer:
+    """Буфер переходов по ссылкам с пакетной записью в базу данных
+
+    Переходы копятся в памяти процесса и записываются фоновой задачей одним
+    запросом: когда набирается `batch_size` переходов или прошло `flush_interval` секунд.
+    В буфере никогда не бывает больше `max_lost` незаписанных переходов(вместе с
+    пачкой, которая записывается сейчас) - при достижении предела(база данных недоступна или не успевает) самые старые переходы
+    отбрасываются и учитываются в `dropped`, запрос перехода записи не ждёт.
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, max_lost: int = 5_000):
+        self._clicks: Deque[Tuple[int, datetime]] = deque()
+        # Пачка, которая записывается сейчас, тоже может быть потеряна
+        self._in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_lost = max_lost
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def configure(self, batch_size: int, flush_interval: float, max_lost: int) -> None:
+        """Изменение параметров буфера
+
+        Args:
+            batch_size (int): размер пачки, при котором буфер записывается сразу
+            flush_interval (float): максимальное время ожидания записи(в секундах)
+            max_lost (int): максимальное кол-во незаписанных переходов
+        """
+        self.max_lost = max(1, max_lost)
+        self.batch_size = max(1, min(batch_size, self.max_lost))
+        self.flush_interval = flush_interval
+
+    async def record(self, url_id: int) -> None:
+        """Добавление перехода в буфер
+
+        Args:
+            url_id (int): ID ссылки, по которой был переход
+        """
+        self._clicks.append((url_id, datetime.now(timezone.utc)))
+        self.recorded += 1
+
+        if len(self._clicks) + self._in_flight > self.max_lost:
+            self._clicks.popleft()
+            self.dropped += 1
+        if len(self._clicks) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Запись накопленных переходов в базу данных
+
+        Returns:
+            int: кол-во записанных переходов
+        """
+        async with self._flush_lock:
+            batch = list(self._clicks)
+            self._clicks.clear()
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            self._in_flight = len(batch)
+            try:
+                await URLRepository.write_clicks(batch)
+            except Exception:
+                logger.exception("cannot write %d clicks", len(batch))
+                self._clicks.extendleft(reversed(batch))
+                while len(self._clicks) > self.max_lost:
+                    self._clicks.popleft()
+                    self.dropped += 1
+                return 0
+            finally:
+                self._in_flight = 0
+
+            observe_job("clicks_flush", started, rows=len(batch))
+            self.written += len(batch)
+            self.flushes += 1
+            return len(batch)
+
+    async def start(self) -> None:
+        """Запуск фоновой задачи записи буфера"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи и запись оставшихся переходов"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики работы буфера
+
+        Returns:
+            Dict[str, int]: кол-во ожидающих записи, принятых, записанных и отброшенных переходов
+        """
+        return {
+            "pending": len(self._clicks) + self._in_flight,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+        }
+
+
+click_buffer = ClickBuffer()
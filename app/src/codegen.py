@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import secrets
+import string
+from typing import List, Literal
+
+from tortoise import connections
+
+ALPHABET = string.digits + string.ascii_letters
+CODE_LENGTH = 9
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+
+CODE_SEQUENCE = "url_code_seq"
+
+_HALF_BITS = 27
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_MASK64 = (1 << 64) - 1
+
+
+def encode_base62(number: int) -> str:
+    """Кодирование числа в строку base62 фиксированной длины
+
+    Args:
+        number (int): число из диапазона [0, CODE_SPACE)
+
+    Returns:
+        str: код длины CODE_LENGTH
+    """
+    chars = ["0"] * CODE_LENGTH
+    for i in range(CODE_LENGTH - 1, -1, -1):
+        number, rest = divmod(number, 62)
+        chars[i] = ALPHABET[rest]
+    return "".join(chars)
+
+
+def decode_base62(code: str) -> int:
+    """Декодирование строки base62 в число
+
+    Args:
+        code (str): код из символов ALPHABET
+
+    Returns:
+        int: число
+    """
+    number = 0
+    for char in code:
+        number = number * 62 + ALPHABET.index(char)
+    return number
+
+
+class CodeScrambler:
+    """Обратимая перестановка чисел диапазона [0, CODE_SPACE)
+
+    Сеть Фейстеля на 54 битах с ключами раундов из секрета и "прогулкой по циклу"
+    для значений вне диапазона. Последовательные ID превращаются в неугадываемые коды,
+    при этом разные ID всегда дают разные коды.
+    """
+
+    def __init__(self, secret: str, rounds: int = 4):
+        digest = hashlib.blake2b(secret.encode(), digest_size=8 * rounds).digest()
+        self._keys = [int.from_bytes(digest[i * 8 : (i + 1) * 8], "big") for i in range(rounds)]
+
+    @staticmethod
+    def _round(value: int, key: int) -> int:
+        x = ((value ^ key) * 0x9E3779B97F4A7C15) & _MASK64
+        x ^= x >> 29
+        x = (x * 0xBF58476D1CE4E5B9) & _MASK64
+        x ^= x >> 32
+        return x & _HALF_MASK
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> _HALF_BITS, value & _HALF_MASK
+        for key in self._keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << _HALF_BITS) | right
+
+    def _decrypt(self, value: int) -> int:
+        left, right = value >> _HALF_BITS, value & _HALF_MASK
+        for key in reversed(self._keys):
+            left, right = right ^ self._round(left, key), left
+        return (left << _HALF_BITS) | right
+
+    def scramble(self, number: int) -> int:
+        number = self._encrypt(number)
+        while number >= CODE_SPACE:
+            number = self._encrypt(number)
+        return number
+
+    def unscramble(self, number: int) -> int:
+        number = self._decrypt(number)
+        while number >= CODE_SPACE:
+            number = self._decrypt(number)
+        return number
+
+
+class CodeGenerator:
+    """Базовый генератор кодов коротких ссылок"""
+
+    mode: str = ""
+
+    async def prepare(self) -> None:
+        """Подготовка генератора(например, объектов базы данных)"""
+
+    async def next_code(self) -> str:
+        """Получение нового кода
+
+        Returns:
+            str: код короткой ссылки
+        """
+        raise NotImplementedError
+
+    async def allocate(self, count: int) -> List[str]:
+        """Получение нескольких новых кодов
+
+        Args:
+            count (int): кол-во кодов
+
+        Returns:
+            List[str]: коды коротких ссылок
+        """
+        return [await self.next_code() for _ in range(count)]
+
+
+class RandomCodeGenerator(CodeGenerator):
+    """Случайные коды. Уникальность обеспечивает индекс в базе данных - при
+    совпадении запись повторяется с новым кодом"""
+
+    mode = "random"
+
+    async def next_code(self) -> str:
+        return encode_base62(secrets.randbelow(CODE_SPACE))
+
+
+class SequenceCodeGenerator(CodeGenerator):
+    """Коды из последовательности базы данных
+
+    Каждый процесс забирает из последовательности блок из `block_size` ID одним запросом
+    и выдаёт коды из него локально. ID перемешиваются `CodeScrambler`, поэтому коды
+    уникальны без повторов и не идут подряд.
+    """
+
+    mode = "sequence"
+
+    def __init__(self, block_size: int, secret: str):
+        self.block_size = block_size
+        self.scrambler = CodeScrambler(secret)
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def prepare(self) -> None:
+        # Последовательность создаёт python -m app.migrate, при запуске только проверяется шаг
+        _, rows = await connections.get("default").execute_query(
+            "SELECT increment_by FROM pg_sequences "
+            "WHERE schemaname = current_schema() AND sequencename = $1",
+            [CODE_SEQUENCE],
+        )
+        if not rows:
+            raise RuntimeError(f"Последовательность {CODE_SEQUENCE} не создана! Выполните python -m app.migrate")
+        if rows[0]["increment_by"] != self.block_size:
+            raise RuntimeError(
+                f"Шаг {CODE_SEQUENCE}({rows[0]['increment_by']}) не равен CODE_BLOCK_SIZE({self.block_size})! "
+                "Выполните python -m app.migrate"
+            )
+
+    async def _fetch_block(self) -> None:
+        # nextval возвращает конец блока, поэтому смена block_size не даёт пересечений
+        _, rows = await connections.get("default").execute_query(
+            f"SELECT nextval('{CODE_SEQUENCE}') AS block_end"
+        )
+        block_end = rows[0]["block_end"]
+        self._next, self._end = block_end - self.block_size, block_end
+
+    async def allocate(self, count: int) -> List[str]:
+        numbers = []
+        async with self._lock:
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    await self._fetch_block()
+                take = min(count - len(numbers), self._end - self._next)
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+
+        return [encode_base62(self.scrambler.scramble(number)) for number in numbers]
+
+    async def next_code(self) -> str:
+        return (await self.allocate(1))[0]
+
+
+_generator: CodeGenerator = RandomCodeGenerator()
+
+
+def configure_code_generator(
+    mode: Literal["random", "sequence"], block_size: int = 1000, secret: str = ""
+) -> CodeGenerator:
+    """Выбор генератора кодов коротких ссылок
+
+    Args:
+        mode (Literal[&quot;random&quot;, &quot;sequence&quot;]): режим генерации
+        block_size (int, optional): размер блока ID для режима sequence. Defaults to 1000.
+        secret (str, optional): секрет перемешивания ID для режима sequence. Defaults to "".
+
+    Returns:
+        CodeGenerator: выбранный генератор
+    """
+    global _generator
+    match mode:
+        case "sequence":
+            _generator = SequenceCodeGenerator(block_size=block_size, secret=secret)
+        case _:
+            _generator = RandomCodeGenerator()
+
+    return _generator
+
+
+def get_code_generator() -> CodeGenerator:
+    return _generator
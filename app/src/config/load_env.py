@@ -1,8 +1,11 @@
+import logging
 import os
 from pathlib import Path
 
 from dotenv import dotenv_values, load_dotenv
 
+from app.src.config.settings import Settings, get_settings
+
 
 def load_environment():
     """Загрузка переменных окружения в зависимости от среды"""
@@ -13,23 +16,21 @@ def load_environment():
         load_dotenv(env_file, override=True)
     else:
         raise FileExistsError(f"Файл {env_file} не найден! Создайте его")
+    # Настройки перечитываются из нового окружения
+    get_settings.cache_clear()
 
     return dotenv_values(env_file).keys()
 
 
-def validate_environment() -> None:
-    required_vars = [
-        "EXPIRE_MINUTES",
-        "DB_PORT",
-        "DB_HOST",
-        "DB_NAME",
-        "DB_USERNAME",
-        "DB_PASSWORD",
-        "DOMEN",
-    ]
-    missing = [var for var in required_vars if not os.getenv(var)]
-    if missing:
-        raise EnvironmentError(f"Пропущены переменные: {missing}")
-    is_right_minutes = int(os.getenv("EXPIRE_MINUTES", "")) > 0
-    if not is_right_minutes:
-        raise EnvironmentError("Минуты должны быть больше 0")
+def configure_logging():
+    """Настройка вывода логов приложения(уровень INFO, формат как у uvicorn)"""
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:\t  %(name)s: %(message)s")
+
+
+def validate_environment() -> Settings:
+    """Проверка переменных окружения
+
+    Returns:
+        Settings: настройки, прочитанные из окружения(дальше доступны через get_settings)
+    """
+    return get_settings()
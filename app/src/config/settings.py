@@ -0,0 +1,228 @@
+import os
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Callable, Literal, TypeVar
+
+T = TypeVar("T")
+
+REQUIRED_VARS = (
+    "EXPIRE_MINUTES",
+    "DB_PORT",
+    "DB_HOST",
+    "DB_NAME",
+    "DB_USERNAME",
+    "DB_PASSWORD",
+    "DOMEN",
+)
+
+
+def _get(name: str, default: T, cast: Callable[[str], T]) -> T:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        raise EnvironmentError(f"Неверное значение {name}: {value!r}") from None
+
+
+def _bool(value: str) -> bool:
+    match value.strip().lower():
+        case "1" | "true" | "yes" | "on":
+            return True
+        case "0" | "false" | "no" | "off":
+            return False
+        case _:
+            raise ValueError(value)
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Настройки сервиса из переменных окружения(описаны в config/.env.example)
+
+    Читаются и проверяются один раз(`get_settings`), дальше используются готовые значения.
+    """
+
+    # Приложение
+    domen: str
+    expire_minutes: int
+    link_reuse: bool
+    # Запуск сервера
+    server_host: str
+    server_port: int
+    server_workers: int
+    server_backlog: int
+    server_graceful_seconds: int
+    jobs_lock_file: str | None
+    jobs_election_seconds: float
+    # Ограничение нагрузки
+    admission_enabled: bool
+    admission_redirect_rate: float
+    admission_redirect_burst: int
+    admission_private_rate: float
+    admission_private_burst: int
+    admission_max_clients: int
+    admission_max_in_flight: int
+    admission_private_share: float
+    admission_max_queue: int
+    admission_queue_timeout: float
+    admission_trust_forwarded: bool
+    # Генерация коротких ссылок
+    code_mode: Literal["random", "sequence"]
+    code_block_size: int
+    code_secret: str
+    # Кэш и HTTP-кэширование переходов
+    redirect_cache_size: int
+    redirect_cache_ttl: float
+    redirect_status: int
+    redirect_max_age: int
+    redirect_lookup_window_ms: float
+    redirect_lookup_batch: int
+    redirect_index: bool
+    redirect_index_file: str | None
+    redirect_index_sync_seconds: float
+    redirect_index_rebuild_seconds: float
+    # Отсев несуществующих ссылок
+    link_filter_capacity: int
+    link_filter_fp_rate: float
+    link_filter_sync_seconds: float
+    link_filter_rebuild_seconds: float
+    # Популярные ссылки
+    trending_capacity: int
+    trending_refresh_seconds: float
+    # Запись и хранение переходов
+    clicks_batch_size: int
+    clicks_flush_seconds: float
+    clicks_max_lost: int
+    clicks_retention_days: int
+    clicks_partitions_ahead: int
+    # Деактивация истёкших ссылок
+    expiry_batch_size: int
+    expiry_refill_seconds: float
+    # База данных
+    db_host: str
+    db_port: int
+    db_name: str
+    db_username: str
+    db_password: str
+    db_pool_min: int
+    db_pool_max: int
+    db_statement_cache_size: int
+    db_command_timeout: float
+    db_replicas: str
+    db_replica_retry_seconds: float
+    db_replica_max_lag_seconds: float
+    # Начало коротких ссылок: домен и /
+    short_url_prefix: str = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "short_url_prefix", f"{self.domen}/")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Чтение и проверка настроек из переменных окружения
+
+        Raises:
+            EnvironmentError: не хватает обязательных переменных или значение неверное
+
+        Returns:
+            Settings: настройки
+        """
+        missing = [var for var in REQUIRED_VARS if not os.getenv(var)]
+        if missing:
+            raise EnvironmentError(f"Пропущены переменные: {missing}")
+
+        settings = cls(
+            domen=os.environ["DOMEN"],
+            expire_minutes=_get("EXPIRE_MINUTES", 0, int),
+            link_reuse=_get("LINK_REUSE", False, _bool),
+            server_host=_get("SERVER_HOST", "localhost", str),
+            server_port=_get("SERVER_PORT", 8080, int),
+            server_workers=_get("SERVER_WORKERS", 1, int),
+            server_backlog=_get("SERVER_BACKLOG", 2048, int),
+            server_graceful_seconds=_get("SERVER_GRACEFUL_SECONDS", 30, int),
+            jobs_lock_file=_get("JOBS_LOCK_FILE", None, str),
+            jobs_election_seconds=_get("JOBS_ELECTION_SECONDS", 10.0, float),
+            admission_enabled=_get("ADMISSION_ENABLED", False, _bool),
+            admission_redirect_rate=_get("ADMISSION_REDIRECT_RATE", 50.0, float),
+            admission_redirect_burst=_get("ADMISSION_REDIRECT_BURST", 100, int),
+            admission_private_rate=_get("ADMISSION_PRIVATE_RATE", 10.0, float),
+            admission_private_burst=_get("ADMISSION_PRIVATE_BURST", 20, int),
+            admission_max_clients=_get("ADMISSION_MAX_CLIENTS", 100_000, int),
+            admission_max_in_flight=_get("ADMISSION_MAX_IN_FLIGHT", 64, int),
+            admission_private_share=_get("ADMISSION_PRIVATE_SHARE", 0.5, float),
+            admission_max_queue=_get("ADMISSION_MAX_QUEUE", 256, int),
+            admission_queue_timeout=_get("ADMISSION_QUEUE_TIMEOUT", 0.5, float),
+            admission_trust_forwarded=_get("ADMISSION_TRUST_FORWARDED", False, _bool),
+            code_mode=_get("CODE_MODE", "random", str),  # type: ignore
+            code_block_size=_get("CODE_BLOCK_SIZE", 1000, int),
+            code_secret=_get("CODE_SECRET", "", str),
+            redirect_cache_size=_get("REDIRECT_CACHE_SIZE", 10_000, int),
+            redirect_cache_ttl=_get("REDIRECT_CACHE_TTL", 60.0, float),
+            redirect_status=_get("REDIRECT_STATUS", 307, int),
+            redirect_max_age=_get("REDIRECT_MAX_AGE", 0, int),
+            redirect_lookup_window_ms=_get("REDIRECT_LOOKUP_WINDOW_MS", 0.5, float),
+            redirect_lookup_batch=_get("REDIRECT_LOOKUP_BATCH", 100, int),
+            redirect_index=_get("REDIRECT_INDEX", False, _bool),
+            redirect_index_file=_get("REDIRECT_INDEX_FILE", None, str),
+            redirect_index_sync_seconds=_get("REDIRECT_INDEX_SYNC_SECONDS", 1.0, float),
+            redirect_index_rebuild_seconds=_get("REDIRECT_INDEX_REBUILD_SECONDS", 300.0, float),
+            link_filter_capacity=_get("LINK_FILTER_CAPACITY", 1_000_000, int),
+            link_filter_fp_rate=_get("LINK_FILTER_FP_RATE", 0.01, float),
+            link_filter_sync_seconds=_get("LINK_FILTER_SYNC_SECONDS", 0.1, float),
+            link_filter_rebuild_seconds=_get("LINK_FILTER_REBUILD_SECONDS", 300.0, float),
+            trending_capacity=_get("TRENDING_CAPACITY", 1000, int),
+            trending_refresh_seconds=_get("TRENDING_REFRESH_SECONDS", 1.0, float),
+            clicks_batch_size=_get("CLICKS_BATCH_SIZE", 500, int),
+            clicks_flush_seconds=_get("CLICKS_FLUSH_SECONDS", 1.0, float),
+            clicks_max_lost=_get("CLICKS_MAX_LOST", 5_000, int),
+            clicks_retention_days=_get("CLICKS_RETENTION_DAYS", 30, int),
+            clicks_partitions_ahead=_get("CLICKS_PARTITIONS_AHEAD", 3, int),
+            expiry_batch_size=_get("EXPIRY_BATCH_SIZE", 500, int),
+            expiry_refill_seconds=_get("EXPIRY_REFILL_SECONDS", 30.0, float),
+            db_host=os.environ["DB_HOST"],
+            db_port=_get("DB_PORT", 5432, int),
+            db_name=os.environ["DB_NAME"],
+            db_username=os.environ["DB_USERNAME"],
+            db_password=os.environ["DB_PASSWORD"],
+            db_pool_min=_get("DB_POOL_MIN", 2, int),
+            db_pool_max=_get("DB_POOL_MAX", 10, int),
+            db_statement_cache_size=_get("DB_STATEMENT_CACHE_SIZE", 100, int),
+            db_command_timeout=_get("DB_COMMAND_TIMEOUT", 10.0, float),
+            db_replicas=_get("DB_REPLICAS", "", str),
+            db_replica_retry_seconds=_get("DB_REPLICA_RETRY_SECONDS", 30.0, float),
+            db_replica_max_lag_seconds=_get("DB_REPLICA_MAX_LAG_SECONDS", 5.0, float),
+        )
+        settings.validate()
+        return settings
+
+    def validate(self) -> None:
+        """Проверка значений
+
+        Raises:
+            EnvironmentError: значение неверное
+        """
+        if self.expire_minutes <= 0:
+            raise EnvironmentError("Минуты должны быть больше 0")
+        if self.code_mode not in ("random", "sequence"):
+            raise EnvironmentError("CODE_MODE должен быть random или sequence")
+        if self.code_mode == "sequence" and not self.code_secret:
+            raise EnvironmentError("Для CODE_MODE=sequence нужен CODE_SECRET")
+        if self.code_block_size <= 0:
+            raise EnvironmentError("CODE_BLOCK_SIZE должен быть больше 0")
+        if self.redirect_status not in (301, 302, 307):
+            raise EnvironmentError("REDIRECT_STATUS должен быть 301, 302 или 307")
+        if not 0 < self.admission_private_share <= 1:
+            raise EnvironmentError("ADMISSION_PRIVATE_SHARE должен быть от 0 до 1")
+        if self.admission_redirect_rate < 0 or self.admission_private_rate < 0:
+            raise EnvironmentError("ADMISSION_*_RATE не может быть меньше 0")
+
+
+@cache
+def get_settings() -> Settings:
+    """Настройки процесса: читаются из окружения при первом вызове
+
+    Returns:
+        Settings: настройки
+    """
+    return Settings.from_env()
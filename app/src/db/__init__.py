@@ -1,15 +1,66 @@
-import os
+import logging
+from typing import Any, Dict
 
-from fastapi import FastAPI
-from tortoise import Tortoise
-from tortoise.contrib.fastapi import register_tortoise
+from tortoise import Tortoise, connections
 
+from app.src.config.settings import get_settings
+from app.src.metrics import instrument_connection
 
-async def init_db_tortoise(_app: FastAPI):
-    TORTOISE_ORM = {
-        "connections": {
-            "default": f"postgres://{os.getenv('DB_USERNAME')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-        },
+from .routing import PRIMARY, REPLICA_PREFIX, parse_replicas, read_router
+from .schema import migrate, prepare_code_sequence, prepare_schema
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "close_db_tortoise",
+    "database_url",
+    "init_db_tortoise",
+    "migrate",
+    "pool_stats",
+    "prepare_code_sequence",
+    "prepare_schema",
+    "read_router",
+    "tortoise_config",
+]
+
+
+def database_url() -> str:
+    """Строка подключения к базе данных из переменных окружения"""
+    settings = get_settings()
+    return f"postgres://{settings.db_username}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.db_name}"
+
+
+def tortoise_config() -> Dict[str, Any]:
+    """Конфигурация Tortoise ORM из переменных окружения
+
+    Соединение default - основная база данных, replica_N - реплики из DB_REPLICAS
+    с теми же базой данных, пользователем и параметрами пула
+    """
+    settings = get_settings()
+    credentials = {
+        "host": settings.db_host,
+        "port": settings.db_port,
+        "user": settings.db_username,
+        "password": settings.db_password,
+        "database": settings.db_name,
+        # Пул соединений процесса(на каждый воркер)
+        "minsize": settings.db_pool_min,
+        "maxsize": settings.db_pool_max,
+        "statement_cache_size": settings.db_statement_cache_size,
+        "command_timeout": settings.db_command_timeout,
+        # Учёт кол-ва и времени запросов для /metrics
+        "init": instrument_connection,
+    }
+    db_connections = {PRIMARY: {"engine": "tortoise.backends.asyncpg", "credentials": credentials}}
+    replicas = parse_replicas(settings.db_replicas, default_port=settings.db_port)
+    for i, (host, port) in enumerate(replicas):
+        db_connections[f"{REPLICA_PREFIX}{i}"] = {
+            "engine": "tortoise.backends.asyncpg",
+            "credentials": {**credentials, "host": host, "port": port},
+        }
+
+    return {
+        "connections": db_connections,
         "apps": {
             "models": {
                 "models": ["app.src.db.models"],
@@ -18,9 +69,49 @@ async def init_db_tortoise(_app: FastAPI):
         },
     }
 
-    await Tortoise.init(config=TORTOISE_ORM)
-    await Tortoise.generate_schemas()
-    register_tortoise(
-        app=_app,
-        config=TORTOISE_ORM,
+
+async def init_db_tortoise():
+    """Подключение к базе данных и прогрев пула
+
+    Пул создаётся первым запросом(сразу с DB_POOL_MIN соединениями). Схема при
+    запуске не создаётся - для этого есть `python -m app.migrate`.
+    """
+    await Tortoise.init(config=tortoise_config())
+    _, rows = await connections.get("default").execute_query(
+        "SELECT to_regclass('urlinfo') IS NOT NULL AS migrated"
     )
+    if not rows[0]["migrated"]:
+        raise RuntimeError("Схема базы данных не создана! Выполните python -m app.migrate")
+
+    replicas = [name for name in connections.db_config if name.startswith(REPLICA_PREFIX)]
+    for name in replicas:
+        try:
+            await connections.get(name).execute_query("SELECT 1")
+        except Exception as e:
+            # Недоступная реплика не мешает запуску: чтения уйдут на основную базу
+            logger.warning("replica %s is unavailable: %s", name, e)
+    read_router.configure(replicas, retry_interval=get_settings().db_replica_retry_seconds)
+
+
+async def close_db_tortoise():
+    """Закрытие пула соединений"""
+    await Tortoise.close_connections()
+
+
+def pool_stats() -> Dict[str, int]:
+    """Состояние пула соединений
+
+    Returns:
+        Dict[str, int]: размеры пулов(реплики с префиксом): текущий, свободные соединения, минимальный и максимальный
+    """
+    stats = {}
+    for name in connections.db_config:
+        pool = getattr(connections.get(name), "_pool", None)
+        if pool is None:
+            continue
+        prefix = "" if name == PRIMARY else f"{name}_"
+        stats[f"{prefix}size"] = pool.get_size()
+        stats[f"{prefix}idle"] = pool.get_idle_size()
+        stats[f"{prefix}min_size"] = pool.get_min_size()
+        stats[f"{prefix}max_size"] = pool.get_max_size()
+    return stats
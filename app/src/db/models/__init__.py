@@ -1,6 +1,8 @@
-from .url_shorter import URLInfo, URLRedirect
+from .url_shorter import URLClickBucket, URLClickDaily, URLInfo, URLRedirect
 
 __all__ = [
+  "URLClickBucket",
+  "URLClickDaily",
   "URLInfo",
   "URLRedirect"
 ]
\ No newline at end of file
@@ -2,14 +2,49 @@ from tortoise import fields, models
 
 
 class URLInfo(models.Model):
+    """Короткие ссылки. В link хранится только код(без домена)
+
+    url_hash - хеш нормализованной оригинальной ссылки для поиска уже созданной
+    ссылки(LINK_REUSE) по индексу вместо сравнения неограниченного original_link.
+    """
+
     id = fields.IntField(pk=True)
-    link = fields.CharField(max_length=100)
+    link = fields.CharField(max_length=100, unique=True)
     original_link = fields.TextField()
+    url_hash = fields.BigIntField(null=True)
     is_active = fields.BooleanField(default=True)
     due_date = fields.DatetimeField()
 
 
 class URLRedirect(models.Model):
+    """Сырые переходы. Таблица секционирована по дням clicked_at(см. db/schema.py)"""
+
     id = fields.IntField(pk=True)
     url = fields.ForeignKeyField("models.URLInfo", related_name="clicks", on_delete=fields.CASCADE)
     clicked_at = fields.DatetimeField(auto_now_add=True)
+
+
+class URLClickBucket(models.Model):
+    id = fields.IntField(pk=True)
+    url = fields.ForeignKeyField(
+        "models.URLInfo", related_name="click_buckets", on_delete=fields.CASCADE
+    )
+    bucket_start = fields.DatetimeField(index=True)
+    clicks = fields.IntField(default=0)
+
+    class Meta:
+        unique_together = (("url", "bucket_start"),)
+
+
+class URLClickDaily(models.Model):
+    """Суммы переходов по дням для секций URLRedirect, удалённых по сроку хранения"""
+
+    id = fields.IntField(pk=True)
+    url = fields.ForeignKeyField(
+        "models.URLInfo", related_name="daily_clicks", on_delete=fields.CASCADE
+    )
+    day = fields.DateField()
+    clicks = fields.IntField(default=0)
+
+    class Meta:
+        unique_together = (("url", "day"),)
@@ -0,0 +1,132 @@
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Tuple
+
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from .routing import PRIMARY
+
+PARTITION_PREFIX = "urlredirect_p"
+DEFAULT_PARTITION = "urlredirect_default"
+
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{8}})$")
+
+_COMPACT_SQL = """
+    INSERT INTO urlclickdaily (url_id, day, clicks)
+    SELECT url_id, (clicked_at AT TIME ZONE 'UTC')::date, count(*) FROM {source}
+    GROUP BY 1, 2
+    ON CONFLICT (url_id, day) DO UPDATE SET clicks = urlclickdaily.clicks + EXCLUDED.clicks
+"""
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _day_start(day: date) -> str:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc).isoformat()
+
+
+async def ensure_click_partition(day: date) -> bool:
+    """Создание секции переходов за день(UTC), если её ещё нет
+
+    Переходы за этот день, попавшие в секцию по умолчанию, переносятся в новую секцию.
+
+    Args:
+        day (date): день
+
+    Returns:
+        bool: секция создана
+    """
+    name = partition_name(day)
+    async with in_transaction(PRIMARY) as conn:
+        _, rows = await conn.execute_query("SELECT to_regclass($1) IS NOT NULL AS found", [name])
+        if rows[0]["found"]:
+            return False
+
+        start, end = _day_start(day), _day_start(day + timedelta(days=1))
+        await conn.execute_script(
+            f"""
+            CREATE TABLE {name} (LIKE urlredirect INCLUDING DEFAULTS);
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE clicked_at >= '{start}' AND clicked_at < '{end}'
+                RETURNING id, clicked_at, url_id
+            )
+            INSERT INTO {name} (id, clicked_at, url_id) SELECT * FROM moved;
+            ALTER TABLE urlredirect ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}');
+            """
+        )
+
+    return True
+
+
+async def get_click_partitions() -> List[Tuple[str, date]]:
+    """Получение дневных секций переходов
+
+    Returns:
+        List[Tuple[str, date]]: пары (имя секции, день), отсортированные по дню
+    """
+    _, rows = await connections.get("default").execute_query(
+        """
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'urlredirect'::regclass
+        """
+    )
+    partitions = []
+    for row in rows:
+        match = _PARTITION_NAME.match(row["relname"])
+        if match:
+            partitions.append((row["relname"], datetime.strptime(match[1], "%Y%m%d").date()))
+
+    return sorted(partitions, key=lambda x: x[1])
+
+
+async def compact_click_partition(name: str) -> None:
+    """Перенос переходов секции в дневные суммы(URLClickDaily) и удаление секции
+
+    Args:
+        name (str): имя секции
+    """
+    async with in_transaction(PRIMARY) as conn:
+        await conn.execute_script(f"{_COMPACT_SQL.format(source=name)}; DROP TABLE {name};")
+
+
+async def compact_default_partition(before: date) -> int:
+    """Перенос в дневные суммы переходов из секции по умолчанию старше указанного дня
+
+    Args:
+        before (date): день(UTC), начиная с которого переходы остаются
+
+    Returns:
+        int: кол-во добавленных или обновлённых дневных сумм
+    """
+    async with in_transaction(PRIMARY) as conn:
+        count, _ = await conn.execute_query(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE clicked_at < $1 RETURNING url_id, clicked_at
+            )
+            {_COMPACT_SQL.format(source="moved")}
+            """,
+            [datetime.combine(before, time.min, tzinfo=timezone.utc)],
+        )
+
+    return count
+
+
+async def delete_click_buckets(before: datetime) -> int:
+    """Удаление поминутных счётчиков переходов старше указанного времени
+
+    Args:
+        before (datetime): граница времени
+
+    Returns:
+        int: кол-во удалённых счётчиков
+    """
+    count, _ = await connections.get("default").execute_query(
+        "DELETE FROM urlclickbucket WHERE bucket_start < $1", [before]
+    )
+
+    return count
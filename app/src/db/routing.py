@@ -0,0 +1,155 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import cycle
+from typing import Awaitable, Callable, Dict, Iterator, List, Tuple, TypeVar
+
+import asyncpg
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import DBConnectionError
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "default"
+REPLICA_PREFIX = "replica_"
+
+# Ошибки, после которых запрос повторяется на основной базе данных
+REPLICA_ERRORS = (
+    OSError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    DBConnectionError,
+)
+
+T = TypeVar("T")
+
+
+def parse_replicas(value: str, default_port: int) -> List[Tuple[str, int]]:
+    """Разбор списка реплик вида "host1:5432,host2"
+
+    Args:
+        value (str): список реплик через запятую
+        default_port (int): порт, если он не указан
+
+    Returns:
+        List[Tuple[str, int]]: пары (хост, порт)
+    """
+    replicas = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        host, _, port = item.partition(":")
+        replicas.append((host, int(port) if port else default_port))
+    return replicas
+
+
+class ReadRouter:
+    """Выбор соединения для чтения: реплики по кругу, при их отсутствии - основная база
+
+    Реплика, на которой запрос упал с ошибкой соединения, пропускается
+    `retry_interval` секунд, а запрос повторяется на основной базе данных.
+    """
+
+    def __init__(self, retry_interval: float = 30.0):
+        self.retry_interval = retry_interval
+        self._replicas: List[str] = []
+        self._order: Iterator[str] = iter(())
+        self._down_until: Dict[str, float] = {}
+        # Соединение, закреплённое за текущим запросом(pinned)
+        self._pinned: ContextVar[str | None] = ContextVar("read_router_pinned", default=None)
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks = 0
+
+    def configure(self, replicas: List[str], retry_interval: float) -> None:
+        """Изменение списка реплик
+
+        Args:
+            replicas (List[str]): имена соединений реплик в Tortoise
+            retry_interval (float): сколько секунд не использовать упавшую реплику
+        """
+        self._replicas = list(replicas)
+        self._order = cycle(self._replicas)
+        self._down_until.clear()
+        self.retry_interval = retry_interval
+
+    @property
+    def replicas(self) -> List[str]:
+        return self._replicas
+
+    def _next_replica(self) -> str | None:
+        now = time.monotonic()
+        pinned = self._pinned.get()
+        if pinned is not None:
+            if pinned != PRIMARY and self._down_until.get(pinned, 0) <= now:
+                return pinned
+            return None
+        for _ in range(len(self._replicas)):
+            name = next(self._order)
+            if self._down_until.get(name, 0) <= now:
+                return name
+        return None
+
+    @contextmanager
+    def pinned(self) -> Iterator[None]:
+        """Все чтения внутри блока идут в одну базу данных
+
+        Нужно, когда чтения должны видеть одно состояние: версия ответа(ETag) и сами данные
+        не должны читаться с реплик с разным отставанием. Если реплика станет недоступна,
+        оставшиеся чтения блока идут в основную базу данных
+        """
+        token = self._pinned.set(self._next_replica() or PRIMARY)
+        try:
+            yield
+        finally:
+            self._pinned.reset(token)
+
+    def connection(self) -> BaseDBAsyncClient:
+        """Соединение для чтения, допускающего отставание реплики"""
+        name = self._next_replica()
+        if name is None:
+            self.primary_reads += 1
+            return connections.get(PRIMARY)
+        self.replica_reads += 1
+        return connections.get(name)
+
+    async def read(self, query: Callable[[BaseDBAsyncClient], Awaitable[T]]) -> T:
+        """Выполнение чтения на реплике с повтором на основной базе при ошибке соединения
+
+        Args:
+            query (Callable[[BaseDBAsyncClient], Awaitable[T]]): запрос, получающий соединение
+
+        Returns:
+            T: результат запроса
+        """
+        name = self._next_replica()
+        if name is None:
+            self.primary_reads += 1
+            return await query(connections.get(PRIMARY))
+
+        try:
+            self.replica_reads += 1
+            return await query(connections.get(name))
+        except REPLICA_ERRORS as e:
+            logger.warning("replica %s failed, reading from primary: %s", name, e)
+            self._down_until[name] = time.monotonic() + self.retry_interval
+            self.fallbacks += 1
+            return await query(connections.get(PRIMARY))
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики чтений
+
+        Returns:
+            Dict[str, int]: кол-во реплик(всего и доступных), чтений с реплик и основной базы, повторов
+        """
+        now = time.monotonic()
+        return {
+            "replicas": len(self._replicas),
+            "replicas_up": sum(self._down_until.get(name, 0) <= now for name in self._replicas),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "fallbacks": self.fallbacks,
+        }
+
+
+read_router = ReadRouter()
@@ -0,0 +1,140 @@
+import logging
+
+from tortoise import Tortoise, connections
+
+from app.src.codegen import CODE_SEQUENCE
+from app.src.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Изменения схемы, которые не делает generate_schemas для уже созданных таблиц.
+# Каждая команда должна быть идемпотентной
+SCHEMA_STATEMENTS = [
+    # Короткая ссылка хранится без домена(только код), домен добавляется при выдаче
+    "UPDATE urlinfo SET link = regexp_replace(link, '^.*/', '') WHERE link LIKE '%/%'",
+    # До появления уникального индекса одна короткая ссылка могла быть выдана несколько раз.
+    # Остаётся активная(из активных - самая новая) ссылка, остальным выдаются новые коды
+    """
+    DO $$
+    DECLARE
+        duplicate RECORD;
+        new_link TEXT;
+    BEGIN
+        IF to_regclass('urlinfo_link_key') IS NOT NULL THEN
+            RETURN;
+        END IF;
+        FOR duplicate IN
+            SELECT id, link FROM (
+                SELECT id, link, row_number() OVER (
+                    PARTITION BY link ORDER BY is_active DESC, id DESC
+                ) AS n
+                FROM urlinfo
+            ) ranked
+            WHERE n > 1
+        LOOP
+            LOOP
+                new_link := substr(md5(random()::text || duplicate.id), 1, 9);
+                EXIT WHEN NOT EXISTS (SELECT 1 FROM urlinfo WHERE link = new_link);
+            END LOOP;
+            UPDATE urlinfo SET link = new_link WHERE id = duplicate.id;
+            RAISE WARNING 'duplicate link % (id %) reassigned to %', duplicate.link, duplicate.id, new_link;
+        END LOOP;
+    END $$;
+    """,
+    # Уникальность короткой ссылки(на новых базах создаётся вместе с таблицей)
+    "CREATE UNIQUE INDEX IF NOT EXISTS urlinfo_link_key ON urlinfo (link)",
+    # Переходы хранятся в таблице, секционированной по дням(clicked_at).
+    # generate_schemas создаёт обычную таблицу - переносим её в секционированную
+    """
+    DO $$
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = 'urlredirect'::regclass) = 'r' THEN
+            ALTER TABLE urlredirect RENAME TO urlredirect_legacy;
+            ALTER TABLE urlredirect_legacy RENAME CONSTRAINT urlredirect_pkey TO urlredirect_legacy_pkey;
+            ALTER SEQUENCE urlredirect_id_seq OWNED BY NONE;
+
+            CREATE TABLE urlredirect (
+                id INT NOT NULL DEFAULT nextval('urlredirect_id_seq'),
+                clicked_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                url_id INT NOT NULL REFERENCES urlinfo (id) ON DELETE CASCADE,
+                PRIMARY KEY (id, clicked_at)
+            ) PARTITION BY RANGE (clicked_at);
+            ALTER SEQUENCE urlredirect_id_seq OWNED BY urlredirect.id;
+            CREATE TABLE urlredirect_default PARTITION OF urlredirect DEFAULT;
+
+            INSERT INTO urlredirect (id, clicked_at, url_id)
+            SELECT id, clicked_at, url_id FROM urlredirect_legacy;
+            DROP TABLE urlredirect_legacy;
+        END IF;
+    END $$;
+    """,
+    # Деактивация истёкших ссылок: WHERE is_active AND due_date < ...
+    "CREATE INDEX IF NOT EXISTS urlinfo_active_due_idx ON urlinfo (due_date) WHERE is_active",
+    # Переходы ссылки за период(и каскадное удаление ссылок), создаётся во всех секциях
+    "CREATE INDEX IF NOT EXISTS urlredirect_url_clicked_idx ON urlredirect (url_id, clicked_at)",
+    # Поиск активной ссылки на тот же адрес(LINK_REUSE). Ссылки, созданные до появления
+    # колонки, остаются без хеша и не переиспользуются
+    "ALTER TABLE urlinfo ADD COLUMN IF NOT EXISTS url_hash BIGINT",
+    "CREATE INDEX IF NOT EXISTS urlinfo_active_url_hash_idx ON urlinfo (url_hash) WHERE is_active",
+    # Время последнего изменения ссылки - версия для ETag и Last-Modified списков ссылок.
+    # Колонка ведётся базой данных(в модели её нет): при создании - DEFAULT, при изменении - триггер.
+    # Существующим ссылкам достаётся время миграции
+    "ALTER TABLE urlinfo ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "ALTER TABLE urlinfo ALTER COLUMN updated_at SET DEFAULT clock_timestamp()",
+    """
+    CREATE OR REPLACE FUNCTION urlinfo_touch() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := clock_timestamp();
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER urlinfo_touch BEFORE UPDATE ON urlinfo
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION urlinfo_touch()
+    """,
+    # max(updated_at) - чтение одной записи индекса
+    "CREATE INDEX IF NOT EXISTS urlinfo_updated_at_idx ON urlinfo (updated_at)",
+]
+
+
+def _log_notice(_conn, message) -> None:
+    # NOTICE(объект уже существует) - обычное дело для идемпотентных команд
+    level = logging.WARNING if message.severity_en == "WARNING" else logging.DEBUG
+    logger.log(level, "%s", message.message)
+
+
+async def prepare_schema():
+    """Применение изменений схемы базы данных поверх generate_schemas
+
+    Ошибка любой команды прерывает миграцию(схема не должна считаться обновлённой)
+    """
+    async with connections.get("default").acquire_connection() as conn:
+        # Предупреждения команд(RAISE WARNING) попадают в лог миграции
+        conn.add_log_listener(_log_notice)
+        try:
+            for statement in SCHEMA_STATEMENTS:
+                await conn.execute(statement)
+        finally:
+            conn.remove_log_listener(_log_notice)
+
+
+async def prepare_code_sequence(block_size: int):
+    """Создание последовательности ID для кодов ссылок(CODE_MODE=sequence)
+
+    Шаг последовательности равен размеру блока: nextval возвращает конец блока,
+    воркеры при запуске только проверяют шаг(SequenceCodeGenerator.prepare)
+
+    Args:
+        block_size (int): размер блока ID(CODE_BLOCK_SIZE)
+    """
+    await connections.get("default").execute_script(
+        f"CREATE SEQUENCE IF NOT EXISTS {CODE_SEQUENCE} INCREMENT BY {block_size} START WITH {block_size};"
+        f"ALTER SEQUENCE {CODE_SEQUENCE} INCREMENT BY {block_size};"
+    )
+
+
+async def migrate():
+    """Создание и обновление схемы базы данных(python -m app.migrate)"""
+    await Tortoise.generate_schemas(safe=True)
+    await prepare_schema()
+    await prepare_code_sequence(get_settings().code_block_size)
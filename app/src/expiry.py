@@ -0,0 +1,183 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Set, Tuple
+
+import app.src.repository as URLRepository
+from app.src.cache import redirect_cache
+from app.src.leader import EXPIRY_LOCK_KEY, AdvisoryLock
+from app.src.metrics import observe_job
+from app.src.redirectindex import redirect_index
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryEngine:
+    """Деактивация ссылок точно по времени истечения их активности
+
+    Ближайшие `due_date` активных ссылок хранятся в куче. Фоновая задача спит до
+    ближайшего срока и деактивирует истёкшие ссылки пачками по `batch_size`.
+    Работает только в процессе, который держит advisory lock. Каждые `refill_interval`
+    секунд куча дополняется из базы данных ссылками со сроком в ближайшие
+    2 * `refill_interval` секунд(в том числе созданными другими процессами).
+    """
+
+    def __init__(self, batch_size: int = 500, refill_interval: float = 30.0):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._scheduled: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._horizon = datetime.min.replace(tzinfo=timezone.utc)
+        self.lock = AdvisoryLock(EXPIRY_LOCK_KEY)
+        self.batch_size = batch_size
+        self.refill_interval = refill_interval
+        self.runs = 0
+        self.batches = 0
+        self.deactivated = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.lag_sum = 0.0
+
+    def configure(self, batch_size: int, refill_interval: float) -> None:
+        """Изменение параметров
+
+        Args:
+            batch_size (int): максимальное кол-во ссылок в одном UPDATE
+            refill_interval (float): период дозагрузки сроков из базы данных(в секундах)
+        """
+        self.batch_size = max(1, batch_size)
+        self.refill_interval = refill_interval
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lock.held
+
+    def schedule(self, token: str, due_date: datetime) -> None:
+        """Добавление срока ссылки в расписание(только в процессе-лидере)
+
+        Args:
+            token (str): код ссылки
+            due_date (datetime): время истечения активности
+        """
+        if not self.is_leader or token in self._scheduled:
+            return
+
+        self._scheduled.add(token)
+        heapq.heappush(self._heap, (due_date, token))
+        if self._heap[0][1] == token:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Запуск фоновой задачи"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи и освобождение лока"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        await self.lock.release()
+        self._heap.clear()
+        self._scheduled.clear()
+
+    async def _refill(self) -> None:
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        until = now + timedelta(seconds=2 * self.refill_interval)
+        expiring = await URLRepository.get_expiring_links(until=until)
+        for token, due_date in expiring:
+            self.schedule(token, due_date)
+        observe_job("expiry_refill", started, rows=len(expiring))
+        self._horizon = now + timedelta(seconds=self.refill_interval)
+
+    async def _expire_due(self) -> None:
+        now = datetime.now(timezone.utc)
+        while self._heap and self._heap[0][0] <= now:
+            started = time.perf_counter()
+            batch = []
+            while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+                _, token = heapq.heappop(self._heap)
+                self._scheduled.discard(token)
+                batch.append(token)
+
+            expired = await URLRepository.deactivate_expired_links(batch)
+            self._record_batch(expired)
+            for token, _ in expired:
+                redirect_cache.invalidate(token)
+                redirect_index.deactivate(token)
+            observe_job("expiry", started, rows=len(expired))
+
+    def _record_batch(self, expired: List[Tuple[str, datetime]]) -> None:
+        now = datetime.now(timezone.utc)
+        self.batches += 1
+        self.deactivated += len(expired)
+        self.last_batch_size = len(expired)
+        self.max_batch_size = max(self.max_batch_size, len(expired))
+        for _, due_date in expired:
+            lag = (now - due_date).total_seconds()
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.lag_sum += lag
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not self.is_leader:
+                    if not await self.lock.try_acquire():
+                        await asyncio.sleep(self.refill_interval)
+                        continue
+                    self._heap.clear()
+                    self._scheduled.clear()
+                    await self._refill()
+
+                now = datetime.now(timezone.utc)
+                if now >= self._horizon:
+                    await self._refill()
+
+                self.runs += 1
+                await self._expire_due()
+
+                wake_at = self._horizon
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                timeout = max(0.0, (wake_at - datetime.now(timezone.utc)).total_seconds())
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                self._wakeup.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("expiry failed")
+                await self.lock.release()
+                await asyncio.sleep(self.refill_interval)
+
+    def stats(self) -> Dict[str, float]:
+        """Метрики работы: задержка деактивации(в секундах) и размеры пачек
+
+        Returns:
+            Dict[str, float]: значения метрик
+        """
+        return {
+            "is_leader": int(self.is_leader),
+            "scheduled": len(self._heap),
+            "runs": self.runs,
+            "batches": self.batches,
+            "deactivated": self.deactivated,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "last_lag_seconds": self.last_lag,
+            "max_lag_seconds": self.max_lag,
+            "lag_seconds_sum": self.lag_sum,
+        }
+
+
+expiry_engine = ExpiryEngine()
@@ -0,0 +1,116 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict
+
+from fastapi import Request, Response
+
+REDIRECT_STATUSES = (301, 302, 307)
+NO_STORE = "private, no-store"
+
+
+class RedirectPolicy:
+    """Код ответа и заголовки кэширования для переходов по коротким ссылкам
+
+    При `max_age` = 0 переходы не кэшируются(private, no-store): каждый переход
+    доходит до сервиса и учитывается в статистике. Иначе браузеры и CDN кэшируют
+    переход не дольше `max_age` секунд и не дольше срока действия ссылки. Повторные
+    переходы из кэша не учитываются, а деактивация ссылки не отзывает уже закэшированные переходы.
+    """
+
+    def __init__(self, status_code: int = 307, max_age: int = 0):
+        self.configure(status_code, max_age)
+
+    def configure(self, status_code: int, max_age: int) -> None:
+        """Изменение параметров
+
+        Args:
+            status_code (int): код ответа(301, 302 или 307)
+            max_age (int): максимальное время кэширования перехода(в секундах), 0 - не кэшировать
+        """
+        if status_code not in REDIRECT_STATUSES:
+            raise ValueError(f"Код перехода должен быть одним из {REDIRECT_STATUSES}")
+        self.status_code = status_code
+        self.max_age = max_age
+
+    def headers(self, due_date: datetime) -> Dict[str, str]:
+        """Заголовки кэширования перехода
+
+        Args:
+            due_date (datetime): срок действия ссылки
+
+        Returns:
+            Dict[str, str]: заголовок Cache-Control
+        """
+        if self.max_age <= 0:
+            return {"Cache-Control": NO_STORE}
+
+        remaining = int((due_date - datetime.now(timezone.utc)).total_seconds())
+        max_age = min(self.max_age, remaining)
+        if max_age <= 0:
+            return {"Cache-Control": NO_STORE}
+        return {"Cache-Control": f"public, max-age={max_age}"}
+
+
+def etag(request: Request, version: str) -> str:
+    """ETag по версии данных и параметрам запроса"""
+    key = f"{request.url.path}?{request.url.query}#{version}".encode()
+    return f'"{hashlib.blake2b(key, digest_size=16).hexdigest()}"'
+
+
+def _not_modified_since(request: Request, last_modified: datetime) -> bool:
+    if_modified_since = request.headers.get("if-modified-since")
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # Last-Modified передаётся с точностью до секунды
+    return last_modified.replace(microsecond=0) <= since
+
+
+async def conditional_response(
+    request: Request,
+    version: str,
+    render: Callable[[], Awaitable[bytes]],
+    last_modified: datetime | None = None,
+    media_type: str = "application/json",
+) -> Response:
+    """Ответ с ETag(и Last-Modified): 304 без построения тела, если данные не изменились
+
+    Версия получается дешёвым запросом до чтения данных, поэтому при совпадении
+    If-None-Match(или If-Modified-Since без If-None-Match) тело не строится.
+    Версия должна меняться при любом изменении данных ответа(или отставать от него ограниченное время)
+
+    Args:
+        request (Request): запрос
+        version (str): версия данных
+        render (Callable[[], Awaitable[bytes]]): построение тела ответа
+        last_modified (datetime | None, optional): время последнего изменения данных. Defaults to None.
+        media_type (str, optional): тип тела. Defaults to "application/json".
+
+    Returns:
+        Response: ответ 200 с телом или 304
+    """
+    # Ответы закрытых эндпоинтов не кэшируются посредниками, клиент перепроверяет каждый раз
+    headers = {"Cache-Control": "private, no-cache"}
+    tag = headers["ETag"] = etag(request, version)
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Сравнение слабое: W/"x" совпадает с "x"
+        candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+        if tag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    elif last_modified is not None and _not_modified_since(request, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=await render(), media_type=media_type, headers=headers)
+
+
+redirect_policy = RedirectPolicy()
@@ -0,0 +1,116 @@
+import asyncio
+import contextlib
+import logging
+import os
+import tempfile
+from typing import Dict
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from app.src.expiry import expiry_engine
+from app.src.leader import WorkerLock
+from app.src.redirectindex import redirect_index
+from app.src.retention import retention_job
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobs:
+    """Фоновые задачи(деактивация истёкших ссылок, секции переходов, индекс переходов) в одном воркере
+
+    При запуске с несколькими воркерами задачи работают только в воркере, взявшем
+    файловый лок. Остальные воркеры раз в `election_interval` секунд пробуют
+    забрать лок и запускают задачи, если выбранный воркер завершился.
+    """
+
+    def __init__(self, election_interval: float = 10.0):
+        self.lock = WorkerLock(os.path.join(tempfile.gettempdir(), "url_shorter_jobs.lock"))
+        self.election_interval = election_interval
+        self._scheduler: AsyncIOScheduler | None = None
+        self._election: asyncio.Task | None = None
+
+    def configure(self, lock_file: str | None, election_interval: float) -> None:
+        """Изменение параметров
+
+        Args:
+            lock_file (str | None): файл лока(общий для воркеров одной машины)
+            election_interval (float): период попыток забрать лок(в секундах)
+        """
+        if lock_file:
+            self.lock = WorkerLock(lock_file)
+        self.election_interval = election_interval
+
+    @property
+    def is_elected(self) -> bool:
+        return self._scheduler is not None
+
+    async def start(self) -> None:
+        """Запуск задач или ожидания выбора"""
+        if await self._try_start():
+            return
+        self._election = asyncio.create_task(self._wait_election())
+
+    async def stop(self) -> None:
+        """Остановка задач и освобождение лока"""
+        if self._election is not None:
+            self._election.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._election
+            self._election = None
+
+        await self._stop_jobs()
+        self.lock.release()
+
+    async def _stop_jobs(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+            await expiry_engine.stop()
+            await redirect_index.stop()
+
+    async def _try_start(self) -> bool:
+        if not self.lock.try_acquire():
+            return False
+
+        # Секции переходов: создаём заранее и сворачиваем старые
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(retention_job.run, CronTrigger(minute=0))
+        try:
+            self._scheduler.start()
+            await expiry_engine.start()
+            # Общий индекс переходов пишет только выбранный воркер
+            await redirect_index.start()
+        except Exception:
+            # Лок не должен остаться у воркера без задач
+            await self._stop_jobs()
+            self.lock.release()
+            raise
+        logger.info("started in worker %d", os.getpid())
+
+        # Ошибка первого прохода не отменяет выбор: следующий будет по расписанию
+        try:
+            await retention_job.run()
+        except Exception:
+            logger.exception("retention failed")
+        return True
+
+    async def _wait_election(self) -> None:
+        while True:
+            await asyncio.sleep(self.election_interval)
+            try:
+                if await self._try_start():
+                    return
+            except Exception:
+                logger.exception("jobs election failed")
+
+    def stats(self) -> Dict[str, int]:
+        """Состояние выбора
+
+        Returns:
+            Dict[str, int]: 1, если задачи работают в этом воркере
+        """
+        return {"is_elected": int(self.is_elected)}
+
+
+background_jobs = BackgroundJobs()
@@ -0,0 +1,99 @@
+import os
+
+import asyncpg
+
+from app.src.db import database_url
+
+# Ключи advisory lock'ов PostgreSQL для фоновых задач
+EXPIRY_LOCK_KEY = 0x55524C01
+RETENTION_LOCK_KEY = 0x55524C02
+# Пространство транзакционных лок'ов создания ссылки на один адрес(второй ключ - хеш адреса)
+LINK_REUSE_LOCK_SPACE = 0x55524C03
+
+
+class AdvisoryLock:
+    """Сессионный advisory lock PostgreSQL на отдельном соединении
+
+    Лок держится, пока открыто соединение, поэтому при падении процесса его
+    сразу может забрать другой процесс.
+    """
+
+    def __init__(self, key: int):
+        self.key = key
+        self._conn: asyncpg.Connection | None = None
+
+    @property
+    def held(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def try_acquire(self) -> bool:
+        """Попытка взять лок без ожидания
+
+        Returns:
+            bool: лок у текущего процесса
+        """
+        if self.held:
+            return True
+
+        conn = await asyncpg.connect(database_url())
+        if await conn.fetchval("SELECT pg_try_advisory_lock($1)", self.key):
+            self._conn = conn
+            return True
+
+        await conn.close()
+        return False
+
+    async def release(self) -> None:
+        """Освобождение лока(закрытие соединения)"""
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+class WorkerLock:
+    """Файловый лок для выбора одного воркера на машине
+
+    Лок держится открытым файлом и снимается ОС при завершении процесса.
+    Без fcntl(Windows) каждый процесс считается выбранным, дубли работы
+    исключают advisory lock'и самих задач.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: int | None = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Попытка взять лок без ожидания
+
+        Returns:
+            bool: лок у текущего процесса
+        """
+        if self.held:
+            return True
+
+        try:
+            import fcntl
+        except ImportError:
+            self._fd = -1
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """Освобождение лока(закрытие файла)"""
+        if self._fd is not None:
+            if self._fd >= 0:
+                os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,282 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+import app.src.repository as URLRepository
+from app.src.codegen import CODE_LENGTH
+from app.src.metrics import observe_job
+
+logger = logging.getLogger(__name__)
+
+# Сколько кодов добавлять в фильтр между передачами управления циклу событий
+REBUILD_CHUNK = 10_000
+# Сколько секунд ждать ссылку с пропущенным ID: транзакция с меньшим ID может
+# закоммититься позже большего, а ID отменённых транзакций не появятся никогда
+HOLE_TIMEOUT = 30.0
+# Сколько пропущенных ID отслеживать(при большем разрыве - только последние)
+MAX_HOLES = 1000
+# Коды, добавленные за столько секунд, переносятся в перестроенный фильтр: перестройка
+# читает реплику, которая может не видеть недавно созданные ссылки
+RECENT_SECONDS = 60.0
+
+
+def is_token_format(token: str) -> bool:
+    """Проверка формата кода ссылки: CODE_LENGTH латинских букв и цифр"""
+    return len(token) == CODE_LENGTH and token.isascii() and token.isalnum()
+
+
+class BloomFilter:
+    """Фильтр Блума: "точно нет" или "возможно есть" без хранения самих строк"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _hash(self, item: str) -> Tuple[int, int]:
+        # Двойное хеширование: позиции h1 + i * h2 для i от 0 до hashes - 1
+        digest = hashlib.blake2b(item.encode(), digest_size=8).digest()
+        return int.from_bytes(digest[:4], "little"), int.from_bytes(digest[4:], "little") | 1
+
+    def add(self, item: str) -> None:
+        h1, h2 = self._hash(item)
+        bits, size = self._bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = self._hash(item)
+        bits, size = self._bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def fp_rate(self) -> float:
+        """Оценка вероятности ложноположительного ответа при текущем заполнении"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class LinkFilter:
+    """Отсев переходов по несуществующим ссылкам без запросов к базе данных
+
+    Коды неверного формата отклоняются сразу. Остальные проверяются фильтром Блума
+    активных ссылок: он строится при запуске, пополняется при создании ссылок и
+    полностью перестраивается каждые `rebuild_interval` секунд(удаляя неактивные).
+
+    Ссылки, созданные другими воркерами, подгружаются по ID фоновой задачей раз в
+    `sync_interval` секунд, промах фильтра сразу считается окончательным: ссылка другого
+    воркера проходит фильтр не позже чем через `sync_interval` секунд после коммита. ID,
+    пропущенные в последовательности(транзакция ещё не закоммичена), перечитываются
+    `HOLE_TIMEOUT` секунд.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1_000_000,
+        fp_rate: float = 0.01,
+        sync_interval: float = 0.1,
+        rebuild_interval: float = 300.0,
+    ):
+        self.capacity = capacity
+        self.target_fp_rate = fp_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._bloom: BloomFilter | None = None
+        # Коды, созданные во время перестройки(переносятся в новый фильтр)
+        self._added_while_rebuilding: List[str] | None = None
+        # Все ссылки с ID не больше _max_id, кроме пропущенных(ID -> когда замечен), есть в фильтре
+        self._max_id = 0
+        self._holes: Dict[int, float] = {}
+        # (время, код) недавно добавленных ссылок
+        self._recent: Deque[Tuple[float, str]] = deque()
+        self._sync_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.rejected_format = 0
+        self.rejected_filter = 0
+        self.passed = 0
+        self.passed_not_found = 0
+        self.syncs = 0
+        self.rebuilds = 0
+
+    def configure(
+        self, capacity: int, fp_rate: float, sync_interval: float, rebuild_interval: float
+    ) -> None:
+        """Изменение параметров
+
+        Args:
+            capacity (int): ожидаемое кол-во активных ссылок, 0 - фильтр Блума выключен
+            fp_rate (float): допустимая доля ложноположительных ответов
+            sync_interval (float): период подгрузки новых ссылок(в секундах)
+            rebuild_interval (float): период полной перестройки фильтра(в секундах)
+        """
+        self.capacity = capacity
+        self.target_fp_rate = fp_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    async def start(self) -> None:
+        """Построение фильтра и запуск подгрузки и периодической перестройки"""
+        if not self.enabled:
+            return
+        await self.rebuild()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка подгрузки и перестройки"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def rebuild(self) -> None:
+        """Построение фильтра по активным ссылкам"""
+        started = time.perf_counter()
+        async with self._sync_lock:
+            self._added_while_rebuilding = []
+            try:
+                rows = await URLRepository.get_link_tokens(only_active=True, replica=True)
+                bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.target_fp_rate)
+                for i, (_, token) in enumerate(rows):
+                    bloom.add(token)
+                    # Не занимаем цикл событий надолго при большом кол-ве ссылок
+                    if i % REBUILD_CHUNK == REBUILD_CHUNK - 1:
+                        await asyncio.sleep(0)
+                for _, token in self._recent:
+                    bloom.add(token)
+                for token in self._added_while_rebuilding:
+                    bloom.add(token)
+            finally:
+                self._added_while_rebuilding = None
+            if self._bloom is None:
+                # Первое построение: дальше подгружаются ссылки с большими ID, а последние
+                # отсутствующие ID(неактивные или ещё не закоммиченные) перечитываются
+                now = time.monotonic()
+                self._max_id = max((link_id for link_id, _ in rows), default=0)
+                recent_ids = range(max(1, self._max_id - MAX_HOLES + 1), self._max_id + 1)
+                self._holes = dict.fromkeys(recent_ids, now)
+                for link_id, _ in rows:
+                    self._holes.pop(link_id, None)
+            self._bloom = bloom
+            self.rebuilds += 1
+        observe_job("link_filter_rebuild", started, rows=len(rows))
+
+    async def sync(self) -> None:
+        """Подгрузка ссылок, созданных после последней подгрузки(в том числе другими воркерами)"""
+        async with self._sync_lock:
+            if self._bloom is None:
+                return
+            now = time.monotonic()
+            rows = await URLRepository.get_link_tokens(after_id=self._scan_from(now))
+            for link_id, token in rows:
+                if link_id > self._max_id:
+                    for missing in range(max(self._max_id + 1, link_id - MAX_HOLES), link_id):
+                        self._holes[missing] = now
+                    self._max_id = link_id
+                elif self._holes.pop(link_id, None) is None:
+                    # Ссылка уже в фильтре
+                    continue
+                self._add(token, now)
+            self.syncs += 1
+
+    def _scan_from(self, now: float) -> int:
+        # Пропущенные ID, которые так и не появились, считаются отменёнными
+        for link_id in [link_id for link_id, seen in self._holes.items() if now - seen > HOLE_TIMEOUT]:
+            del self._holes[link_id]
+        if len(self._holes) > MAX_HOLES:
+            for link_id in sorted(self._holes)[: len(self._holes) - MAX_HOLES]:
+                del self._holes[link_id]
+        return min(self._holes) - 1 if self._holes else self._max_id
+
+    def _add(self, token: str, now: float) -> None:
+        self._bloom.add(token)  # type: ignore
+        self._recent.append((now, token))
+        while self._recent and now - self._recent[0][0] > RECENT_SECONDS:
+            self._recent.popleft()
+
+    async def _run(self) -> None:
+        last_rebuild = time.monotonic()
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                if time.monotonic() - last_rebuild >= self.rebuild_interval:
+                    await self.rebuild()
+                    last_rebuild = time.monotonic()
+                else:
+                    await self.sync()
+            except Exception:
+                logger.exception("link filter sync failed")
+
+    def add(self, token: str) -> None:
+        """Добавление кода созданной ссылки
+
+        Args:
+            token (str): код ссылки
+        """
+        if self._bloom is not None:
+            self._add(token, time.monotonic())
+        if self._added_while_rebuilding is not None:
+            self._added_while_rebuilding.append(token)
+
+    def might_exist(self, token: str) -> bool:
+        """Проверка, может ли существовать активная ссылка с таким кодом(без ожидания подгрузки)
+
+        Args:
+            token (str): код ссылки
+
+        Returns:
+            bool: False - ссылки точно нет, True - нужна проверка в базе данных
+        """
+        if not is_token_format(token):
+            self.rejected_format += 1
+            return False
+
+        if self._bloom is None or token in self._bloom:
+            self.passed += 1
+            return True
+
+        self.rejected_filter += 1
+        return False
+
+    def record_not_found(self) -> None:
+        """Учёт ссылки, пропущенной фильтром, но не найденной в базе данных"""
+        self.passed_not_found += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Счётчики отсева и заполнение фильтра
+
+        Returns:
+            Dict[str, float]: отклонённые по формату и фильтром, пропущенные, оценка доли ложноположительных
+        """
+        return {
+            "items": self._bloom.count if self._bloom else 0,
+            "size_bits": self._bloom.size if self._bloom else 0,
+            "hashes": self._bloom.hashes if self._bloom else 0,
+            "estimated_fp_rate": self._bloom.fp_rate if self._bloom else 0.0,
+            "rejected_format": self.rejected_format,
+            "rejected_filter": self.rejected_filter,
+            "passed": self.passed,
+            "passed_not_found": self.passed_not_found,
+            "syncs": self.syncs,
+            "rebuilds": self.rebuilds,
+        }
+
+
+link_filter = LinkFilter()
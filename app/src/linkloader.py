@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import app.src.repository as URLRepository
+from app.src.cache import CachedLink, redirect_cache
+
+
+class LinkLoader:
+    """Объединение поиска ссылок при переходе(DataLoader)
+
+    Одновременные запросы одного кода ждут один запрос к базе данных(single-flight).
+    Разные коды, запрошенные в течение `window` секунд, ищутся одним запросом
+    `WHERE link = ANY($1)`, пачка отправляется раньше, если набралось `batch_size` кодов.
+
+    Вместе со ссылкой возвращается эпоха кэша до отправки запроса: её нужно передать
+    в `redirect_cache.put`, в том числе запросам, дождавшимся чужого поиска.
+    """
+
+    def __init__(self, window: float = 0.0005, batch_size: int = 100):
+        self.window = window
+        self.batch_size = batch_size
+        # Код -> результат поиска, пока запрос к базе данных не завершён
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.lookups = 0
+        self.shared = 0
+        self.queries = 0
+        self.max_batch = 0
+
+    def configure(self, window: float, batch_size: int) -> None:
+        """Изменение параметров
+
+        Args:
+            window (float): время сбора пачки кодов(в секундах)
+            batch_size (int): максимальное кол-во кодов в одном запросе
+        """
+        self.window = max(0.0, window)
+        self.batch_size = max(1, batch_size)
+
+    async def load(self, token: str) -> Tuple[CachedLink | None, int]:
+        """Поиск активной ссылки
+
+        Args:
+            token (str): код ссылки
+
+        Returns:
+            Tuple[CachedLink | None, int]: ссылка или None, если активной ссылки нет,
+            и эпоха кэша до запроса к базе данных
+        """
+        self.lookups += 1
+        future = self._in_flight.get(token)
+        if future is not None:
+            self.shared += 1
+        else:
+            future = self._in_flight[token] = asyncio.get_running_loop().create_future()
+            self._pending.append(token)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        # Отмена одного запроса не отменяет поиск для остальных ожидающих
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        tokens, self._pending = self._pending, []
+        if not tokens:
+            return
+        task = asyncio.create_task(self._fetch(tokens))
+        # Ссылка на задачу хранится до её завершения
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, tokens: List[str]) -> None:
+        self.queries += 1
+        self.max_batch = max(self.max_batch, len(tokens))
+        epoch = redirect_cache.epoch
+        links: Dict[str, Tuple[int, str, datetime]] | None = None
+        error: Exception | None = None
+        try:
+            links = await URLRepository.get_orig_links(tokens)
+        except Exception as e:
+            error = e
+        finally:
+            # Ожидающие получают результат, ошибку или отмену(если отменён сам поиск)
+            for token in tokens:
+                future = self._in_flight.pop(token)
+                if future.done():
+                    continue
+                if links is not None:
+                    row = links.get(token)
+                    link = (
+                        CachedLink(id=row[0], original_link=row[1], is_active=True, due_date=row[2])
+                        if row is not None
+                        else None
+                    )
+                    future.set_result((link, epoch))
+                elif error is not None:
+                    future.set_exception(error)
+                    # Ошибку получат ожидающие, если они ещё есть
+                    future.exception()
+                else:
+                    future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        """Поиски ссылок и сэкономленные запросы к базе данных
+
+        Returns:
+            Dict[str, int]: поиски, из них дождавшиеся чужого запроса, запросы к базе данных,
+            сэкономленные запросы, максимальный размер пачки
+        """
+        return {
+            "lookups": self.lookups,
+            "shared": self.shared,
+            "queries": self.queries,
+            "queries_saved": max(0, self.lookups - self.queries - len(self._pending)),
+            "max_batch": self.max_batch,
+        }
+
+
+link_loader = LinkLoader()
@@ -0,0 +1,232 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple
+
+import asyncpg
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PREFIX = "urlshorter"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Счётчик с метками в формате Prometheus"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = f"{PREFIX}_{name}"
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма с метками в формате Prometheus"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = f"{PREFIX}_{name}"
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # По меткам: счётчики по корзинам(последняя - +Inf), сумма значений
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def total(self) -> float:
+        """Сумма наблюдённых значений по всем меткам"""
+        return sum(total[0] for _, total in self._values.values())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}")
+            labels_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{labels_str} {total[0]}")
+            lines.append(f"{self.name}_count{labels_str} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Набор метрик и источников метрик(функций stats() подсистем)"""
+
+    def __init__(self):
+        self._metrics: List[Counter | Histogram] = []
+        self._collectors: Dict[str, Callable[[], Mapping[str, float]]] = {}
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, name: str, collect: Callable[[], Mapping[str, float]]) -> None:
+        """Добавление источника метрик
+
+        Args:
+            name (str): имя подсистемы(префикс метрик)
+            collect (Callable[[], Mapping[str, float]]): функция, возвращающая значения метрик
+        """
+        self._collectors[name] = collect
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus
+
+        Returns:
+            str: текст для /metrics
+        """
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for subsystem, collect in self._collectors.items():
+            for key, value in collect().items():
+                name = f"{PREFIX}_{subsystem}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(
+    Counter("http_requests_total", "Кол-во HTTP запросов", ("method", "route", "status"))
+)
+HTTP_LATENCY = registry.register(
+    Histogram("http_request_duration_seconds", "Время обработки HTTP запроса", ("method", "route"))
+)
+HTTP_DB_QUERIES = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "Кол-во запросов к базе данных за HTTP запрос",
+        ("route",),
+        buckets=COUNT_BUCKETS,
+    )
+)
+HTTP_DB_TIME = registry.register(
+    Histogram(
+        "http_request_db_duration_seconds", "Время запросов к базе данных за HTTP запрос", ("route",)
+    )
+)
+DB_QUERIES = registry.register(Counter("db_queries_total", "Кол-во запросов к базе данных"))
+DB_QUERY_TIME = registry.register(
+    Histogram("db_query_duration_seconds", "Время выполнения запроса к базе данных")
+)
+JOB_DURATION = registry.register(
+    Histogram("job_duration_seconds", "Время выполнения фоновой задачи", ("job",))
+)
+JOB_ROWS = registry.register(
+    Counter("job_rows_total", "Кол-во строк, затронутых фоновой задачей", ("job",))
+)
+
+# Кол-во и время запросов к базе данных в текущем HTTP запросе
+_request_db_stats: ContextVar[List[float] | None] = ContextVar("request_db_stats", default=None)
+
+
+def record_query(record: asyncpg.connection.LoggedQuery) -> None:
+    DB_QUERIES.inc()
+    DB_QUERY_TIME.observe(record.elapsed)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += record.elapsed
+
+
+async def instrument_connection(conn: asyncpg.Connection) -> None:
+    """Подключение учёта запросов к соединению пула(init для asyncpg.create_pool)
+
+    Служебный запрос, которым пул сбрасывает соединение при возврате(get_reset_query),
+    не учитывается: иначе каждый HTTP запрос получал бы лишний запрос к базе данных.
+
+    Args:
+        conn (asyncpg.Connection): соединение
+    """
+    reset_query = conn.get_reset_query()
+
+    def record(record: asyncpg.connection.LoggedQuery) -> None:
+        if record.query != reset_query:
+            record_query(record)
+
+    conn.add_query_logger(record)
+
+
+def observe_job(job: str, started: float, rows: int = 0) -> None:
+    """Учёт выполнения фоновой задачи
+
+    Args:
+        job (str): имя задачи
+        started (float): время начала(time.perf_counter())
+        rows (int, optional): кол-во затронутых строк. Defaults to 0.
+    """
+    JOB_DURATION.observe(time.perf_counter() - started, job)
+    if rows:
+        JOB_ROWS.inc(rows, job)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: время обработки, статусы и запросы к базе данных по маршрутам"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db_stats = [0, 0.0]
+        token = _request_db_stats.set(db_stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(1, scope["method"], path, str(status))
+            HTTP_LATENCY.observe(elapsed, scope["method"], path)
+            HTTP_DB_QUERIES.observe(db_stats[0], path)
+            HTTP_DB_TIME.observe(db_stats[1], path)
@@ -0,0 +1,443 @@
+import asyncio
+import contextlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
+
+import app.src.repository as URLRepository
+from app.src.cache import CachedLink
+from app.src.codegen import CODE_LENGTH
+from app.src.metrics import observe_job
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"URLIDX01"
+# Заголовок: магия, флаг "файл заменён", поколение, кол-во слотов, кол-во ссылок,
+# начало и размер области строк, занято в области строк, последний ID ссылки
+HEADER = struct.Struct("<8sB7xQQQQQQQ")
+STALE_OFFSET = 8
+# Слот: код ссылки, флаги, ID ссылки, длина и смещение оригинальной ссылки, срок(мкс UTC)
+SLOT = struct.Struct(f"<{CODE_LENGTH}sB2xiIQq")
+FLAGS_OFFSET = CODE_LENGTH
+DUE = struct.Struct("<q")
+DUE_OFFSET = SLOT.size - DUE.size
+OCCUPIED = 1
+ACTIVE = 2
+# Доля занятых слотов таблицы и запас под ссылки, созданные после перестройки
+LOAD_FACTOR = 0.7
+HEADROOM = 0.5
+MIN_HEADROOM = 1024
+# Сколько ссылок обрабатывать между передачами управления циклу событий
+BUILD_CHUNK = 10_000
+# updated_at ставится при UPDATE, а видна строка после коммита: деактивации перечитываются с запасом
+CHANGES_OVERLAP = timedelta(seconds=30)
+EPOCH = datetime.fromtimestamp(0, timezone.utc)
+
+
+def _to_micros(value: datetime) -> int:
+    return int(value.timestamp() * 1_000_000)
+
+
+class _Index:
+    """Открытый файл индекса(отображение в память)"""
+
+    def __init__(self, path: str):
+        with open(path, "r+b") as file:
+            self.mm = mmap.mmap(file.fileno(), 0)
+        magic, _, self.generation, self.slot_count, _, self.strings_offset, self.strings_capacity, _, _ = (
+            HEADER.unpack_from(self.mm)
+        )
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{path}: не файл индекса переходов")
+
+    @property
+    def stale(self) -> bool:
+        return self.mm[STALE_OFFSET] != 0
+
+    def header(self) -> Tuple[int, int]:
+        """Кол-во ссылок и последний ID ссылки"""
+        fields = HEADER.unpack_from(self.mm)
+        return fields[4], fields[8]
+
+    def _find(self, key: bytes) -> int:
+        """Смещение слота с кодом или -1"""
+        mm, slot_count = self.mm, self.slot_count
+        i = zlib.crc32(key) % slot_count
+        for _ in range(slot_count):
+            offset = HEADER.size + i * SLOT.size
+            if mm[offset + FLAGS_OFFSET] == 0:
+                return -1
+            if mm[offset : offset + CODE_LENGTH] == key:
+                return offset
+            i = (i + 1) % slot_count
+        return -1
+
+    def get(self, key: bytes) -> CachedLink | None:
+        offset = self._find(key)
+        if offset < 0:
+            return None
+        _, flags, link_id, length, string_offset, due = SLOT.unpack_from(self.mm, offset)
+        start = self.strings_offset + string_offset
+        return CachedLink(
+            id=link_id,
+            original_link=self.mm[start : start + length].decode(),
+            is_active=bool(flags & ACTIVE),
+            due_date=datetime.fromtimestamp(due / 1_000_000, timezone.utc),
+        )
+
+    def is_inactive(self, key: bytes) -> bool:
+        offset = self._find(key)
+        return offset >= 0 and not self.mm[offset + FLAGS_OFFSET] & ACTIVE
+
+    def deactivate(self, key: bytes) -> bool:
+        offset = self._find(key)
+        if offset < 0:
+            return False
+        # Снятие флага - запись одного байта, её может делать любой воркер
+        self.mm[offset + FLAGS_OFFSET] = OCCUPIED
+        return True
+
+    def set_due(self, key: bytes, due_date: datetime) -> bool:
+        offset = self._find(key)
+        if offset < 0:
+            return False
+        DUE.pack_into(self.mm, offset + DUE_OFFSET, _to_micros(due_date))
+        return True
+
+    def insert(self, link_id: int, token: str, original_link: str, due_date: datetime) -> bool:
+        """Добавление ссылки(только процессом, который пишет индекс)
+
+        Returns:
+            bool: False, если в таблице или области строк нет места
+        """
+        mm = self.mm
+        *_, count, _, _, strings_used, last_id = HEADER.unpack_from(mm)
+        data = original_link.encode()
+        key = token.encode()
+        if count + 1 > self.slot_count * LOAD_FACTOR or strings_used + len(data) > self.strings_capacity:
+            return False
+        if self._find(key) >= 0:
+            return True
+
+        start = self.strings_offset + strings_used
+        mm[start : start + len(data)] = data
+        i = zlib.crc32(key) % self.slot_count
+        while mm[HEADER.size + i * SLOT.size + FLAGS_OFFSET] != 0:
+            i = (i + 1) % self.slot_count
+        offset = HEADER.size + i * SLOT.size
+        # Слот заполняется с пустыми флагами, флаги пишутся последними: читатели
+        # видят либо пустой слот, либо заполненный целиком
+        SLOT.pack_into(mm, offset, key, 0, link_id, len(data), strings_used, _to_micros(due_date))
+        mm[offset + FLAGS_OFFSET] = OCCUPIED | ACTIVE
+        HEADER.pack_into(
+            mm, 0, MAGIC, mm[STALE_OFFSET], self.generation, self.slot_count, count + 1,
+            self.strings_offset, self.strings_capacity, strings_used + len(data), max(last_id, link_id),
+        )  # fmt: skip
+        return True
+
+    def inactive_tokens(self) -> List[bytes]:
+        """Коды ссылок с снятым флагом активности"""
+        slots_end = HEADER.size + self.slot_count * SLOT.size
+        flags = self.mm[HEADER.size + FLAGS_OFFSET : slots_end : SLOT.size]
+        tokens = []
+        i = flags.find(OCCUPIED)
+        while i >= 0:
+            offset = HEADER.size + i * SLOT.size
+            tokens.append(self.mm[offset : offset + CODE_LENGTH])
+            i = flags.find(OCCUPIED, i + 1)
+        return tokens
+
+    def close(self) -> None:
+        self.mm.close()
+
+
+class RedirectIndex:
+    """Общий для воркеров машины индекс активных ссылок в файле, отображённом в память
+
+    Хеш-таблица с открытой адресацией: код ссылки -> ID, смещение оригинальной ссылки
+    в области строк, срок действия и флаг активности. Память занимает страничный кэш ОС
+    один раз на машину, а не кэш каждого воркера.
+
+    Индекс пишет один процесс(воркер с фоновыми задачами): перестраивает его из `URLInfo`
+    раз в `rebuild_interval` секунд в новый файл и подменяет старый, а между перестройками
+    раз в `sync_interval` секунд добавляет созданные ссылки. Деактивация снимает флаг,
+    а продление меняет срок на месте в любом воркере. Деактивации в обход этого индекса
+    (другая машина, прямой UPDATE в базе данных) переносятся при синхронизации по `updated_at`.
+    Читатели замечают подмену файла по флагу в заголовке старого.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        sync_interval: float = 1.0,
+        rebuild_interval: float = 300.0,
+        enabled: bool = False,
+    ):
+        self.path = path or os.path.join(tempfile.gettempdir(), "url_shorter_redirects.idx")
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.enabled = enabled
+        self._index: _Index | None = None
+        self._next_open = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._deactivated_since: datetime | None = None
+        self.hits = 0
+        self.misses = 0
+        self.reopens = 0
+        self.rebuilds = 0
+
+    def configure(self, enabled: bool, path: str | None, sync_interval: float, rebuild_interval: float) -> None:
+        """Изменение параметров
+
+        Args:
+            enabled (bool): использовать индекс
+            path (str | None): файл индекса(общий для воркеров одной машины)
+            sync_interval (float): период добавления созданных ссылок(в секундах)
+            rebuild_interval (float): период полной перестройки(в секундах)
+        """
+        self.enabled = enabled
+        if path:
+            self.path = path
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+
+    def _current(self) -> _Index | None:
+        index = self._index
+        if index is not None and not index.stale:
+            return index
+
+        # Файла может ещё не быть(индекс не построен), пробуем открыть не чаще раза в секунду
+        now = time.monotonic()
+        if index is None and now < self._next_open:
+            return None
+        self._next_open = now + 1.0
+        try:
+            new_index = _Index(self.path)
+        except (OSError, ValueError):
+            return index
+        if index is not None:
+            index.close()
+        self._index = new_index
+        self.reopens += 1
+        return new_index
+
+    def get(self, token: str) -> CachedLink | None:
+        """Поиск ссылки в индексе
+
+        Args:
+            token (str): код ссылки
+
+        Returns:
+            CachedLink | None: ссылка(is_active=False - деактивирована) или None, если её нет в индексе
+        """
+        if not self.enabled or len(token) != CODE_LENGTH or not token.isascii():
+            return None
+        index = self._current()
+        link = index.get(token.encode()) if index is not None else None
+        if link is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return link
+
+    def inactive(self, token: str) -> bool:
+        """Проверка флага активности без чтения ссылки(для записей кэша воркера)
+
+        Args:
+            token (str): код ссылки
+
+        Returns:
+            bool: True, если ссылка есть в индексе и деактивирована(в том числе другим воркером)
+        """
+        if not self.enabled or len(token) != CODE_LENGTH or not token.isascii():
+            return False
+        index = self._current()
+        return index is not None and index.is_inactive(token.encode())
+
+    def deactivate(self, token: str) -> None:
+        """Снятие флага активности(после деактивации в базе данных)
+
+        Args:
+            token (str): код ссылки
+        """
+        self._patch(token, lambda index, key: index.deactivate(key))
+
+    def extend(self, token: str, due_date: datetime) -> None:
+        """Изменение срока действия(после продления в базе данных)
+
+        Args:
+            token (str): код ссылки
+            due_date (datetime): новое время истечения активности
+        """
+        self._patch(token, lambda index, key: index.set_due(key, due_date))
+
+    def _patch(self, token: str, apply: Callable[[_Index, bytes], bool]) -> None:
+        if not self.enabled or len(token) != CODE_LENGTH or not token.isascii():
+            return
+        key = token.encode()
+        index = self._current()
+        while index is not None:
+            apply(index, key)
+            # Файл подменили во время записи: изменение повторяется в новом файле
+            if not index.stale or (next_index := self._current()) is index:
+                return
+            index = next_index
+
+    async def start(self) -> None:
+        """Построение индекса и запуск обновления(в процессе, который пишет индекс)"""
+        if not self.enabled:
+            return
+        await self.rebuild()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка обновления"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        last_rebuild = time.monotonic()
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                if time.monotonic() - last_rebuild >= self.rebuild_interval or not await self.sync():
+                    await self.rebuild()
+                    last_rebuild = time.monotonic()
+            except Exception:
+                logger.exception("redirect index sync failed")
+
+    async def rebuild(self) -> None:
+        """Построение индекса по активным ссылкам в новый файл и подмена старого"""
+        started = time.perf_counter()
+        async with self._lock:
+            old = self._current()
+            # Деактивации после этого времени могут не попасть в выборку - их перенесёт sync
+            deactivated_since = await URLRepository.get_last_update() or EPOCH
+            rows = await URLRepository.get_active_links()
+            generation = old.generation + 1 if old is not None else 1
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            last_id = await self._write(tmp_path, rows, generation)
+            os.replace(tmp_path, self.path)
+
+            new = _Index(self.path)
+            old_last_id = 0
+            if old is not None:
+                # Читатели старого файла переоткроют индекс. Деактивации, сделанные после
+                # чтения ссылок из базы данных, переносятся из старого файла
+                old.mm[STALE_OFFSET] = 1
+                for key in old.inactive_tokens():
+                    new.deactivate(key)
+                old_last_id = old.header()[1]
+                old.close()
+            self._index = new
+            self._deactivated_since = deactivated_since
+            self.rebuilds += 1
+            # Ссылки, которых не было в старом файле, сверяются с базой данных
+            await self._recheck(new, old_last_id, last_id)
+        observe_job("redirect_index_rebuild", started, rows=len(rows))
+
+    async def sync(self) -> bool:
+        """Добавление ссылок, созданных после последнего обновления, и перенос деактиваций
+
+        Returns:
+            bool: False, если места в индексе не хватило(нужна перестройка)
+        """
+        async with self._lock:
+            index = self._current()
+            if index is None:
+                return False
+            _, last_id = index.header()
+            rows = await URLRepository.get_active_links(after_id=last_id)
+            for link_id, token, original_link, due_date in rows:
+                if not index.insert(link_id, token, original_link, due_date):
+                    return False
+            if rows:
+                await self._recheck(index, last_id, rows[-1][0])
+            await self._apply_deactivations(index)
+        return True
+
+    async def _apply_deactivations(self, index: _Index) -> None:
+        if self._deactivated_since is None:
+            return
+        rows = await URLRepository.get_deactivated_tokens(since=self._deactivated_since - CHANGES_OVERLAP)
+        for token, updated_at in rows:
+            index.deactivate(token.encode())
+            self._deactivated_since = max(self._deactivated_since, updated_at)
+
+    async def _recheck(self, index: _Index, after_id: int, until_id: int) -> None:
+        # Ссылка могла быть деактивирована между чтением из базы и записью в индекс,
+        # когда воркеру нечего было помечать. Деактивации после этой проверки пометят индекс сами
+        if until_id <= after_id:
+            return
+        for token in await URLRepository.get_inactive_tokens(after_id=after_id, until_id=until_id):
+            index.deactivate(token.encode())
+
+    async def _write(self, path: str, rows: List[Tuple[int, str, str, datetime]], generation: int) -> int:
+        count = len(rows)
+        slot_count = max(1, int((count + max(MIN_HEADROOM, int(count * HEADROOM))) / LOAD_FACTOR))
+        strings = [original_link.encode() for _, _, original_link, _ in rows]
+        strings_size = sum(map(len, strings))
+        strings_capacity = int(strings_size * (1 + HEADROOM)) + MIN_HEADROOM * 256
+        strings_offset = HEADER.size + slot_count * SLOT.size
+
+        with open(path, "w+b") as file:
+            file.truncate(strings_offset + strings_capacity)
+            mm = mmap.mmap(file.fileno(), 0)
+        try:
+            used = 0
+            last_id = 0
+            for n, ((link_id, token, _, due_date), data) in enumerate(zip(rows, strings)):
+                key = token.encode()
+                i = zlib.crc32(key) % slot_count
+                while mm[HEADER.size + i * SLOT.size + FLAGS_OFFSET] != 0:
+                    i = (i + 1) % slot_count
+                SLOT.pack_into(
+                    mm, HEADER.size + i * SLOT.size,
+                    key, OCCUPIED | ACTIVE, link_id, len(data), used, _to_micros(due_date),
+                )  # fmt: skip
+                mm[strings_offset + used : strings_offset + used + len(data)] = data
+                used += len(data)
+                last_id = max(last_id, link_id)
+                if n % BUILD_CHUNK == BUILD_CHUNK - 1:
+                    await asyncio.sleep(0)
+            HEADER.pack_into(
+                mm, 0, MAGIC, 0, generation, slot_count, count,
+                strings_offset, strings_capacity, used, last_id,
+            )  # fmt: skip
+            mm.flush()
+        finally:
+            mm.close()
+        return last_id
+
+    def stats(self) -> Dict[str, int]:
+        """Попадания в индекс и его заполнение
+
+        Returns:
+            Dict[str, int]: попадания, промахи, кол-во ссылок и слотов, поколение файла, перестройки
+        """
+        index = self._index
+        count = index.header()[0] if index is not None else 0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "items": count,
+            "slots": index.slot_count if index is not None else 0,
+            "generation": index.generation if index is not None else 0,
+            "reopens": self.reopens,
+            "rebuilds": self.rebuilds,
+        }
+
+
+redirect_index = RedirectIndex()
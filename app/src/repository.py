@@ -1,120 +1,655 @@
+import json
+import logging
+from collections import Counter
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Tuple
+from typing import Any, AsyncIterator, Callable, ContextManager, Dict, List, Tuple
+
+from tortoise import connections
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
 
 from app.src.db.models import URLInfo, URLRedirect
+from app.src.db.routing import PRIMARY, read_router
+from app.src.leader import LINK_REUSE_LOCK_SPACE
+
+logger = logging.getLogger(__name__)
 
 
 async def get_all_links(
-    type: bool | None = None, offset_min: int = 0, offset_max: int = 30
-) -> Tuple[List[URLInfo], int]:
-    """Получение всех ссылок по заданным параметрам
+    type: bool | None = None, offset: int = 0, limit: int = 30, after_id: int | None = None
+) -> List[Tuple[int, str, str, bool, datetime]]:
+    """Получение страницы ссылок по заданным параметрам(сортировка по ID)
 
     Args:
         type (bool | None, optional): какие ссылки показывать(все/активные/неактивные). Defaults to None.
-        offset_min (int, optional): откуда начинать выборку. Defaults to 0.
-        offset_max (int, optional): где заканчивать выборку. Defaults to 30.
+        offset (int, optional): сколько ссылок пропустить. Defaults to 0.
+        limit (int, optional): сколько ссылок вернуть. Defaults to 30.
+        after_id (int | None, optional): курсор - вернуть ссылки с ID больше указанного(offset не используется). Defaults to None.
 
     Returns:
-        Tuple[List[URLInfo], int]: список ссылок полученных и общее число ссылок по заданным параметрам
+        List[Tuple[int, str, str, bool, datetime]]: ссылки (ID, код, оригинальная ссылка, активна, срок)
     """
-    if type is None:
-        links = await URLInfo.all()
+    query = URLInfo.all() if type is None else URLInfo.filter(is_active=type)
+    if after_id is not None:
+        query = query.filter(id__gt=after_id)
     else:
-        links = await URLInfo.all().filter(is_active=type)
-    links.sort(key=lambda x: x.id)
+        query = query.offset(offset)
+    query = query.order_by("id").limit(limit)
+
+    # Кортежи вместо объектов модели: ответ собирается из них без лишних преобразований
+    return await read_router.read(
+        lambda conn: query.using_db(conn).values_list(
+            "id", "link", "original_link", "is_active", "due_date"
+        )
+    )  # type: ignore
+
+
+async def count_links(type: bool | None = None, estimate: bool = False) -> int:
+    """Подсчёт кол-ва ссылок по заданным параметрам
+
+    Args:
+        type (bool | None, optional): какие ссылки считать(все/активные/неактивные). Defaults to None.
+        estimate (bool, optional): вернуть оценку планировщика вместо точного COUNT. Defaults to False.
+
+    Returns:
+        int: кол-во ссылок
+    """
+    query = URLInfo.all() if type is None else URLInfo.filter(is_active=type)
+    if not estimate:
+        return await read_router.read(lambda conn: query.using_db(conn).count())  # type: ignore
+
+    sql = f"EXPLAIN (FORMAT JSON) {query.sql(params_inline=True)}"
+    _, plan = await read_router.read(lambda conn: conn.execute_query(sql))
+    plan = plan[0]["QUERY PLAN"]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
 
-    return links[offset_min:offset_max], len(links)
+    return int(plan[0]["Plan"]["Plan Rows"])
 
 
-async def get_orig_link(short_link: str) -> URLInfo | None:
+def pinned_reads() -> ContextManager[None]:
+    """Чтения внутри блока идут в одну базу данных(см. ReadRouter.pinned)"""
+    return read_router.pinned()
+
+
+async def get_links_version() -> Tuple[int | None, datetime | None]:
+    """Последний ID и время последнего изменения ссылок(по первичному ключу и индексу по updated_at)
+
+    Returns:
+        Tuple[int | None, datetime | None]: ID и время изменения(None, если ссылок нет)
+    """
+    rows = await read_router.read(
+        lambda conn: conn.execute_query_dict(
+            "SELECT max(id) AS max_id, max(updated_at) AS updated_at FROM urlinfo"
+        )
+    )
+    return rows[0]["max_id"], rows[0]["updated_at"]
+
+
+async def get_clicks_version() -> int | None:
+    """ID последнего записанного перехода
+
+    Returns:
+        int | None: ID перехода или None, если переходов нет
+    """
+    rows = await read_router.read(
+        lambda conn: conn.execute_query_dict("SELECT max(id) AS version FROM urlredirect")
+    )
+    return rows[0]["version"]
+
+
+async def get_orig_link(token: str) -> URLInfo | None:
     """Получение оригинальной ссылки по короткой
 
+    Читается с реплики. Ссылки, которой ещё нет на реплике(переход сразу после
+    создания), ищутся в основной базе данных.
+
     Args:
-        short_link (str): короткая ссылка
+        token (str): код короткой ссылки
 
     Returns:
         URLInfo | None: оригинальная ссылка, если она есть в базе данных
     """
-    res = await URLInfo.get_or_none(link=short_link, is_active=True)
+    query = URLInfo.filter(link=token, is_active=True).first()
+    res = await read_router.read(lambda conn: query.using_db(conn))
+    if not res and read_router.replicas:
+        res = await query.using_db(connections.get(PRIMARY))
     if not res:
         return None
 
     return res
 
 
-async def change_activate_status(short_link: str) -> bool:
-    """Изменение активности ссылки
+async def get_orig_links(tokens: List[str]) -> Dict[str, Tuple[int, str, datetime]]:
+    """Получение активных оригинальных ссылок по нескольким кодам одним запросом
+
+    Читается с реплики, ненайденные коды ищутся в основной базе данных(как в get_orig_link).
 
     Args:
-        short_link (str): ссылка, у которой нужно изменить параметр
+        tokens (List[str]): коды коротких ссылок
 
     Returns:
-        bool: True, если ссылка есть и активность изменена. False, если ссылки нет в базе данных
+        Dict[str, Tuple[int, str, datetime]]: код -> (ID, оригинальная ссылка, срок действия)
     """
-    url = await URLInfo.get_or_none(link=short_link)
-    if not url or not url.is_active:
-        return False
-
-    url.is_active = False
-    await url.save()
+    query = """
+        SELECT id, link, original_link, due_date FROM urlinfo
+        WHERE link = ANY($1::text[]) AND is_active
+    """
+    rows = await read_router.read(lambda conn: conn.execute_query_dict(query, [tokens]))
+    links = {row["link"]: (row["id"], row["original_link"], row["due_date"]) for row in rows}
+    missing = [token for token in tokens if token not in links]
+    if missing and read_router.replicas:
+        rows = await connections.get(PRIMARY).execute_query_dict(query, [missing])
+        links.update(
+            {row["link"]: (row["id"], row["original_link"], row["due_date"]) for row in rows}
+        )
 
-    return True
+    return links
 
 
-async def change_statistic(short_link: str):
-    """Запись времени клика по ссылке(перехода)
+async def change_activate_status(token: str) -> bool:
+    """Изменение активности ссылки
 
     Args:
-        short_link (str): короткая ссылка
+        token (str): код ссылки, у которой нужно изменить параметр
+
+    Returns:
+        bool: True, если ссылка есть и активность изменена. False, если ссылки нет в базе данных
     """
-    url = await URLInfo.get(link=short_link)
-    await URLRedirect.create(url_id=url.id)
+    # Один UPDATE вместо чтения и сохранения: одновременные деактивации не мешают друг другу
+    return await URLInfo.filter(link=token, is_active=True).update(is_active=False) > 0
 
 
-async def get_stats(link_id: int) -> Dict[str, int]:
-    """Получение статистики за час и день у ссылки
+async def write_clicks(clicks: List[Tuple[int, datetime]]):
+    """Пакетная запись переходов по ссылкам и обновление поминутных счётчиков
 
     Args:
-        link_id (int): ID ссылки, у которой нужно получить статистику
-
-    Returns:
-        Dict[str, int]: данные статистики
+        clicks (List[Tuple[int, datetime]]): пары (ID ссылки, время перехода)
     """
-    now = datetime.now(timezone.utc)
+    buckets = Counter(
+        (url_id, clicked_at.replace(second=0, microsecond=0)) for url_id, clicked_at in clicks
+    )
 
-    hour_stats = await URLRedirect.filter(
-        url_id=link_id, clicked_at__gte=now - timedelta(hours=1)
-    ).count()
+    async with in_transaction(PRIMARY) as conn:
+        await URLRedirect.bulk_create(
+            [URLRedirect(url_id=url_id, clicked_at=clicked_at) for url_id, clicked_at in clicks],
+            using_db=conn,
+        )
+        await conn.execute_query(
+            """
+            INSERT INTO urlclickbucket (url_id, bucket_start, clicks)
+            SELECT * FROM unnest($1::int[], $2::timestamptz[], $3::int[])
+            ON CONFLICT (url_id, bucket_start)
+            DO UPDATE SET clicks = urlclickbucket.clicks + EXCLUDED.clicks
+            """,
+            [
+                [url_id for url_id, _ in buckets],
+                [bucket_start for _, bucket_start in buckets],
+                list(buckets.values()),
+            ],
+        )
+
+
+async def get_stats(offset: int = 0, limit: int = 30) -> List[Dict]:
+    """Получение страницы ссылок со статистикой за час и день, от популярных к менее популярным
+
+    Статистика считается по поминутным счётчикам(`URLClickBucket`) за последние сутки,
+    поэтому время запроса не зависит от всей истории переходов.
 
-    day_stats = await URLRedirect.filter(
-        url_id=link_id, clicked_at__gte=now - timedelta(days=1)
-    ).count()
+    Args:
+        offset (int, optional): сколько ссылок пропустить. Defaults to 0.
+        limit (int, optional): сколько ссылок вернуть. Defaults to 30.
 
-    return {"hour_stats": hour_stats, "day_stats": day_stats}
+    Returns:
+        List[Dict]: данные ссылок со статистикой(hour_stats, day_stats)
+    """
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+    return await read_router.read(
+        lambda conn: conn.execute_query_dict(
+            """
+        WITH agg AS (
+            SELECT url_id,
+                   SUM(clicks) FILTER (WHERE bucket_start >= $1) AS hour_stats,
+                   SUM(clicks) AS day_stats
+            FROM urlclickbucket
+            WHERE bucket_start >= $2
+            GROUP BY url_id
+        )
+        SELECT u.link, u.original_link, u.is_active, u.due_date,
+               COALESCE(agg.hour_stats, 0) AS hour_stats,
+               COALESCE(agg.day_stats, 0) AS day_stats
+        FROM urlinfo u
+        LEFT JOIN agg ON agg.url_id = u.id
+        ORDER BY day_stats DESC, hour_stats DESC, u.id
+        LIMIT $3 OFFSET $4
+        """,
+            [now - timedelta(hours=1), now - timedelta(days=1), limit, offset],
+        )
+    )
 
 
-async def write_short_link(original_link: str, short_link: str, due_date: datetime) -> bool:
+async def write_short_link(
+    original_link: str, token: str, due_date: datetime, url_hash: int | None = None
+) -> bool:
     """Запись данных короткой ссылки в базу данных
 
     Args:
         original_link (str): оригинальная ссылка
-        short_link (str): короткая(сгенерированная) ссылка
+        token (str): код короткой(сгенерированной) ссылки
         due_date (datetime): время истечения активности
+        url_hash (int | None, optional): хеш нормализованной оригинальной ссылки. Defaults to None.
+
+    Raises:
+        IntegrityError: короткая ссылка уже существует
 
     Returns:
         bool: создана запись или нет
     """
     try:
-        await URLInfo.create(original_link=original_link, link=short_link, due_date=due_date)
+        await URLInfo.create(
+            original_link=original_link, link=token, due_date=due_date, url_hash=url_hash
+        )
+        return True
+    except IntegrityError:
+        raise
+    except Exception:
+        logger.exception("cannot write short link %s", token)
+        return False
+
+
+async def write_short_links(links: List[Tuple[str, str, int]], due_date: datetime) -> bool:
+    """Пакетная запись коротких ссылок в базу данных одной транзакцией
+
+    Args:
+        links (List[Tuple[str, str, int]]): (оригинальная ссылка, код короткой ссылки, хеш оригинальной ссылки)
+        due_date (datetime): время истечения активности
+
+    Raises:
+        IntegrityError: одна из коротких ссылок уже существует(ничего не записано)
+
+    Returns:
+        bool: созданы записи или нет
+    """
+    try:
+        async with in_transaction(PRIMARY) as conn:
+            await URLInfo.bulk_create(
+                [
+                    URLInfo(
+                        original_link=original_link, link=token, due_date=due_date, url_hash=url_hash
+                    )
+                    for original_link, token, url_hash in links
+                ],
+                batch_size=1000,
+                using_db=conn,
+            )
         return True
-    except Exception as e:
-        print(f"\033[031mERROR:\t  {e}\033[0m]")
+    except IntegrityError:
+        raise
+    except Exception:
+        logger.exception("cannot write %d short links", len(links))
         return False
 
 
-async def change_expired_links_status():
-    """Проверка актуальности активных ссылок(для Apscheduler)"""
-    print(f"\033[034mCRON:\033[0m\t  {datetime.now(timezone.utc)}")
-    await URLInfo.filter(is_active=True, due_date__lt=datetime.now(timezone.utc)).update(
-        is_active=False
+async def find_reusable_link(
+    url_hash: int, is_same: Callable[[str], bool], using_db: Any = None
+) -> Tuple[str, datetime] | None:
+    """Поиск активной ссылки на тот же адрес по индексу хеша
+
+    Args:
+        url_hash (int): хеш нормализованной оригинальной ссылки
+        is_same (Callable[[str], bool]): проверка, что original_link найденной ссылки - тот же адрес(на случай совпадения хешей)
+        using_db (Any, optional): соединение(транзакция). Defaults to None - основная база данных.
+
+    Returns:
+        Tuple[str, datetime] | None: (код ссылки, время истечения активности) или None
+    """
+    rows = await URLInfo.filter(
+        url_hash=url_hash, is_active=True, due_date__gt=datetime.now(timezone.utc)
+    ).using_db(using_db or connections.get(PRIMARY)).values_list("link", "original_link", "due_date")
+    for token, original_link, due_date in rows:
+        if is_same(original_link):
+            return token, due_date
+    return None
+
+
+async def reuse_or_write_short_link(
+    original_link: str,
+    token: str,
+    due_date: datetime,
+    url_hash: int,
+    is_same: Callable[[str], bool],
+) -> Tuple[str, datetime, bool] | None:
+    """Возврат активной ссылки на тот же адрес или запись новой
+
+    Поиск и запись выполняются в транзакции под advisory lock'ом хеша адреса, поэтому
+    одновременные запросы с одним адресом создают одну ссылку.
+
+    Args:
+        original_link (str): оригинальная ссылка
+        token (str): код для новой ссылки(если подходящей нет)
+        due_date (datetime): время истечения активности новой ссылки
+        url_hash (int): хеш нормализованной оригинальной ссылки
+        is_same (Callable[[str], bool]): проверка, что original_link найденной ссылки - тот же адрес
+
+    Raises:
+        IntegrityError: короткая ссылка с кодом token уже существует
+
+    Returns:
+        Tuple[str, datetime, bool] | None: (код ссылки, время истечения активности, создана ли новая ссылка) или None при ошибке
+    """
+    # Лок на два int4: младшие 32 бита хеша, пространство отдельное от лок'ов задач
+    lock_key = (url_hash & 0xFFFFFFFF) - (1 << 32 if url_hash & 0x80000000 else 0)
+    try:
+        async with in_transaction(PRIMARY) as conn:
+            await conn.execute_query(
+                "SELECT pg_advisory_xact_lock($1, $2)", [LINK_REUSE_LOCK_SPACE, lock_key]
+            )
+            existing = await find_reusable_link(url_hash, is_same, using_db=conn)
+            if existing is not None:
+                return *existing, False
+
+            await URLInfo.create(
+                original_link=original_link,
+                link=token,
+                due_date=due_date,
+                url_hash=url_hash,
+                using_db=conn,
+            )
+        return token, due_date, True
+    except IntegrityError:
+        raise
+    except Exception:
+        logger.exception("cannot reuse or write short link %s", token)
+        return None
+
+
+async def get_link_tokens(
+    after_id: int = 0, only_active: bool = False, replica: bool = False
+) -> List[Tuple[int, str]]:
+    """Получение кодов ссылок(для фильтра существующих ссылок)
+
+    Args:
+        after_id (int, optional): вернуть ссылки с ID больше указанного. Defaults to 0.
+        only_active (bool, optional): только активные ссылки. Defaults to False.
+        replica (bool, optional): можно читать с реплики(с отставанием). Defaults to False.
+
+    Returns:
+        List[Tuple[int, str]]: пары (ID ссылки, код ссылки)
+    """
+    query = URLInfo.filter(id__gt=after_id)
+    if only_active:
+        query = query.filter(is_active=True)
+    if not replica:
+        return await query.values_list("id", "link")  # type: ignore
+
+    return await read_router.read(lambda conn: query.using_db(conn).values_list("id", "link"))  # type: ignore
+
+
+async def get_active_links(after_id: int = 0) -> List[Tuple[int, str, str, datetime]]:
+    """Получение активных ссылок(для общего индекса переходов)
+
+    Args:
+        after_id (int, optional): вернуть ссылки с ID больше указанного. Defaults to 0.
+
+    Returns:
+        List[Tuple[int, str, str, datetime]]: (ID ссылки, код, оригинальная ссылка, срок) по возрастанию ID
+    """
+    return await URLInfo.filter(id__gt=after_id, is_active=True).order_by("id").values_list(
+        "id", "link", "original_link", "due_date"
+    )  # type: ignore
+
+
+async def get_inactive_tokens(after_id: int, until_id: int) -> List[str]:
+    """Получение кодов неактивных ссылок в диапазоне ID
+
+    Args:
+        after_id (int): ID больше указанного
+        until_id (int): ID не больше указанного
+
+    Returns:
+        List[str]: коды ссылок
+    """
+    return await URLInfo.filter(
+        id__gt=after_id, id__lte=until_id, is_active=False
+    ).values_list("link", flat=True)  # type: ignore
+
+
+async def get_last_update() -> datetime | None:
+    """Время последнего изменения ссылок в основной базе данных(индекс по updated_at)
+
+    Returns:
+        datetime | None: время изменения или None, если ссылок нет
+    """
+    rows = await connections.get(PRIMARY).execute_query_dict(
+        "SELECT max(updated_at) AS updated_at FROM urlinfo"
+    )
+    return rows[0]["updated_at"]
+
+
+async def get_deactivated_tokens(since: datetime) -> List[Tuple[str, datetime]]:
+    """Получение кодов ссылок, деактивированных после указанного времени(для общего индекса переходов)
+
+    Args:
+        since (datetime): updated_at больше указанного
+
+    Returns:
+        List[Tuple[str, datetime]]: коды ссылок и время их изменения
+    """
+    rows = await connections.get(PRIMARY).execute_query_dict(
+        "SELECT link, updated_at FROM urlinfo WHERE updated_at > $1 AND NOT is_active", [since]
+    )
+    return [(row["link"], row["updated_at"]) for row in rows]
+
+
+async def get_expiring_links(until: datetime) -> List[Tuple[str, datetime]]:
+    """Получение активных ссылок, срок которых истекает до указанного времени
+
+    Args:
+        until (datetime): граница срока действия
+
+    Returns:
+        List[Tuple[str, datetime]]: пары (код ссылки, время истечения активности)
+    """
+    return await URLInfo.filter(is_active=True, due_date__lt=until).values_list(
+        "link", "due_date"
+    )  # type: ignore
+
+
+async def deactivate_expired_links(tokens: List[str]) -> List[Tuple[str, datetime]]:
+    """Деактивация ссылок из списка, срок которых уже истёк, одним запросом
+
+    Args:
+        tokens (List[str]): коды ссылок
+
+    Returns:
+        List[Tuple[str, datetime]]: коды деактивированных ссылок и время истечения их активности
+    """
+    rows = await connections.get(PRIMARY).execute_query_dict(
+        """
+        UPDATE urlinfo SET is_active = FALSE
+        WHERE link = ANY($1::text[]) AND is_active AND due_date <= now()
+        RETURNING link, due_date
+        """,
+        [tokens],
+    )
+
+    return [(row["link"], row["due_date"]) for row in rows]
+
+
+def _bulk_filters(
+    tokens: List[str] | None,
+    original_prefix: str | None,
+    due_after: datetime | None,
+    due_before: datetime | None,
+) -> Tuple[str, List[Any]]:
+    conditions, params = ["is_active"], []
+    if tokens is not None:
+        params.append(tokens)
+        conditions.append(f"link = ANY(${len(params)}::text[])")
+    if original_prefix is not None:
+        params.append(original_prefix)
+        conditions.append(f"starts_with(original_link, ${len(params)})")
+    if due_after is not None:
+        params.append(due_after)
+        conditions.append(f"due_date >= ${len(params)}")
+    if due_before is not None:
+        params.append(due_before)
+        conditions.append(f"due_date < ${len(params)}")
+
+    return " AND ".join(conditions), params
+
+
+async def deactivate_links(
+    tokens: List[str] | None = None,
+    original_prefix: str | None = None,
+    due_after: datetime | None = None,
+    due_before: datetime | None = None,
+) -> List[Tuple[str, datetime]]:
+    """Деактивация активных ссылок из списка или по фильтру одним запросом
+
+    Args:
+        tokens (List[str] | None, optional): коды ссылок. Defaults to None.
+        original_prefix (str | None, optional): начало оригинальной ссылки. Defaults to None.
+        due_after (datetime | None, optional): due_date не раньше. Defaults to None.
+        due_before (datetime | None, optional): due_date раньше. Defaults to None.
+
+    Returns:
+        List[Tuple[str, datetime]]: коды деактивированных ссылок и время истечения их активности
+    """
+    where, params = _bulk_filters(tokens, original_prefix, due_after, due_before)
+    rows = await connections.get(PRIMARY).execute_query_dict(
+        f"UPDATE urlinfo SET is_active = FALSE WHERE {where} RETURNING link, due_date", params
+    )
+
+    return [(row["link"], row["due_date"]) for row in rows]
+
+
+async def extend_links(
+    minutes: int,
+    tokens: List[str] | None = None,
+    original_prefix: str | None = None,
+    due_after: datetime | None = None,
+    due_before: datetime | None = None,
+) -> List[Tuple[str, datetime]]:
+    """Продление действующих ссылок из списка или по фильтру одним запросом
+
+    Продлеваются только активные ссылки, срок которых ещё не истёк.
+
+    Args:
+        minutes (int): на сколько минут продлить
+        tokens (List[str] | None, optional): коды ссылок. Defaults to None.
+        original_prefix (str | None, optional): начало оригинальной ссылки. Defaults to None.
+        due_after (datetime | None, optional): due_date не раньше. Defaults to None.
+        due_before (datetime | None, optional): due_date раньше. Defaults to None.
+
+    Returns:
+        List[Tuple[str, datetime]]: коды продлённых ссылок и новое время истечения их активности
+    """
+    where, params = _bulk_filters(tokens, original_prefix, due_after, due_before)
+    params.append(minutes)
+    rows = await connections.get(PRIMARY).execute_query_dict(
+        f"""
+        UPDATE urlinfo SET due_date = due_date + make_interval(mins => ${len(params)})
+        WHERE {where} AND due_date > now()
+        RETURNING link, due_date
+        """,
+        params,
     )
+
+    return [(row["link"], row["due_date"]) for row in rows]
+
+
+async def get_existing_tokens(tokens: List[str]) -> List[str]:
+    """Получение кодов ссылок, которые есть в базе данных(в том числе неактивных)
+
+    Args:
+        tokens (List[str]): коды ссылок
+
+    Returns:
+        List[str]: коды существующих ссылок
+    """
+    return await URLInfo.filter(link__in=tokens).values_list("link", flat=True)  # type: ignore
+
+
+async def _stream(query: str, params: List[Any], batch_size: int) -> AsyncIterator[List[Dict]]:
+    """Чтение результата запроса пачками через серверный курсор
+
+    Следующая пачка запрашивается, только когда потребитель забрал предыдущую,
+    поэтому в памяти не больше одной пачки, а медленный клиент приостанавливает курсор.
+    """
+    async with read_router.connection().acquire_connection() as connection:
+        async with connection.transaction():
+            cursor = await connection.cursor(query, *params)
+            while rows := await cursor.fetch(batch_size):
+                yield [dict(row) for row in rows]
+
+
+def _export_filters(
+    column: str, type: bool | None, since: datetime | None, until: datetime | None
+) -> Tuple[str, List[Any]]:
+    conditions, params = [], []
+    if type is not None:
+        params.append(type)
+        conditions.append(f"u.is_active = ${len(params)}")
+    if since is not None:
+        params.append(since)
+        conditions.append(f"{column} >= ${len(params)}")
+    if until is not None:
+        params.append(until)
+        conditions.append(f"{column} < ${len(params)}")
+
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
+async def stream_links(
+    type: bool | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[List[Dict]]:
+    """Выгрузка ссылок пачками(сортировка по ID)
+
+    Args:
+        type (bool | None, optional): какие ссылки выгружать(все/активные/неактивные). Defaults to None.
+        since (datetime | None, optional): due_date не раньше. Defaults to None.
+        until (datetime | None, optional): due_date раньше. Defaults to None.
+        batch_size (int, optional): размер пачки. Defaults to 1000.
+
+    Yields:
+        List[Dict]: пачка ссылок(id, link, original_link, is_active, due_date)
+    """
+    where, params = _export_filters("u.due_date", type, since, until)
+    query = f"""
+        SELECT u.id, u.link, u.original_link, u.is_active, u.due_date
+        FROM urlinfo u {where}
+        ORDER BY u.id
+    """
+    async for rows in _stream(query, params, batch_size):
+        yield rows
+
+
+async def stream_clicks(
+    type: bool | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[List[Dict]]:
+    """Выгрузка сырых переходов пачками
+
+    Args:
+        type (bool | None, optional): переходы по всем/активным/неактивным ссылкам. Defaults to None.
+        since (datetime | None, optional): время перехода не раньше. Defaults to None.
+        until (datetime | None, optional): время перехода раньше. Defaults to None.
+        batch_size (int, optional): размер пачки. Defaults to 1000.
+
+    Yields:
+        List[Dict]: пачка переходов(id, url_id, link, clicked_at)
+    """
+    where, params = _export_filters("r.clicked_at", type, since, until)
+    query = f"""
+        SELECT r.id, r.url_id, u.link, r.clicked_at
+        FROM urlredirect r JOIN urlinfo u ON u.id = r.url_id {where}
+    """
+    async for rows in _stream(query, params, batch_size):
+        yield rows
@@ -0,0 +1,92 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+from app.src.db.partitions import (
+    compact_click_partition,
+    compact_default_partition,
+    delete_click_buckets,
+    ensure_click_partition,
+    get_click_partitions,
+)
+from app.src.leader import RETENTION_LOCK_KEY, AdvisoryLock
+from app.src.metrics import observe_job
+
+logger = logging.getLogger(__name__)
+
+# Поминутные счётчики нужны только для статистики за последние сутки
+CLICK_BUCKETS_KEEP = timedelta(days=2)
+
+
+class RetentionJob:
+    """Обслуживание секций переходов(для Apscheduler)
+
+    Создаёт дневные секции URLRedirect на `partitions_ahead` дней вперёд, а секции
+    старше `retention_days` дней сворачивает в дневные суммы(URLClickDaily) и удаляет.
+    Одновременно задача выполняется только в одном процессе(advisory lock).
+    """
+
+    def __init__(self, retention_days: int = 30, partitions_ahead: int = 3):
+        self.lock = AdvisoryLock(RETENTION_LOCK_KEY)
+        self.retention_days = retention_days
+        self.partitions_ahead = partitions_ahead
+        self.runs = 0
+        self.partitions_created = 0
+        self.partitions_compacted = 0
+        self.buckets_deleted = 0
+
+    def configure(self, retention_days: int, partitions_ahead: int) -> None:
+        """Изменение параметров
+
+        Args:
+            retention_days (int): сколько дней хранить сырые переходы
+            partitions_ahead (int): на сколько дней вперёд создавать секции
+        """
+        self.retention_days = max(1, retention_days)
+        self.partitions_ahead = max(1, partitions_ahead)
+
+    async def run(self) -> None:
+        if not await self.lock.try_acquire():
+            return
+
+        started = time.perf_counter()
+        buckets_deleted = 0
+        try:
+            now = datetime.now(timezone.utc)
+            today = now.date()
+            logger.info("retention at %s", now)
+
+            for days in range(self.partitions_ahead + 1):
+                if await ensure_click_partition(today + timedelta(days=days)):
+                    self.partitions_created += 1
+
+            cutoff = today - timedelta(days=self.retention_days)
+            for name, day in await get_click_partitions():
+                if day < cutoff:
+                    await compact_click_partition(name)
+                    self.partitions_compacted += 1
+            await compact_default_partition(before=cutoff)
+
+            buckets_deleted = await delete_click_buckets(before=now - CLICK_BUCKETS_KEEP)
+            self.buckets_deleted += buckets_deleted
+            self.runs += 1
+        finally:
+            await self.lock.release()
+            observe_job("retention", started, rows=buckets_deleted)
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики работы задачи
+
+        Returns:
+            Dict[str, int]: кол-во запусков, созданных и свёрнутых секций
+        """
+        return {
+            "runs": self.runs,
+            "partitions_created": self.partitions_created,
+            "partitions_compacted": self.partitions_compacted,
+            "buckets_deleted": self.buckets_deleted,
+        }
+
+
+retention_job = RetentionJob()
@@ -1,11 +1,19 @@
-from typing import Annotated, Literal
+from datetime import datetime
+from typing import Annotated, Any, AsyncIterator, List, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from starlette.types import Receive, Scope, Send
 
 import app.src.services as URLService
+from app.src.httpcache import conditional_response
+from app.src.metrics import registry
 from app.src.schemas import (
+    BulkCreatedLink,
+    BulkExtendLinks,
+    BulkUpdatedLink,
+    BulkUpdateLinks,
     CreatedLinkData,
     CreateShortLink,
     DeactivateShortLink,
@@ -13,7 +21,9 @@ from app.src.schemas import (
     LinkInfo,
     Message,
     StatisticLinkInfo,
+    TrendingInfo,
 )
+from app.src.serialization import dumps
 
 security = HTTPBasic()
 private_router = APIRouter(prefix="/private", tags=["Private Endpoints"])
@@ -22,22 +32,71 @@ private_router = APIRouter(prefix="/private", tags=["Private Endpoints"])
 @private_router.get("/all_links", response_model=Message[LinkInfo])
 async def get_all_links(
     credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+    request: Request,
     filter: Annotated[Literal["all", "active", "inactive"], Query()] = "all",
     page: int = Query(ge=1, default=1),
     size: int = Query(ge=1, default=30),
+    after_id: int | None = Query(
+        ge=0, default=None, description="ID последней ссылки предыдущей страницы(курсор вместо page)"
+    ),
+    total: Annotated[
+        Literal["exact", "estimate", "none"],
+        Query(description="Подсчёт общего кол-ва страниц: точный, оценка или без подсчёта"),
+    ] = "exact",
 ):
-    """## Получение информации обо всех созданных ссылок"""
-    return await URLService.get_all_links(filter=filter, page=page, size=size)
+    """## Получение информации обо всех созданных ссылок
+
+    Ответ содержит ETag и Last-Modified: если ссылки не менялись, повторный запрос с
+    If-None-Match(If-Modified-Since) вернёт 304 без чтения страницы. Версия меняется
+    не реже раза в минуту
+    """
+
+    async def render() -> bytes:
+        return dumps(
+            await URLService.get_all_links(
+                filter=filter, page=page, size=size, after_id=after_id, total=total
+            )
+        )
+
+    with URLService.pinned_reads():
+        version, last_modified = await URLService.get_links_version()
+        return await conditional_response(request, version, render, last_modified=last_modified)
 
 
 @private_router.get("/links_stats", response_model=Message[StatisticLinkInfo])
 async def get_links_stats(
     credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+    request: Request,
     page: int = Query(ge=1, default=1),
     size: int = Query(ge=1, default=30),
 ):
-    """## Получение статистики о переходах ссылок(за час и за день) в порядке от посещаемых к менее посещаемым"""
-    return await URLService.get_stats(page=page, size=size)
+    """## Получение статистики о переходах ссылок(за час и за день) в порядке от посещаемых к менее посещаемым
+
+    Ответ содержит ETag: если ссылки и переходы не менялись, повторный запрос с If-None-Match
+    в ту же минуту вернёт 304 без подсчёта статистики
+    """
+
+    async def render() -> bytes:
+        return dumps(await URLService.get_stats(page=page, size=size))
+
+    with URLService.pinned_reads():
+        version = await URLService.get_stats_version()
+        return await conditional_response(request, version, render)
+
+
+@private_router.get("/trending", response_model=TrendingInfo)
+async def get_trending(
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+    window: Annotated[Literal["hour", "day"], Query()] = "hour",
+    limit: int = Query(ge=1, le=100, default=10),
+):
+    """## Самые популярные ссылки за последний час или день без запросов к базе данных
+
+    Оценки приблизительные(Space-Saving): каждая завышена не больше чем на `error_bound`,
+    окно сдвигается интервалами(5 минут для часа, час для дня). Считается по переходам
+    в процессе-воркере, обработавшем запрос
+    """
+    return URLService.get_trending(window=window, limit=limit)
 
 
 @private_router.post(
@@ -65,6 +124,107 @@ async def generate_short_url(
     return created
 
 
+@private_router.post("/generate_links", response_model=List[BulkCreatedLink])
+async def generate_short_urls(
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+    items: Annotated[
+        List[Any],
+        Body(
+            description="Список ссылок в формате CreateShortLink",
+            examples=[[{"url": "https://example.com"}, {"url": "https://example.org"}]],
+        ),
+    ],
+):
+    """## Массовое создание коротких ссылок
+
+    Результат возвращается по каждому элементу: созданная ссылка или причина ошибки
+    """
+    return await URLService.generate_urls(items)
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Потоковый ответ, который не слушает receive
+
+    Обычный StreamingResponse параллельно ждёт отключения клиента через receive и
+    забирает сообщения с телом запроса, которое здесь читается во время ответа
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    rest = b""
+    async for chunk in request.stream():
+        *lines, rest = (rest + chunk).split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if rest.strip():
+        yield rest
+
+
+@private_router.post(
+    "/generate_links/stream",
+    responses={
+        200: {
+            "description": "NDJSON: по строке BulkCreatedLink на каждую строку запроса",
+            "content": {"application/x-ndjson": {}},
+        }
+    },
+)
+async def generate_short_urls_stream(
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)], request: Request
+):
+    """## Массовое создание коротких ссылок из потока NDJSON
+
+    Тело запроса - строки вида `{"url": "..."}`, ответ - строки BulkCreatedLink в том же порядке.
+    Запрос обрабатывается пачками, поэтому размер не ограничен памятью сервиса
+    """
+
+    async def results() -> AsyncIterator[str]:
+        async for result in URLService.generate_urls_stream(_ndjson_lines(request)):
+            yield result.model_dump_json() + "\n"
+
+    return NDJSONStreamingResponse(results())
+
+
+@private_router.get(
+    "/export/{kind}",
+    responses={
+        200: {
+            "description": "Строки выгрузки в формате NDJSON или CSV(с заголовком)",
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+        }
+    },
+)
+async def export(
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+    kind: Literal["links", "clicks"],
+    format: Annotated[Literal["ndjson", "csv"], Query()] = "ndjson",
+    filter: Annotated[
+        Literal["all", "active", "inactive"], Query(description="По каким ссылкам выгружать")
+    ] = "all",
+    since: Annotated[
+        datetime | None,
+        Query(description="Начало периода: due_date для ссылок, время перехода для переходов"),
+    ] = None,
+    until: Annotated[datetime | None, Query(description="Конец периода(не включительно)")] = None,
+):
+    """## Потоковая выгрузка ссылок(links) или сырых переходов(clicks)
+
+    Строки читаются серверным курсором пачками и отправляются по мере чтения, поэтому
+    размер выгрузки не ограничен памятью сервиса. Переходы выгружаются без сортировки
+    """
+    return StreamingResponse(
+        URLService.export(kind=kind, format=format, filter=filter, since=since, until=until),
+        media_type="application/x-ndjson" if format == "ndjson" else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'},
+    )
+
+
 @private_router.put(
     "/deactivate",
     responses={
@@ -87,3 +247,33 @@ async def deactivate_link(
     return JSONResponse(
         content={"message": "link deactivated"},
     )
+
+
+@private_router.put("/deactivate_links", response_model=List[BulkUpdatedLink])
+async def deactivate_links(
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)], data: BulkUpdateLinks
+):
+    """## Массовая деактивация ссылок из списка или по фильтру
+
+    Выполняется одним запросом к базе данных. Результат возвращается по каждой ссылке
+    списка, а для фильтра - список деактивированных ссылок
+    """
+    return await URLService.deactivate_links(data)
+
+
+@private_router.put("/extend_links", response_model=List[BulkUpdatedLink])
+async def extend_links(
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)], data: BulkExtendLinks
+):
+    """## Массовое продление действующих ссылок из списка или по фильтру
+
+    Выполняется одним запросом к базе данных. Результат возвращается по каждой ссылке
+    списка, а для фильтра - список продлённых ссылок с новым сроком
+    """
+    return await URLService.extend_links(data)
+
+
+@private_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(credentials: Annotated[HTTPBasicCredentials, Depends(security)]):
+    """## Метрики сервиса в текстовом формате Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, status
 from starlette.responses import RedirectResponse
 
 import app.src.services as URLService
+from app.src.httpcache import redirect_policy
 from app.src.schemas import ErrorSchema
 
 public_router = APIRouter(tags=["Public Endpoints"])
@@ -17,12 +18,19 @@ public_router = APIRouter(tags=["Public Endpoints"])
     },
 )
 async def follow_the_link(short_url: str):
-    """## Осуществляет переход по короткой ссылке на оригинальную"""
-    original_link = await URLService.get_original_url(short_link=short_url)
-    if not original_link:
+    """## Осуществляет переход по короткой ссылке на оригинальную
+
+    Код ответа и время кэширования перехода задаются REDIRECT_STATUS и REDIRECT_MAX_AGE
+    """
+    link = await URLService.get_original_url(short_link=short_url)
+    if not link:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="cannot find active link!"
         )
-    response = RedirectResponse(url=original_link)
+    response = RedirectResponse(
+        url=link.original_link,
+        status_code=redirect_policy.status_code,
+        headers=redirect_policy.headers(link.due_date),
+    )
 
     return response
@@ -1,9 +1,16 @@
-import os
 import re
 from datetime import datetime
-from typing import Annotated, Generic, List, TypeVar
+from typing import Annotated, Generic, List, Literal, TypeVar
 
-from pydantic import AfterValidator, BaseModel, Field
+from pydantic import AfterValidator, BaseModel, Field, model_validator
+
+from app.src.codegen import CODE_LENGTH
+from app.src.config.settings import get_settings
+
+URL_PATTERN = re.compile(r"(?:(?:https?|ftp):\/\/)?[\w/\-?=%.]+\.[\w/\-?=%.]+")
+TOKEN_PATTERN = re.compile(rf"[0-9A-Za-z]{{{CODE_LENGTH}}}")
+# Максимальное кол-во ссылок в одном запросе массового изменения
+BULK_UPDATE_MAX_ITEMS = 10_000
 
 
 def is_url(value: str) -> str:
@@ -19,8 +26,7 @@ def is_url(value: str) -> str:
         str: URL адрес
     """
     value = value.strip()
-    http_and_https_pattern = re.compile(r"(?:(?:https?|ftp):\/\/)?[\w/\-?=%.]+\.[\w/\-?=%.]+")
-    if not http_and_https_pattern.match(value):
+    if not URL_PATTERN.match(value):
         raise ValueError("URL адрес не является корректным!")
     return value
 
@@ -38,9 +44,9 @@ def is_my_url(value: str) -> str:
         str: URL адрес
     """
     value = value.strip()
-    domen = f"{os.getenv('DOMEN')}/"
-    my_url = re.compile(r"^%s.{9}$" % domen)
-    if not my_url.match(value):
+    # Домен сравнивается как строка(без подстановки в регулярное выражение), код - по шаблону
+    prefix = get_settings().short_url_prefix
+    if not (value.startswith(prefix) and TOKEN_PATTERN.fullmatch(value, len(prefix))):
         raise ValueError("URL адрес сгенерирован не этим сервисом")
     return value
 
@@ -63,6 +69,55 @@ class CreatedLinkData(BaseModel):
     due_date: datetime = Field(description="Дата и время истечения активности ссылки")
 
 
+class BulkCreatedLink(BaseModel):
+    index: int = Field(description="Номер ссылки в запросе(с 0)")
+    created: CreatedLinkData | None = Field(default=None, description="Данные созданной ссылки")
+    error: str | None = Field(default=None, description="Причина, по которой ссылка не создана")
+
+
+class LinksFilter(BaseModel):
+    original_prefix: str | None = Field(
+        default=None, min_length=1, description="Начало оригинальной ссылки(например, адрес кампании)"
+    )
+    due_after: datetime | None = Field(default=None, description="Срок действия не раньше")
+    due_before: datetime | None = Field(default=None, description="Срок действия раньше")
+
+    @model_validator(mode="after")
+    def not_empty(self):
+        # Пустой фильтр изменил бы все ссылки сервиса
+        if self.original_prefix is None and self.due_after is None and self.due_before is None:
+            raise ValueError("Фильтр должен содержать хотя бы одно условие")
+        return self
+
+
+class BulkUpdateLinks(BaseModel):
+    short_urls: List[str] | None = Field(
+        default=None, max_length=BULK_UPDATE_MAX_ITEMS, description="Короткие ссылки"
+    )
+    filter: LinksFilter | None = Field(default=None, description="Условие вместо списка ссылок")
+
+    @model_validator(mode="after")
+    def one_source(self):
+        if (self.short_urls is None) == (self.filter is None):
+            raise ValueError("Нужен либо short_urls, либо filter")
+        return self
+
+
+class BulkExtendLinks(BulkUpdateLinks):
+    minutes: int = Field(gt=0, description="На сколько минут продлить срок действия")
+
+
+class BulkUpdatedLink(BaseModel):
+    short_url: str = Field(description="Короткая ссылка")
+    status: Literal["deactivated", "extended", "inactive", "not_found", "invalid"] = Field(
+        description="Результат: изменена, ссылка неактивна(или истекла - для продления), "
+        "ссылки нет или ссылка сгенерирована не этим сервисом"
+    )
+    due_date: datetime | None = Field(
+        default=None, description="Дата и время истечения активности изменённой ссылки"
+    )
+
+
 class LinkInfo(BaseModel):
     id: int = Field(description="ID ссылки в сервисе")
     link: str = Field(description="Сгенерированная(короткая) ссылка")
@@ -83,12 +138,33 @@ class StatisticLinkInfo(BaseModel):
     due_date: datetime = Field(description="Дата и время истечения активности ссылки")
 
 
+class TrendingLink(BaseModel):
+    link: str = Field(description="Короткая(сгенерированная) ссылка")
+    clicks: int = Field(description="Оценка кол-ва переходов за окно(сверху)")
+    error: int = Field(description="Насколько оценка может быть завышена: точное кол-во от clicks - error до clicks")
+
+
+class TrendingInfo(BaseModel):
+    window: str = Field(description="Окно: последний час или день")
+    total: int = Field(description="Кол-во переходов за окно")
+    error_bound: int = Field(
+        description="Максимальная погрешность оценок(не больше переходы / кол-во счётчиков). "
+        "Ссылки с большим кол-вом переходов гарантированно есть среди счётчиков"
+    )
+    links: List[TrendingLink] = Field(description="Ссылки от популярных к менее популярным")
+
+
 class PaginationInfo(BaseModel):
     page: int = Field(description="Текущая страницы")
     size: int = Field(description="Размер выборки страницы")
-    total_pages: int = Field(description="Суммарное кол-во страниц")
+    total_pages: int | None = Field(
+        default=None, description="Суммарное кол-во страниц(точное или оценка, если запрошено)"
+    )
     next: bool = Field(description="Имеется ли следующая страница")
     prev: bool = Field(description="Имеется ли предыдущая страница")
+    next_after_id: int | None = Field(
+        default=None, description="Курсор(after_id) для запроса следующей страницы"
+    )
 
 
 T = TypeVar("T")
@@ -0,0 +1,31 @@
+import json
+from datetime import datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен(pip install ./app[prod])
+    orjson = None
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        # Как в Pydantic и orjson: UTC записывается как Z
+        return value.isoformat().replace("+00:00", "Z")
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(data: Any) -> bytes:
+    """Сериализация готовых словарей и списков в JSON без валидации Pydantic
+
+    Используется orjson, если он установлен, иначе стандартный json.
+
+    Args:
+        data (Any): данные из словарей, списков, строк, чисел и datetime
+
+    Returns:
+        bytes: JSON в UTF-8
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
@@ -1,30 +1,141 @@
+import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.src.config.load_env import load_environment, validate_environment
-from app.src.db import init_db_tortoise
-from app.src.repository import change_expired_links_status
+from app.src.admission import AdmissionMiddleware, admission
+from app.src.cache import redirect_cache
+from app.src.clicks import click_buffer
+from app.src.codegen import configure_code_generator
+from app.src.config.load_env import configure_logging, load_environment, validate_environment
+from app.src.db import close_db_tortoise, init_db_tortoise, pool_stats, read_router
+from app.src.expiry import expiry_engine
+from app.src.httpcache import redirect_policy
+from app.src.jobs import background_jobs
+from app.src.linkfilter import link_filter
+from app.src.linkloader import link_loader
+from app.src.metrics import MetricsMiddleware, registry
+from app.src.redirectindex import redirect_index
+from app.src.retention import retention_job
 from app.src.router import router
+from app.src.trending import trending_links
 
-scheduler = AsyncIOScheduler()
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
+    # Воркеры uvicorn - отдельные процессы, логи настраиваются в каждом
+    configure_logging()
     load_environment()
-    validate_environment()
-    await init_db_tortoise(_app)
+    settings = validate_environment()
+    await init_db_tortoise()
+
+    code_generator = configure_code_generator(
+        mode=settings.code_mode,
+        block_size=settings.code_block_size,
+        secret=settings.code_secret,
+    )
+    await code_generator.prepare()
+
+    admission.configure(
+        enabled=settings.admission_enabled,
+        redirect_rate=settings.admission_redirect_rate,
+        redirect_burst=settings.admission_redirect_burst,
+        private_rate=settings.admission_private_rate,
+        private_burst=settings.admission_private_burst,
+        max_clients=settings.admission_max_clients,
+        max_in_flight=settings.admission_max_in_flight,
+        private_share=settings.admission_private_share,
+        max_queue=settings.admission_max_queue,
+        queue_timeout=settings.admission_queue_timeout,
+        trust_forwarded=settings.admission_trust_forwarded,
+    )
+
+    cache_size = settings.redirect_cache_size
+    # Деактивация в другом воркере видна кэшу только через флаг общего индекса
+    if settings.server_workers > 1 and not settings.redirect_index and cache_size > 0:
+        logger.warning("redirect cache is disabled: SERVER_WORKERS > 1 requires REDIRECT_INDEX=true")
+        cache_size = 0
+    redirect_cache.configure(
+        max_size=cache_size,
+        ttl=settings.redirect_cache_ttl,
+        # Строка с отстающей реплики не должна вернуть деактивированную ссылку в кэш
+        hold=settings.db_replica_max_lag_seconds if settings.db_replicas else 0.0,
+    )
+    link_loader.configure(
+        window=settings.redirect_lookup_window_ms / 1000,
+        batch_size=settings.redirect_lookup_batch,
+    )
+    # Индекс настраивается до запуска фоновых задач: его пишет выбранный воркер
+    redirect_index.configure(
+        enabled=settings.redirect_index,
+        path=settings.redirect_index_file,
+        sync_interval=settings.redirect_index_sync_seconds,
+        rebuild_interval=settings.redirect_index_rebuild_seconds,
+    )
+    redirect_policy.configure(
+        status_code=settings.redirect_status,
+        max_age=settings.redirect_max_age,
+    )
+
+    link_filter.configure(
+        capacity=settings.link_filter_capacity,
+        fp_rate=settings.link_filter_fp_rate,
+        sync_interval=settings.link_filter_sync_seconds,
+        rebuild_interval=settings.link_filter_rebuild_seconds,
+    )
+    await link_filter.start()
+
+    trending_links.configure(
+        capacity=settings.trending_capacity,
+        refresh=settings.trending_refresh_seconds,
+    )
+
+    click_buffer.configure(
+        batch_size=settings.clicks_batch_size,
+        flush_interval=settings.clicks_flush_seconds,
+        max_lost=settings.clicks_max_lost,
+    )
+    await click_buffer.start()
 
     # Проверяем актуальность ссылок не только при переходе
-    scheduler.add_job(change_expired_links_status, CronTrigger(second="*/15"))
-    scheduler.start()
+    expiry_engine.configure(
+        batch_size=settings.expiry_batch_size,
+        refill_interval=settings.expiry_refill_seconds,
+    )
+    retention_job.configure(
+        retention_days=settings.clicks_retention_days,
+        partitions_ahead=settings.clicks_partitions_ahead,
+    )
+    # При нескольких воркерах фоновые задачи работают только в одном из них
+    background_jobs.configure(
+        lock_file=settings.jobs_lock_file,
+        election_interval=settings.jobs_election_seconds,
+    )
+    await background_jobs.start()
+
+    registry.add_collector("db_pool", pool_stats)
+    registry.add_collector("admission", admission.stats)
+    registry.add_collector("db_reads", read_router.stats)
+    registry.add_collector("redirect_cache", redirect_cache.stats)
+    registry.add_collector("redirect_lookup", link_loader.stats)
+    registry.add_collector("redirect_index", redirect_index.stats)
+    registry.add_collector("link_filter", link_filter.stats)
+    registry.add_collector("click_buffer", click_buffer.stats)
+    registry.add_collector("expiry", expiry_engine.stats)
+    registry.add_collector("retention", retention_job.stats)
+    registry.add_collector("jobs", background_jobs.stats)
     yield
 
+    await background_jobs.stop()
+    await link_filter.stop()
+    # Дописываем накопленные переходы перед остановкой
+    await click_buffer.stop()
+    await close_db_tortoise()
+
 
 def create_app() -> FastAPI:
     _app = FastAPI(
@@ -33,6 +144,10 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
 
+    # Лимиты частоты и одновременных запросов(переходы в приоритете). Добавляется до CORS:
+    # preflight-запросы не занимают лимиты, а ответы 429/503 получают заголовки CORS
+    _app.add_middleware(AdmissionMiddleware)
+
     _app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -41,6 +156,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Время ответа и запросы к базе данных по маршрутам(/api/private/metrics), включая отклонённые
+    _app.add_middleware(MetricsMiddleware)
+
     _app.include_router(router=router)
 
     return _app
@@ -1,154 +1,638 @@
-import os
-import random
-import string
+import csv
+import hashlib
+import io
+import json
 from datetime import datetime, timedelta, timezone
-from typing import Literal
-
-import app.src.repository as URLRepository
-from app.src.schemas import LinkInfo, Message, PaginationInfo, StatisticLinkInfo, CreatedLinkData
+from typing import Any, AsyncIterator, Awaitable, Callable, ContextManager, Dict, List, Literal, Tuple
+from urllib.parse import urlsplit, urlunsplit
 
+from pydantic import ValidationError
+from tortoise.exceptions import IntegrityError
 
-async def get_all_links(
-    filter: Literal["all", "active", "inactive"], page: int, size: int
-) -> Message[LinkInfo]:
-    """Получение информации обо всех ссылках в сервисе
+import app.src.repository as URLRepository
+from app.src.cache import CachedLink, redirect_cache
+from app.src.clicks import click_buffer
+from app.src.codegen import get_code_generator
+from app.src.config.settings import get_settings
+from app.src.expiry import expiry_engine
+from app.src.linkfilter import link_filter
+from app.src.linkloader import link_loader
+from app.src.redirectindex import redirect_index
+from app.src.schemas import (
+    BulkCreatedLink,
+    BulkExtendLinks,
+    BulkUpdatedLink,
+    BulkUpdateLinks,
+    CreatedLinkData,
+    CreateShortLink,
+    TrendingInfo,
+    TrendingLink,
+    is_my_url,
+)
+from app.src.trending import trending_links
+
+# Сколько раз пробовать записать ссылку при совпадении кода
+CODE_MAX_ATTEMPTS = 5
+# Сколько ссылок записывать одной транзакцией при массовом создании
+BULK_BATCH_SIZE = 1000
+# Сколько строк читать из курсора за раз при выгрузке
+EXPORT_BATCH_SIZE = 1000
+# Порты по умолчанию(убираются при нормализации ссылок)
+DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+# Колонки выгрузки
+EXPORT_COLUMNS = {
+    "links": ["id", "link", "original_link", "is_active", "due_date"],
+    "clicks": ["id", "url_id", "link", "clicked_at"],
+}
+
+
+def _short_url(token: str) -> str:
+    return get_settings().short_url_prefix + token
+
+
+def normalize_url(url: str) -> str:
+    """Нормализация адреса для поиска одинаковых ссылок
+
+    Схема и хост приводятся к нижнему регистру, порт по умолчанию и пустой путь
+    убираются. Путь, параметры и якорь не меняются.
 
     Args:
-        filter (Literal[&quot;all&quot;, &quot;active&quot;, &quot;inactive&quot;]): какие ссылки нужно выводить(все/активные/неактивные)
-        page (int): страница текущая
-        size (int): размер выборки
+        url (str): оригинальная ссылка
 
     Returns:
-        Message[LinkInfo]: список ссылок по заданным параметрам
+        str: нормализованная ссылка
     """
-    offset_min, offset_max = (page - 1) * size, page * size
+    url = url.strip()
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
 
+    scheme = parts.scheme.lower()
+    userinfo, at, host = parts.netloc.rpartition("@")
+    host = host.lower()
+    default_port = DEFAULT_PORTS.get(scheme)
+    if default_port and host.endswith(default_port):
+        host = host.removesuffix(default_port)
+    return urlunsplit((scheme, userinfo + at + host, parts.path or "/", parts.query, parts.fragment))
+
+
+def url_hash(normalized_url: str) -> int:
+    """Хеш нормализованной ссылки(BIGINT для индекса URLInfo.url_hash)"""
+    digest = hashlib.blake2b(normalized_url.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _link_type(filter: Literal["all", "active", "inactive"]) -> bool | None:
     match filter:
         case "active":
-            link_type = True
+            return True
         case "inactive":
-            link_type = False
+            return False
         case _:
-            link_type = None
+            return None
 
-    links, total = await URLRepository.get_all_links(
-        type=link_type, offset_min=offset_min, offset_max=offset_max
-    )
-    total_pages = max(0, (total + size - 1) // size)
 
-    return Message(
-        links=links,
-        info=PaginationInfo(
-            page=page,
-            size=size,
-            total_pages=total_pages,
-            next=page < total_pages - 1,
-            prev=page > 1,
-        ),
-    )  # type: ignore
+def pinned_reads() -> ContextManager[None]:
+    """Чтения внутри блока(версия и данные ответа) идут в одну базу данных"""
+    return URLRepository.pinned_reads()
+
 
+def _version_minute() -> datetime:
+    return datetime.now(timezone.utc).replace(second=0, microsecond=0)
 
-async def get_stats(page: int, size: int) -> Message[StatisticLinkInfo]:
+
+async def get_links_version() -> Tuple[str, datetime]:
+    """Версия списка ссылок для ETag и Last-Modified
+
+    Версия - последний ID и время последнего изменения ссылок(ссылки не удаляются) и текущая
+    минута. Транзакция может зафиксировать изменение с меньшим updated_at позже других, такое
+    изменение попадает в ответ со сменой минуты: устаревший ответ живёт не дольше минуты
+
+    Returns:
+        Tuple[str, datetime]: версия и время последнего изменения(не раньше начала минуты)
+    """
+    max_id, updated_at = await URLRepository.get_links_version()
+    minute = _version_minute()
+    last_modified = max(updated_at, minute) if updated_at is not None else minute
+    return f"{get_settings().short_url_prefix}|{max_id}|{updated_at}|{minute.isoformat()}", last_modified
+
+
+async def get_stats_version() -> str:
+    """Версия статистики для ETag
+
+    Статистика меняется при изменении ссылок, новых переходах и сдвиге окон часа и дня,
+    поэтому версия включает текущую минуту: устаревший ответ живёт не дольше минуты
+
+    Returns:
+        str: версия статистики
+    """
+    max_id, updated_at = await URLRepository.get_links_version()
+    clicks = await URLRepository.get_clicks_version()
+    return f"{get_settings().short_url_prefix}|{max_id}|{updated_at}|{clicks}|{_version_minute().isoformat()}"
+
+
+async def get_all_links(
+    filter: Literal["all", "active", "inactive"],
+    page: int,
+    size: int,
+    after_id: int | None = None,
+    total: Literal["exact", "estimate", "none"] = "exact",
+) -> Dict[str, Any]:
+    """Получение информации обо всех ссылках в сервисе
+
+    Ответ собирается из кортежей строк без моделей Pydantic(по схеме Message[LinkInfo])
+
+    Args:
+        filter (Literal[&quot;all&quot;, &quot;active&quot;, &quot;inactive&quot;]): какие ссылки нужно выводить(все/активные/неактивные)
+        page (int): страница текущая
+        size (int): размер выборки
+        after_id (int | None, optional): курсор - ID последней ссылки предыдущей страницы(вместо page). Defaults to None.
+        total (Literal[&quot;exact&quot;, &quot;estimate&quot;, &quot;none&quot;], optional): как считать общее кол-во страниц. Defaults to "exact".
+
+    Returns:
+        Dict[str, Any]: список ссылок по заданным параметрам
+    """
+    link_type = _link_type(filter)
+
+    # Берём на одну ссылку больше, чтобы узнать о наличии следующей страницы без COUNT
+    links = await URLRepository.get_all_links(
+        type=link_type, offset=(page - 1) * size, limit=size + 1, after_id=after_id
+    )
+    has_next = len(links) > size
+    links = links[:size]
+
+    total_pages = None
+    if total != "none":
+        count = await URLRepository.count_links(type=link_type, estimate=total == "estimate")
+        total_pages = max(0, (count + size - 1) // size)
+
+    prefix = get_settings().short_url_prefix
+    return {
+        "links": [
+            {
+                "id": link_id,
+                "link": prefix + token,
+                "original_link": original_link,
+                "is_active": is_active,
+                "due_date": due_date,
+            }
+            for link_id, token, original_link, is_active, due_date in links
+        ],
+        "info": {
+            "page": page,
+            "size": size,
+            "total_pages": total_pages,
+            "next": has_next,
+            "prev": page > 1 if after_id is None else after_id > 0,
+            "next_after_id": links[-1][0] if has_next else None,
+        },
+    }
+
+
+async def get_stats(page: int, size: int) -> Dict[str, Any]:
     """Получение статистики ссылок
 
+    Ответ собирается из строк запроса без моделей Pydantic(по схеме Message[StatisticLinkInfo])
+
     Args:
         page (int): текущая страница
         size (int): размер выборки
 
     Returns:
-        Message[StatisticLinkInfo]: список ссылок со статистикой
+        Dict[str, Any]: список ссылок со статистикой
     """
-    offset_min, offset_max = (page - 1) * size, page * size
-    links, total = await URLRepository.get_all_links(offset_min=offset_min, offset_max=offset_max)
-
-    res = []
-    for link_data in links:
-        stats = await URLRepository.get_stats(link_id=link_data.id)
-        temp_stat = StatisticLinkInfo(
-            link=link_data.link,
-            orig_link=link_data.original_link,
-            last_hour_clicks=stats["hour_stats"],
-            last_day_clicks=stats["day_stats"],
-            is_active=link_data.is_active,
-            due_date=link_data.due_date,
-        )
-        res.append(temp_stat)
-
-    res.sort(key=lambda x: (-x.last_day_clicks, -x.last_hour_clicks))
+    rows = await URLRepository.get_stats(offset=(page - 1) * size, limit=size + 1)
+    has_next = len(rows) > size
+    total = await URLRepository.count_links()
+
+    prefix = get_settings().short_url_prefix
+    res = [
+        {
+            "link": prefix + row["link"],
+            "orig_link": row["original_link"],
+            "last_hour_clicks": row["hour_stats"],
+            "last_day_clicks": row["day_stats"],
+            "is_active": row["is_active"],
+            "due_date": row["due_date"],
+        }
+        for row in rows[:size]
+    ]
     total_pages = max(0, (total + size - 1) // size)
 
-    return Message(
-        links=res,
-        info=PaginationInfo(
-            page=page,
-            size=size,
-            total_pages=total_pages,
-            next=page < total_pages - 1,
-            prev=page > 1,
-        ),
-    )
+    return {
+        "links": res,
+        "info": {
+            "page": page,
+            "size": size,
+            "total_pages": total_pages,
+            "next": has_next,
+            "prev": page > 1,
+            "next_after_id": None,
+        },
+    }
 
 
 async def generate_url(url: str) -> CreatedLinkData | None:
     """Создание короткой ссылик
 
+    При LINK_REUSE вместо новой ссылки возвращается активная ссылка на тот же адрес, если она есть.
+
     Args:
         url (str): оригинальная ссылка из которой нужно создать короткую
 
     Returns:
         CreatedLinkData | None: данные созданной ссылкы или None при ошибке создания
     """
-    # Случайная строка длины 9
-    short_token = "".join(
-        random.SystemRandom().choice(string.ascii_letters + string.digits) for _ in range(9)
-    )
-    short_link = f"{os.getenv('DOMEN')}/{short_token}"
-    due_date = datetime.now(timezone.utc) + timedelta(minutes=int(os.getenv("EXPIRE_MINUTES", 1)))
-
-    is_in_db = await URLRepository.write_short_link(
-        original_link=url, short_link=short_link, due_date=due_date
-    )
+    settings = get_settings()
+    due_date = datetime.now(timezone.utc) + timedelta(minutes=settings.expire_minutes)
+    normalized = normalize_url(url)
+    link_hash = url_hash(normalized)
+    if settings.link_reuse:
+        return await _reuse_or_generate_url(url, normalized, link_hash, due_date)
+
+    # Код длины 9, при совпадении с уже существующим пробуем новый
+    for _ in range(CODE_MAX_ATTEMPTS):
+        short_token = await get_code_generator().next_code()
+        try:
+            is_in_db = await URLRepository.write_short_link(
+                original_link=url, token=short_token, due_date=due_date, url_hash=link_hash
+            )
+        except IntegrityError:
+            continue
+        break
+    else:
+        return None
 
     if not is_in_db:
         return None
 
+    expiry_engine.schedule(short_token, due_date)
+    link_filter.add(short_token)
+
     return CreatedLinkData(
-        created_url=short_link,
+        created_url=_short_url(short_token),
         original_url=url,
         due_date=due_date
     )
 
 
-async def get_original_url(short_link: str) -> str | None:
+async def _reuse_or_generate_url(
+    url: str, normalized: str, link_hash: int, due_date: datetime
+) -> CreatedLinkData | None:
+    def is_same(original_link: str) -> bool:
+        return normalize_url(original_link) == normalized
+
+    # Без лока: ссылка на часто сокращаемый адрес обычно уже есть
+    existing = await URLRepository.find_reusable_link(link_hash, is_same)
+    if existing is not None:
+        token, due_date = existing
+        return CreatedLinkData(created_url=_short_url(token), original_url=url, due_date=due_date)
+
+    for _ in range(CODE_MAX_ATTEMPTS):
+        short_token = await get_code_generator().next_code()
+        try:
+            result = await URLRepository.reuse_or_write_short_link(
+                original_link=url,
+                token=short_token,
+                due_date=due_date,
+                url_hash=link_hash,
+                is_same=is_same,
+            )
+        except IntegrityError:
+            continue
+        break
+    else:
+        return None
+
+    if result is None:
+        return None
+
+    token, due_date, is_created = result
+    if is_created:
+        expiry_engine.schedule(token, due_date)
+        link_filter.add(token)
+
+    return CreatedLinkData(created_url=_short_url(token), original_url=url, due_date=due_date)
+
+
+async def _create_links(urls: List[str]) -> List[CreatedLinkData] | None:
+    due_date = datetime.now(timezone.utc) + timedelta(minutes=get_settings().expire_minutes)
+
+    # При совпадении хотя бы одного кода транзакция откатывается, пробуем с новыми кодами
+    for _ in range(CODE_MAX_ATTEMPTS):
+        codes = await get_code_generator().allocate(len(urls))
+        links = [(url, code, url_hash(normalize_url(url))) for url, code in zip(urls, codes)]
+        try:
+            is_in_db = await URLRepository.write_short_links(links=links, due_date=due_date)
+        except IntegrityError:
+            continue
+        break
+    else:
+        return None
+
+    if not is_in_db:
+        return None
+
+    for _, code, _ in links:
+        expiry_engine.schedule(code, due_date)
+        link_filter.add(code)
+
+    return [
+        CreatedLinkData(created_url=_short_url(code), original_url=url, due_date=due_date)
+        for url, code, _ in links
+    ]
+
+
+async def generate_urls(items: List[Any], start_index: int = 0) -> List[BulkCreatedLink]:
+    """Массовое создание коротких ссылок
+
+    Каждый элемент проверяется как `CreateShortLink`, корректные ссылки записываются
+    пачками по BULK_BATCH_SIZE.
+
+    Args:
+        items (List[Any]): элементы вида {"url": ...}
+        start_index (int, optional): номер первого элемента(для потоковой обработки). Defaults to 0.
+
+    Returns:
+        List[BulkCreatedLink]: результат по каждому элементу
+    """
+    results: List[BulkCreatedLink] = []
+    valid: List[BulkCreatedLink] = []
+    urls: List[str] = []
+    for index, item in enumerate(items, start=start_index):
+        result = BulkCreatedLink(index=index)
+        try:
+            urls.append(CreateShortLink.model_validate(item).url)
+            valid.append(result)
+        except ValidationError as e:
+            result.error = e.errors()[0]["msg"]
+        results.append(result)
+
+    for batch_start in range(0, len(urls), BULK_BATCH_SIZE):
+        batch = urls[batch_start : batch_start + BULK_BATCH_SIZE]
+        created = await _create_links(batch)
+        for i, result in enumerate(valid[batch_start : batch_start + BULK_BATCH_SIZE]):
+            if created is None:
+                result.error = "cannot create link"
+            else:
+                result.created = created[i]
+
+    return results
+
+
+async def generate_urls_stream(lines: AsyncIterator[bytes]) -> AsyncIterator[BulkCreatedLink]:
+    """Массовое создание коротких ссылок из потока NDJSON
+
+    Строки обрабатываются пачками по BULK_BATCH_SIZE, поэтому в памяти не хранится весь запрос.
+
+    Args:
+        lines (AsyncIterator[bytes]): строки NDJSON вида {"url": ...}
+
+    Yields:
+        BulkCreatedLink: результат по каждой строке
+    """
+    batch: List[Any] = []
+    index = 0
+    async for line in lines:
+        try:
+            batch.append(json.loads(line))
+        except ValueError:
+            # Заведомо некорректный элемент - не пройдёт проверку CreateShortLink
+            batch.append(None)
+        if len(batch) >= BULK_BATCH_SIZE:
+            for result in await generate_urls(batch, start_index=index):
+                yield result
+            index += len(batch)
+            batch = []
+
+    if batch:
+        for result in await generate_urls(batch, start_index=index):
+            yield result
+
+
+async def _load_link(token: str) -> CachedLink | None:
+    # Одновременные переходы объединяются в один запрос к базе данных(см. LinkLoader).
+    # Эпоха не даёт закэшировать строку, прочитанную до деактивации(см. RedirectCache)
+    link, epoch = await link_loader.load(token)
+    if link is not None:
+        redirect_cache.put(token, link, epoch=epoch)
+    return link
+
+
+async def get_original_url(short_link: str) -> CachedLink | None:
     """Получение оригинальной ссылки из короткой
 
     Args:
         short_link (str): короткая ссылка
 
     Returns:
-        str | None: оригинальная ссылка или None если ссылки нет(неактивна)
+        CachedLink | None: оригинальная ссылка со сроком действия или None если ссылки нет(неактивна)
     """
-    short_link = f"{os.getenv('DOMEN')}/" + short_link
-    result = await URLRepository.get_orig_link(short_link=short_link)
-    if not result or not result.is_active:
-        return None
+    token = short_link
 
-    if datetime.now(timezone.utc) > result.due_date:
-        await URLRepository.change_activate_status(short_link=short_link)
+    link = redirect_cache.get(token)
+    # Деактивация в другом воркере снимает флаг в общем индексе, но не трогает этот кэш
+    if link is not None and redirect_index.inactive(token):
+        redirect_cache.invalidate(token)
         return None
-
-    await URLRepository.change_statistic(short_link=short_link)
-
-    return result.original_link
+    if link is None:
+        link = redirect_index.get(token)
+    if link is not None and not link.is_active:
+        return None
+    if link is None:
+        # Несуществующие коды(сканеры, опечатки) отсекаются без запроса к базе данных
+        if not link_filter.might_exist(token):
+            return None
+
+        link = await _load_link(token)
+        if link is None:
+            link_filter.record_not_found()
+            return None
+
+    if datetime.now(timezone.utc) > link.due_date:
+        redirect_cache.invalidate(token)
+        # Деактивация только истёкшей ссылки: кэш другого воркера или индекс
+        # могли хранить срок до продления(extend_links)
+        if await URLRepository.deactivate_expired_links([token]):
+            redirect_index.deactivate(token)
+            return None
+        link = await _load_link(token)
+        if link is None or datetime.now(timezone.utc) > link.due_date:
+            return None
+        redirect_index.extend(token, link.due_date)
+
+    await click_buffer.record(link.id)
+    trending_links.record(token)
+
+    return link
 
 
 async def deactivate_link(link: str) -> bool:
     """Деактивация ссылки(пометка, что ссылка неактивна)
 
     Args:
-        link (str): сыылка для деактивации
+        link (str): сыылка для деактивации(проверенная schemas.is_my_url)
 
     Returns:
         bool: деактивирована ссылка или нет
     """
-    return await URLRepository.change_activate_status(short_link=link)
+    token = link.removeprefix(get_settings().short_url_prefix)
+    is_deactivated = await URLRepository.change_activate_status(token=token)
+    # Кэш и индекс обновляются после записи в базу данных(см. RedirectIndex.rebuild),
+    # иначе одновременный переход мог бы снова закэшировать активную ссылку
+    redirect_cache.invalidate(token)
+    redirect_index.deactivate(token)
+    return is_deactivated
+
+
+BulkUpdate = Callable[..., Awaitable[List[Tuple[str, datetime]]]]
+
+
+async def _update_links(
+    data: BulkUpdateLinks, update: BulkUpdate, status: Literal["deactivated", "extended"]
+) -> List[BulkUpdatedLink]:
+    if data.filter is not None:
+        rows = await update(**data.filter.model_dump())
+        return [
+            BulkUpdatedLink(short_url=_short_url(token), status=status, due_date=due_date)
+            for token, due_date in rows
+        ]
+
+    prefix = get_settings().short_url_prefix
+    tokens: List[str | None] = []
+    for short_url in data.short_urls or []:
+        try:
+            tokens.append(is_my_url(short_url).removeprefix(prefix))
+        except ValueError:
+            tokens.append(None)
+
+    valid = {token for token in tokens if token is not None}
+    updated = dict(await update(tokens=list(valid)))
+    # Ссылки, которые есть, но не изменены: неактивны(или истекли - для продления)
+    missed = list(valid - updated.keys())
+    existing = set(await URLRepository.get_existing_tokens(missed)) if missed else set()
+    results = []
+    for short_url, token in zip(data.short_urls or [], tokens):
+        if token is None:
+            results.append(BulkUpdatedLink(short_url=short_url, status="invalid"))
+        elif token in updated:
+            results.append(
+                BulkUpdatedLink(short_url=_short_url(token), status=status, due_date=updated[token])
+            )
+        elif token in existing:
+            results.append(BulkUpdatedLink(short_url=_short_url(token), status="inactive"))
+        else:
+            results.append(BulkUpdatedLink(short_url=_short_url(token), status="not_found"))
+    return results
+
+
+async def deactivate_links(data: BulkUpdateLinks) -> List[BulkUpdatedLink]:
+    """Массовая деактивация ссылок из списка или по фильтру(один UPDATE)
+
+    Args:
+        data (BulkUpdateLinks): короткие ссылки или фильтр
+
+    Returns:
+        List[BulkUpdatedLink]: результат по каждой ссылке списка или деактивированные по фильтру ссылки
+    """
+
+    async def update(**filters: Any) -> List[Tuple[str, datetime]]:
+        rows = await URLRepository.deactivate_links(**filters)
+        for token, _ in rows:
+            redirect_cache.invalidate(token)
+            redirect_index.deactivate(token)
+        return rows
+
+    return await _update_links(data, update, "deactivated")
+
+
+async def extend_links(data: BulkExtendLinks) -> List[BulkUpdatedLink]:
+    """Массовое продление действующих ссылок из списка или по фильтру(один UPDATE)
+
+    Расписание деактивации не меняется: по старому сроку ссылка не деактивируется,
+    так как срок проверяется в UPDATE, а новый срок подхватит дозагрузка расписания.
+
+    Args:
+        data (BulkExtendLinks): короткие ссылки или фильтр и на сколько минут продлить
+
+    Returns:
+        List[BulkUpdatedLink]: результат по каждой ссылке списка или продлённые по фильтру ссылки
+    """
+
+    async def update(**filters: Any) -> List[Tuple[str, datetime]]:
+        rows = await URLRepository.extend_links(minutes=data.minutes, **filters)
+        for token, due_date in rows:
+            redirect_cache.invalidate(token)
+            redirect_index.extend(token, due_date)
+        return rows
+
+    return await _update_links(data, update, "extended")
+
+
+def get_trending(window: Literal["hour", "day"], limit: int) -> TrendingInfo:
+    """Самые популярные ссылки за последний час или день по счётчикам процесса
+
+    Args:
+        window (Literal[&quot;hour&quot;, &quot;day&quot;]): окно
+        limit (int): кол-во ссылок
+
+    Returns:
+        TrendingInfo: топ ссылок с оценкой погрешности
+    """
+    top = trending_links.top(window, limit)
+    return TrendingInfo(
+        window=window,
+        total=top["total"],
+        error_bound=top["error_bound"],
+        links=[
+            TrendingLink(link=_short_url(token), clicks=clicks, error=error)
+            for token, clicks, error in top["links"]
+        ],
+    )
+
+
+def _format_rows(rows: List[dict], columns: List[str], format: Literal["ndjson", "csv"]) -> str:
+    if format == "ndjson":
+        return "".join(json.dumps(row, default=datetime.isoformat) + "\n" for row in rows)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = [row[column] for column in columns]
+        writer.writerow([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return buffer.getvalue()
+
+
+async def export(
+    kind: Literal["links", "clicks"],
+    format: Literal["ndjson", "csv"],
+    filter: Literal["all", "active", "inactive"] = "all",
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> AsyncIterator[str]:
+    """Потоковая выгрузка ссылок или сырых переходов
+
+    Строки читаются из базы данных серверным курсором пачками по EXPORT_BATCH_SIZE,
+    следующая пачка читается после отправки предыдущей клиенту.
+
+    Args:
+        kind (Literal[&quot;links&quot;, &quot;clicks&quot;]): что выгружать
+        format (Literal[&quot;ndjson&quot;, &quot;csv&quot;]): формат строк
+        filter (Literal[&quot;all&quot;, &quot;active&quot;, &quot;inactive&quot;], optional): по каким ссылкам. Defaults to "all".
+        since (datetime | None, optional): начало периода(due_date ссылки или время перехода). Defaults to None.
+        until (datetime | None, optional): конец периода(не включительно). Defaults to None.
+
+    Yields:
+        str: часть выгрузки(пачка строк)
+    """
+    columns = EXPORT_COLUMNS[kind]
+    if format == "csv":
+        yield ",".join(columns) + "\r\n"
+
+    stream = URLRepository.stream_links if kind == "links" else URLRepository.stream_clicks
+    async for rows in stream(
+        type=_link_type(filter), since=since, until=until, batch_size=EXPORT_BATCH_SIZE
+    ):
+        for row in rows:
+            row["link"] = _short_url(row["link"])
+        yield _format_rows(rows, columns, format)
@@ -0,0 +1,219 @@
+import heapq
+import time
+from collections import deque
+from typing import Deque, Dict, List, Literal, Tuple
+
+
+class SpaceSaving:
+    """Алгоритм Space-Saving: приблизительные частоты самых частых ключей
+
+    Хранится не больше `capacity` счётчиков. Новый ключ при заполнении вытесняет
+    ключ с минимальным счётчиком и наследует его значение как погрешность.
+    Для N добавлений: оценка завышена не больше чем на N / capacity, а любой ключ
+    с частотой больше N / capacity гарантированно есть среди счётчиков.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # Куча (счётчик, ключ) с устаревшими записями, актуальна запись с текущим счётчиком
+        self._heap: List[Tuple[int, str]] = []
+
+    def add(self, key: str) -> None:
+        self.total += 1
+        count = self.counts.get(key)
+        if count is not None:
+            count += 1
+        elif len(self.counts) < self.capacity:
+            count = 1
+            self.errors[key] = 0
+        else:
+            min_count, min_key = self._pop_min()
+            del self.counts[min_key]
+            del self.errors[min_key]
+            count = min_count + 1
+            self.errors[key] = min_count
+
+        self.counts[key] = count
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, key) for key, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    @property
+    def floor(self) -> int:
+        """Верхняя граница частоты ключа, которого нет среди счётчиков"""
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def _pop_min(self) -> Tuple[int, str]:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return count, key
+
+
+class SlidingTopK:
+    """Самые частые ключи за скользящее окно
+
+    Окно делится на `slots` интервалов, в каждом свой Space-Saving. Суммы по
+    закрытым интервалам хранятся отдельно и обновляются при смене интервала,
+    поэтому запрос объединяет только их и текущий интервал. Окно покрывает
+    от (slots - 1) до slots интервалов.
+
+    В интервале, где ключа нет среди счётчиков, к оценке добавляется минимальный
+    счётчик интервала(`SpaceSaving.floor`): оценка остаётся не меньше точной частоты,
+    а погрешность - не больше суммы минимальных счётчиков интервалов.
+    """
+
+    def __init__(self, window: float, slots: int, capacity: int):
+        self.slot_seconds = window / slots
+        self.slots = slots
+        self.capacity = capacity
+        self._current_slot = 0
+        self._current = SpaceSaving(capacity)
+        self._closed: Deque[SpaceSaving] = deque()
+        # Для ключа хранится (счётчик - минимум) и (погрешность - минимум) по интервалам,
+        # где он есть, и кол-во таких интервалов. Сумма минимумов общая для всех ключей
+        self._closed_counts: Dict[str, int] = {}
+        self._closed_errors: Dict[str, int] = {}
+        self._closed_slots: Dict[str, int] = {}
+        self._closed_floor = 0
+        self._closed_total = 0
+
+    def _rotate(self, now: float) -> None:
+        slot = int(now // self.slot_seconds)
+        if slot == self._current_slot:
+            return
+
+        # Пропущенные пустые интервалы тоже сдвигают окно
+        for _ in range(min(slot - self._current_slot, self.slots)):
+            self._close(self._current)
+            self._current = SpaceSaving(self.capacity)
+        self._current_slot = slot
+
+    def _close(self, summary: SpaceSaving) -> None:
+        self._closed.append(summary)
+        self._merge(summary, 1)
+        if len(self._closed) >= self.slots:
+            self._merge(self._closed.popleft(), -1)
+
+    def _merge(self, summary: SpaceSaving, sign: int) -> None:
+        floor = summary.floor
+        self._closed_total += sign * summary.total
+        self._closed_floor += sign * floor
+        for key, count in summary.counts.items():
+            slots = self._closed_slots.get(key, 0) + sign
+            if slots:
+                self._closed_slots[key] = slots
+                self._closed_counts[key] = self._closed_counts.get(key, 0) + sign * (count - floor)
+                self._closed_errors[key] = (
+                    self._closed_errors.get(key, 0) + sign * (summary.errors[key] - floor)
+                )
+            else:
+                del self._closed_slots[key]
+                del self._closed_counts[key]
+                del self._closed_errors[key]
+
+    def add(self, key: str, now: float) -> None:
+        self._rotate(now)
+        self._current.add(key)
+
+    def top(self, k: int, now: float) -> Tuple[int, int, List[Tuple[str, int, int]]]:
+        """Самые частые ключи окна
+
+        Args:
+            k (int): кол-во ключей
+            now (float): текущее время(time.time())
+
+        Returns:
+            Tuple[int, int, List[Tuple[str, int, int]]]: всего добавлений в окне, максимальная
+            погрешность и (ключ, оценка, погрешность)
+        """
+        self._rotate(now)
+        current = self._current
+        current_floor = current.floor
+        error_bound = self._closed_floor + current_floor
+
+        def estimate(key: str) -> Tuple[int, int]:
+            count = self._closed_floor + self._closed_counts.get(key, 0)
+            error = self._closed_floor + self._closed_errors.get(key, 0)
+            if key in current.counts:
+                return count + current.counts[key], error + current.errors[key]
+            return count + current_floor, error + current_floor
+
+        keys = self._closed_counts.keys() | current.counts.keys()
+        estimates = {key: estimate(key) for key in keys}
+        top = heapq.nlargest(k, estimates.items(), key=lambda item: item[1][0])
+        return (
+            self._closed_total + current.total,
+            error_bound,
+            [(key, count, error) for key, (count, error) in top],
+        )
+
+
+class TrendingLinks:
+    """Популярные прямо сейчас ссылки за последний час и день(без запросов к базе данных)
+
+    Обновляется при каждом переходе. Ответы кэшируются на `refresh` секунд, поэтому
+    частые запросы не пересчитывают топ. Счётчики свои у каждого процесса-воркера.
+    """
+
+    WINDOWS = {"hour": (3600, 12), "day": (86400, 24)}
+
+    def __init__(self, capacity: int = 1000, refresh: float = 1.0):
+        self.configure(capacity, refresh)
+
+    def configure(self, capacity: int, refresh: float) -> None:
+        """Изменение параметров(сбрасывает счётчики)
+
+        Args:
+            capacity (int): кол-во счётчиков на интервал окна, 0 - выключено
+            refresh (float): время жизни посчитанного топа(в секундах)
+        """
+        self.capacity = capacity
+        self.refresh = refresh
+        self._windows = {
+            name: SlidingTopK(window, slots, max(1, capacity))
+            for name, (window, slots) in self.WINDOWS.items()
+        }
+        self._cache: Dict[Tuple[str, int], Tuple[float, dict]] = {}
+
+    def record(self, token: str) -> None:
+        """Учёт перехода по ссылке
+
+        Args:
+            token (str): код ссылки
+        """
+        if self.capacity <= 0:
+            return
+        now = time.time()
+        for window in self._windows.values():
+            window.add(token, now)
+
+    def top(self, window: Literal["hour", "day"], k: int) -> dict:
+        """Топ ссылок за окно
+
+        Args:
+            window (Literal[&quot;hour&quot;, &quot;day&quot;]): окно
+            k (int): кол-во ссылок
+
+        Returns:
+            dict: total - переходов в окне, error_bound - максимальная погрешность оценок
+            (не больше переходов / кол-во счётчиков), links - (код ссылки, оценка, погрешность) от популярных к менее популярным
+        """
+        now = time.time()
+        cached = self._cache.get((window, k))
+        if cached is not None and now - cached[0] < self.refresh:
+            return cached[1]
+
+        total, error_bound, links = self._windows[window].top(k, now)
+        result = {"total": total, "error_bound": error_bound, "links": links}
+        self._cache[(window, k)] = (now, result)
+        return result
+
+
+trending_links = TrendingLinks()
@@ -0,0 +1,32 @@
+import pytest
+from tortoise import Tortoise, connections
+
+from app.src.config.load_env import load_environment, validate_environment
+from app.src.db import tortoise_config
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def db():
+    """Подключение к базе данных из app/src/config/.env
+
+    Тесты с базой данных пропускаются, если её нет или схема не создана(python -m app.migrate)
+    """
+    try:
+        load_environment()
+        validate_environment()
+        await Tortoise.init(config=tortoise_config())
+        _, rows = await connections.get("default").execute_query(
+            "SELECT to_regclass('urlinfo') IS NOT NULL AS migrated"
+        )
+    except Exception as e:
+        pytest.skip(f"база данных недоступна: {e}")
+    if not rows[0]["migrated"]:
+        pytest.skip("схема базы данных не создана")
+
+    yield connections.get("default")
+    await Tortoise.close_connections()
@@ -0,0 +1,150 @@
+import asyncio
+
+import httpx
+import pytest
+
+import app.src.admission as admission_module
+from app.src.admission import AdmissionControl, PriorityLimiter, TokenBuckets, route_class
+from app.src.server import create_app
+
+pytestmark = pytest.mark.anyio
+
+
+def test_route_class():
+    assert route_class("/abc123") == "redirect"
+    assert route_class("/api/private/all_links") == "private"
+    assert route_class("/api/private/metrics") is None
+
+
+def test_token_bucket_burst_and_refill():
+    buckets = TokenBuckets(rate=2, burst=3, max_clients=10)
+
+    assert [buckets.take("a", now=0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("a", now=0) == pytest.approx(0.5)
+    # Другие клиенты не зависят от чужого расхода
+    assert buckets.take("b", now=0) == 0
+    # За 0.5 секунды появляется один токен
+    assert buckets.take("a", now=0.5) == 0
+    assert buckets.take("a", now=0.5) > 0
+    # Запас не копится больше burst
+    assert [buckets.take("a", now=100) for _ in range(4)][-1] > 0
+
+
+def test_token_buckets_evict_least_recent_client():
+    buckets = TokenBuckets(rate=1, burst=1, max_clients=2)
+    buckets.take("a", now=0)
+    buckets.take("b", now=0)
+    buckets.take("a", now=0)
+    buckets.take("c", now=0)
+
+    assert len(buckets) == 2
+    # "b" вытеснен и получает полный запас заново
+    assert buckets.take("b", now=0) == 0
+
+
+def test_unlimited_rate():
+    buckets = TokenBuckets(rate=0, burst=1, max_clients=1)
+
+    assert all(buckets.take("a", now=0) == 0 for _ in range(100))
+    assert len(buckets) == 0
+
+
+async def test_private_routes_keep_slots_for_redirects():
+    limiter = PriorityLimiter(limit=3, private_limit=1, max_queue=0, queue_timeout=0.01)
+
+    assert await limiter.acquire("private")
+    assert not await limiter.acquire("private")
+    assert await limiter.acquire("redirect")
+    assert await limiter.acquire("redirect")
+    assert not await limiter.acquire("redirect")
+    assert limiter.in_flight == {"redirect": 2, "private": 1}
+
+
+async def test_released_slot_goes_to_redirect_first():
+    limiter = PriorityLimiter(limit=1, private_limit=1, max_queue=10, queue_timeout=1)
+    assert await limiter.acquire("redirect")
+
+    private = asyncio.create_task(limiter.acquire("private"))
+    await asyncio.sleep(0)
+    redirect = asyncio.create_task(limiter.acquire("redirect"))
+    await asyncio.sleep(0)
+    assert limiter.queued == 2
+
+    limiter.release("redirect")
+    assert await redirect
+    assert not private.done()
+
+    limiter.release("redirect")
+    assert await private
+    assert limiter.in_flight == {"redirect": 0, "private": 1}
+
+
+async def test_queue_timeout_and_full_queue():
+    limiter = PriorityLimiter(limit=1, private_limit=1, max_queue=1, queue_timeout=0.01)
+    assert await limiter.acquire("redirect")
+
+    waiting = asyncio.create_task(limiter.acquire("redirect"))
+    await asyncio.sleep(0)
+    # Очередь заполнена - отказ без ожидания
+    assert not await limiter.acquire("redirect")
+    # Слот не освободился за queue_timeout
+    assert not await waiting
+    assert limiter.queued == 0
+    assert limiter.in_flight["redirect"] == 1
+
+
+async def test_cancelled_waiter_leaves_queue():
+    limiter = PriorityLimiter(limit=1, private_limit=1, max_queue=10, queue_timeout=1)
+    assert await limiter.acquire("redirect")
+
+    waiting = asyncio.create_task(limiter.acquire("redirect"))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    assert limiter.queued == 0
+    limiter.release("redirect")
+    assert limiter.in_flight["redirect"] == 0
+
+
+@pytest.fixture
+def strict_admission(monkeypatch):
+    control = AdmissionControl()
+    control.configure(
+        enabled=True,
+        redirect_rate=1,
+        redirect_burst=1,
+        private_rate=1,
+        private_burst=1,
+        max_clients=10,
+        max_in_flight=0,
+        private_share=1,
+        max_queue=0,
+        queue_timeout=0.1,
+        trust_forwarded=False,
+    )
+    monkeypatch.setattr(admission_module, "admission", control)
+    return control
+
+
+async def test_cors_wraps_admission(strict_admission):
+    transport = httpx.ASGITransport(app=create_app())
+    origin = {"Origin": "https://example.com"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        preflights = [
+            await client.options(
+                "/api/private/all_links", headers={**origin, "Access-Control-Request-Method": "GET"}
+            )
+            for _ in range(3)
+        ]
+        # Код неверного формата отклоняется без базы данных
+        admitted = await client.get("/abc", headers=origin)
+        limited = await client.get("/abc", headers=origin)
+
+    # Preflight-запросы не тратят лимит, а отказ читается браузером(есть заголовки CORS)
+    assert [response.status_code for response in preflights] == [200, 200, 200]
+    assert strict_admission.rate_limited["private"] == 0
+    assert admitted.status_code == 404
+    assert limited.status_code == 429
+    assert limited.headers["access-control-allow-origin"] == "*"
@@ -0,0 +1,92 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.src.repository as URLRepository
+from app.src import services
+from app.src.config.settings import get_settings
+from app.src.db.models import URLInfo
+from app.src.schemas import BulkUpdateLinks
+
+pytestmark = pytest.mark.anyio
+
+
+def test_bulk_filters_numbers_params_in_order():
+    due_after = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    due_before = datetime(2026, 2, 1, tzinfo=timezone.utc)
+
+    where, params = URLRepository._bulk_filters(["abc"], "https://a.b/", due_after, due_before)
+
+    assert where == (
+        "is_active AND link = ANY($1::text[]) AND starts_with(original_link, $2)"
+        " AND due_date >= $3 AND due_date < $4"
+    )
+    assert params == [["abc"], "https://a.b/", due_after, due_before]
+
+
+def test_bulk_filters_only_active_without_filters():
+    assert URLRepository._bulk_filters(None, None, None, None) == ("is_active", [])
+
+
+@pytest.fixture
+async def links(db):
+    """Ссылки теста: код -> ссылка, все с одним уникальным началом оригинальной ссылки"""
+    prefix = f"https://bulk-test.invalid/{uuid.uuid4().hex}/"
+    now = datetime.now(timezone.utc)
+    spec = {
+        "soon": (True, now + timedelta(hours=1)),
+        "later": (True, now + timedelta(days=2)),
+        "inactive": (False, now + timedelta(hours=1)),
+        "expired": (True, now - timedelta(minutes=1)),
+    }
+    created = {}
+    for name, (is_active, due_date) in spec.items():
+        created[name] = await URLInfo.create(
+            link=uuid.uuid4().hex[:9],
+            original_link=prefix + name,
+            is_active=is_active,
+            due_date=due_date,
+        )
+    yield prefix, created
+    await URLInfo.filter(original_link__startswith=prefix).delete()
+
+
+async def test_deactivate_links_by_filter(links):
+    prefix, created = links
+
+    deactivated = await URLRepository.deactivate_links(
+        original_prefix=prefix,
+        due_after=datetime.now(timezone.utc),
+        due_before=created["later"].due_date,
+    )
+
+    assert [token for token, _ in deactivated] == [created["soon"].link]
+    assert not (await URLInfo.get(id=created["soon"].id)).is_active
+    assert (await URLInfo.get(id=created["later"].id)).is_active
+
+
+async def test_extend_links_skips_inactive_and_expired(links):
+    _, created = links
+    tokens = [link.link for link in created.values()]
+
+    extended = dict(await URLRepository.extend_links(minutes=60, tokens=tokens))
+
+    assert set(extended) == {created["soon"].link, created["later"].link}
+    assert extended[created["later"].link] == created["later"].due_date + timedelta(minutes=60)
+    assert (await URLInfo.get(id=created["expired"].id)).due_date == created["expired"].due_date
+
+
+async def test_deactivate_list_reports_inactive_links(links):
+    _, created = links
+    prefix = get_settings().short_url_prefix
+    short_urls = [
+        prefix + created["soon"].link,
+        prefix + created["inactive"].link,
+        prefix + "zzzzzzzzz",
+        "https://example.com/abc",
+    ]
+
+    results = await services.deactivate_links(BulkUpdateLinks(short_urls=short_urls))
+
+    assert [result.status for result in results] == ["deactivated", "inactive", "not_found", "invalid"]
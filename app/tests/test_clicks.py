@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+import app.src.repository as URLRepository
+from app.src.clicks import ClickBuffer
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeWriter:
+    """write_clicks с записью пачек: может падать или ждать `release`"""
+
+    def __init__(self, fail=False, block=False):
+        self.fail = fail
+        self.batches = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        if not block:
+            self.release.set()
+
+    async def __call__(self, batch):
+        self.started.set()
+        await self.release.wait()
+        if self.fail:
+            raise ConnectionError("database is down")
+        self.batches.append([url_id for url_id, _ in batch])
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    def install(fail=False, block=False):
+        fake = FakeWriter(fail, block)
+        monkeypatch.setattr(URLRepository, "write_clicks", fake)
+        return fake
+
+    return install
+
+
+async def test_full_batch_wakes_flush(writer):
+    fake = writer()
+    buffer = ClickBuffer(batch_size=3, flush_interval=60, max_lost=10)
+    await buffer.start()
+
+    for url_id in range(3):
+        await buffer.record(url_id)
+    for _ in range(10):
+        await asyncio.sleep(0)
+    await buffer.stop()
+
+    assert fake.batches == [[0, 1, 2]]
+    assert buffer.stats()["flushes"] == 1
+
+
+async def test_interval_flushes_partial_batch(writer):
+    fake = writer()
+    buffer = ClickBuffer(batch_size=100, flush_interval=0.01, max_lost=100)
+    await buffer.start()
+
+    await buffer.record(1)
+    await asyncio.wait_for(fake.started.wait(), timeout=1)
+    await asyncio.sleep(0)
+    await buffer.stop()
+
+    assert fake.batches == [[1]]
+
+
+async def test_overflow_drops_oldest(writer):
+    writer()
+    buffer = ClickBuffer(batch_size=3, flush_interval=60, max_lost=3)
+
+    for url_id in range(5):
+        await buffer.record(url_id)
+
+    assert [url_id for url_id, _ in buffer._clicks] == [2, 3, 4]
+    assert buffer.stats()["dropped"] == 2
+
+
+async def test_failed_batch_is_requeued(writer):
+    fake = writer(fail=True)
+    buffer = ClickBuffer(batch_size=10, flush_interval=60, max_lost=10)
+    for url_id in range(3):
+        await buffer.record(url_id)
+
+    assert await buffer.flush() == 0
+    fake.fail = False
+    assert await buffer.flush() == 3
+
+    assert fake.batches == [[0, 1, 2]]
+    assert buffer.stats()["dropped"] == 0
+
+
+async def test_batch_in_flight_counts_against_max_lost(writer):
+    fake = writer(fail=True, block=True)
+    buffer = ClickBuffer(batch_size=10, flush_interval=60, max_lost=4)
+    for url_id in range(3):
+        await buffer.record(url_id)
+
+    flush = asyncio.create_task(buffer.flush())
+    await fake.started.wait()
+    for url_id in range(3, 6):
+        await buffer.record(url_id)
+    assert buffer.stats()["pending"] == 4
+
+    fake.release.set()
+    await flush
+
+    # Пачку, которая записывается, отбросить нельзя - отбрасываются следующие за ней
+    assert [url_id for url_id, _ in buffer._clicks] == [0, 1, 2, 5]
+    assert buffer.stats()["pending"] == 4
+    assert buffer.stats()["dropped"] == 2
@@ -0,0 +1,59 @@
+import pytest
+
+from app.src.codegen import (
+    ALPHABET,
+    CODE_LENGTH,
+    CODE_SPACE,
+    CodeScrambler,
+    SequenceCodeGenerator,
+    decode_base62,
+    encode_base62,
+)
+from app.src.config.settings import get_settings
+
+
+@pytest.mark.parametrize("number", [0, 1, 61, 62, 123_456_789, CODE_SPACE - 1])
+def test_base62_round_trip(number):
+    code = encode_base62(number)
+
+    assert len(code) == CODE_LENGTH
+    assert set(code) <= set(ALPHABET)
+    assert decode_base62(code) == number
+
+
+def test_scrambler_is_a_bijection_on_code_space():
+    scrambler = CodeScrambler("secret")
+    numbers = [*range(50_000), *range(CODE_SPACE - 50_000, CODE_SPACE)]
+
+    scrambled = [scrambler.scramble(number) for number in numbers]
+
+    assert all(0 <= value < CODE_SPACE for value in scrambled)
+    assert len(set(scrambled)) == len(numbers)
+    assert [scrambler.unscramble(value) for value in scrambled] == numbers
+
+
+def test_scrambler_depends_on_secret():
+    first, second = CodeScrambler("first"), CodeScrambler("second")
+
+    assert [first.scramble(n) for n in range(100)] != [second.scramble(n) for n in range(100)]
+    # Соседние ID не дают соседних кодов
+    assert abs(first.scramble(1) - first.scramble(2)) > 1
+
+
+@pytest.mark.anyio
+async def test_sequence_generator_uses_migrated_sequence(db):
+    block_size = get_settings().code_block_size
+    generator = SequenceCodeGenerator(block_size=block_size, secret="test")
+    await generator.prepare()
+
+    codes = await generator.allocate(2 * block_size + 5)
+
+    assert len(set(codes)) == len(codes)
+
+
+@pytest.mark.anyio
+async def test_sequence_generator_rejects_other_block_size(db):
+    generator = SequenceCodeGenerator(block_size=get_settings().code_block_size + 1, secret="test")
+
+    with pytest.raises(RuntimeError, match="app.migrate"):
+        await generator.prepare()
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from fastapi import Request
+from tortoise.transactions import in_transaction
+
+import app.src.repository as URLRepository
+from app.src import services
+from app.src.httpcache import conditional_response
+
+pytestmark = pytest.mark.anyio
+
+LAST_MODIFIED = datetime(2026, 10, 1, 12, 30, 15, 500000, tzinfo=timezone.utc)
+
+
+def make_request(query: str = "page=1", **headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/private/all_links",
+            "query_string": query.encode(),
+            "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+        }
+    )
+
+
+class Renderer:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        return b'{"links":[]}'
+
+
+async def test_matching_etag_skips_render():
+    render = Renderer()
+    first = await conditional_response(make_request(), "v1", render, last_modified=LAST_MODIFIED)
+
+    second = await conditional_response(
+        make_request(if_none_match=first.headers["etag"]), "v1", render
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert render.calls == 1
+
+
+async def test_etag_depends_on_version_and_query():
+    render = Renderer()
+    tag = (await conditional_response(make_request(), "v1", render)).headers["etag"]
+
+    changed = await conditional_response(make_request(if_none_match=tag), "v2", render)
+    other_page = await conditional_response(make_request("page=2", if_none_match=tag), "v1", render)
+
+    assert changed.status_code == 200
+    assert other_page.status_code == 200
+    assert other_page.headers["etag"] != tag
+
+
+async def test_if_modified_since():
+    render = Renderer()
+    response = await conditional_response(make_request(), "v1", render, last_modified=LAST_MODIFIED)
+    last_modified = response.headers["last-modified"]
+
+    not_modified = await conditional_response(
+        make_request(if_modified_since=last_modified), "v1", render, last_modified=LAST_MODIFIED
+    )
+    modified = await conditional_response(
+        make_request(if_modified_since=format_datetime(LAST_MODIFIED - timedelta(seconds=1), usegmt=True)),
+        "v1",
+        render,
+        last_modified=LAST_MODIFIED,
+    )
+
+    assert last_modified == "Thu, 01 Oct 2026 12:30:15 GMT"
+    assert not_modified.status_code == 304
+    assert modified.status_code == 200
+
+
+class Rollback(Exception):
+    pass
+
+
+async def test_update_bumps_updated_at(db):
+    _, rows = await db.execute_query("SELECT id FROM urlinfo ORDER BY id LIMIT 1")
+    if not rows:
+        pytest.skip("нет ссылок(python -m app.bench seed)")
+    url_id = rows[0]["id"]
+    select = "SELECT updated_at FROM urlinfo WHERE id = $1"
+
+    with pytest.raises(Rollback):
+        async with in_transaction("default") as conn:
+            _, before = await conn.execute_query(select, [url_id])
+            await conn.execute_query("UPDATE urlinfo SET is_active = is_active WHERE id = $1", [url_id])
+            _, unchanged = await conn.execute_query(select, [url_id])
+            await conn.execute_query(
+                "UPDATE urlinfo SET due_date = due_date + interval '1 minute' WHERE id = $1", [url_id]
+            )
+            _, changed = await conn.execute_query(select, [url_id])
+            raise Rollback
+
+    assert unchanged[0]["updated_at"] == before[0]["updated_at"]
+    assert changed[0]["updated_at"] > before[0]["updated_at"]
+
+
+async def test_links_version_expires_with_minute(monkeypatch):
+    minute = datetime(2026, 10, 1, 12, 30, tzinfo=timezone.utc)
+
+    async def get_links_version():
+        return 42, LAST_MODIFIED
+
+    monkeypatch.setattr(URLRepository, "get_links_version", get_links_version)
+    monkeypatch.setattr(services, "_version_minute", lambda: minute)
+    version, last_modified = await services.get_links_version()
+    monkeypatch.setattr(services, "_version_minute", lambda: minute + timedelta(minutes=1))
+    next_version, next_last_modified = await services.get_links_version()
+
+    # Изменение, зафиксированное с более ранним updated_at, видно не позже следующей минуты
+    assert version != next_version
+    assert last_modified == LAST_MODIFIED
+    assert next_last_modified == minute + timedelta(minutes=1)
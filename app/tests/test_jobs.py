@@ -0,0 +1,73 @@
+import pytest
+
+from app.src import jobs
+from app.src.jobs import BackgroundJobs
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeJob:
+    """start/stop/run фоновой задачи с записью вызовов"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    async def start(self):
+        self.calls.append("start")
+        if self.fail:
+            raise ConnectionError("database is down")
+
+    async def stop(self):
+        self.calls.append("stop")
+
+    async def run(self):
+        self.calls.append("run")
+        if self.fail:
+            raise ConnectionError("database is down")
+
+
+@pytest.fixture
+def fake_jobs(monkeypatch):
+    def install(index_fails=False, retention_fails=False):
+        fakes = {
+            "expiry_engine": FakeJob(),
+            "redirect_index": FakeJob(fail=index_fails),
+            "retention_job": FakeJob(fail=retention_fails),
+        }
+        for name, fake in fakes.items():
+            monkeypatch.setattr(jobs, name, fake)
+        return fakes
+
+    return install
+
+
+@pytest.fixture
+async def background(tmp_path):
+    background = BackgroundJobs()
+    background.configure(lock_file=str(tmp_path / "jobs.lock"), election_interval=60)
+    yield background
+    await background.stop()
+
+
+async def test_retention_failure_keeps_jobs_running(fake_jobs, background):
+    fakes = fake_jobs(retention_fails=True)
+
+    assert await background._try_start()
+
+    assert background.is_elected
+    assert background.lock.held
+    assert fakes["expiry_engine"].calls == ["start"]
+    assert fakes["retention_job"].calls == ["run"]
+
+
+async def test_failed_start_releases_lock(fake_jobs, background):
+    fakes = fake_jobs(index_fails=True)
+
+    with pytest.raises(ConnectionError):
+        await background._try_start()
+
+    assert not background.is_elected
+    assert not background.lock.held
+    assert fakes["expiry_engine"].calls == ["start", "stop"]
+    assert fakes["retention_job"].calls == []
@@ -0,0 +1,115 @@
+import asyncio
+import secrets
+
+import pytest
+
+import app.src.repository as URLRepository
+from app.src.codegen import ALPHABET, CODE_LENGTH
+from app.src.linkfilter import BloomFilter, LinkFilter, is_token_format
+
+pytestmark = pytest.mark.anyio
+
+
+def random_token() -> str:
+    return "".join(secrets.choice(ALPHABET) for _ in range(CODE_LENGTH))
+
+
+class FakeLinks:
+    """Таблица ссылок: видны только закоммиченные строки"""
+
+    def __init__(self):
+        self.committed: dict[int, str] = {}
+        self.queries = 0
+
+    def commit(self, link_id: int) -> str:
+        token = self.committed[link_id] = random_token()
+        return token
+
+    async def get_link_tokens(self, after_id=0, only_active=False, replica=False):
+        self.queries += 1
+        await asyncio.sleep(0.001)
+        return [(link_id, token) for link_id, token in self.committed.items() if link_id > after_id]
+
+
+@pytest.fixture
+def links(monkeypatch):
+    links = FakeLinks()
+    monkeypatch.setattr(URLRepository, "get_link_tokens", links.get_link_tokens)
+    return links
+
+
+@pytest.fixture
+async def link_filter(links):
+    for link_id in range(1, 4):
+        links.commit(link_id)
+    link_filter = LinkFilter(capacity=1000, fp_rate=0.01, sync_interval=0)
+    await link_filter.rebuild()
+    return link_filter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=10_000, fp_rate=0.01)
+    tokens = [random_token() for _ in range(10_000)]
+    for token in tokens:
+        bloom.add(token)
+
+    assert all(token in bloom for token in tokens)
+    false_positives = sum(random_token() in bloom for _ in range(10_000))
+    assert false_positives < 10_000 * 0.03
+    assert bloom.fp_rate == pytest.approx(0.01, rel=0.5)
+
+
+def test_token_format():
+    assert is_token_format("Abc123xyZ")
+    assert not is_token_format("Abc123xy")
+    assert not is_token_format("Abc-23xyZ")
+    assert not is_token_format("Абв123xyZ")
+
+
+async def test_existing_links_pass(links, link_filter):
+    assert all(link_filter.might_exist(token) for token in links.committed.values())
+    assert not link_filter.might_exist(random_token())
+
+
+async def test_miss_does_not_query_database(links, link_filter):
+    queries = links.queries
+
+    assert not any(link_filter.might_exist(random_token()) for _ in range(20))
+    assert links.queries == queries
+
+
+async def test_link_created_by_other_worker_passes_after_sync(links, link_filter):
+    token = links.commit(4)
+    assert not link_filter.might_exist(token)
+
+    await link_filter.sync()
+
+    assert link_filter.might_exist(token)
+
+
+async def test_out_of_order_commit_is_not_missed(links, link_filter):
+    # ID 4 и 5 выданы одновременно, транзакция с ID 5 закоммичена раньше
+    later = links.commit(5)
+    await link_filter.sync()
+    assert link_filter.might_exist(later)
+
+    earlier = links.commit(4)
+    await link_filter.sync()
+
+    assert link_filter.might_exist(earlier)
+
+
+async def test_background_sync(links):
+    link_filter = LinkFilter(capacity=1000, fp_rate=0.01, sync_interval=0.01)
+    await link_filter.start()
+    try:
+        token = links.commit(1)
+        for _ in range(100):
+            if link_filter.might_exist(token):
+                break
+            await asyncio.sleep(0.01)
+
+        assert link_filter.might_exist(token)
+        assert link_filter.stats()["syncs"] > 0
+    finally:
+        await link_filter.stop()
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.src.repository as URLRepository
+from app.src.cache import redirect_cache
+from app.src.linkloader import LinkLoader
+
+pytestmark = pytest.mark.anyio
+
+DUE_DATE = datetime.now(timezone.utc) + timedelta(days=1)
+
+
+class FakeLinks:
+    """get_orig_links с записью запросов: есть только коды из `tokens`"""
+
+    def __init__(self, tokens, fail=False):
+        self.tokens = tokens
+        self.fail = fail
+        self.calls = []
+
+    async def __call__(self, tokens):
+        self.calls.append(list(tokens))
+        await asyncio.sleep(0.001)
+        if self.fail:
+            raise ConnectionError("database is down")
+        return {
+            token: (i, f"https://example.com/{token}", DUE_DATE)
+            for i, token in enumerate(tokens)
+            if token in self.tokens
+        }
+
+
+@pytest.fixture
+def fake_links(monkeypatch):
+    def install(tokens, fail=False):
+        fake = FakeLinks(tokens, fail)
+        monkeypatch.setattr(URLRepository, "get_orig_links", fake)
+        return fake
+
+    return install
+
+
+async def test_same_token_shares_one_query(fake_links):
+    fake = fake_links({"aaa"})
+    loader = LinkLoader(window=0.001)
+
+    results = await asyncio.gather(*(loader.load("aaa") for _ in range(10)))
+
+    assert fake.calls == [["aaa"]]
+    assert {link.original_link for link, _ in results} == {"https://example.com/aaa"}
+    assert loader.stats()["shared"] == 9
+
+
+async def test_tokens_batched_within_window(fake_links):
+    fake = fake_links({"aaa", "bbb"})
+    loader = LinkLoader(window=0.001)
+
+    (a, _), (b, _), (missing, _) = await asyncio.gather(
+        loader.load("aaa"), loader.load("bbb"), loader.load("zzz")
+    )
+
+    assert fake.calls == [["aaa", "bbb", "zzz"]]
+    assert a.original_link == "https://example.com/aaa"
+    assert b.original_link == "https://example.com/bbb"
+    assert missing is None
+    assert loader.stats() == {
+        "lookups": 3,
+        "shared": 0,
+        "queries": 1,
+        "queries_saved": 2,
+        "max_batch": 3,
+    }
+
+
+async def test_full_batch_sent_before_window(fake_links):
+    fake = fake_links(set())
+    loader = LinkLoader(window=60, batch_size=2)
+
+    await asyncio.wait_for(asyncio.gather(loader.load("aaa"), loader.load("bbb")), timeout=1)
+
+    assert fake.calls == [["aaa", "bbb"]]
+
+
+async def test_epoch_captured_before_query(fake_links):
+    fake = fake_links({"aaa"})
+    loader = LinkLoader(window=0.001)
+    redirect_cache.configure(max_size=10, ttl=60)
+    epoch = redirect_cache.epoch
+
+    load = asyncio.create_task(loader.load("aaa"))
+    while not fake.calls:
+        await asyncio.sleep(0)
+    # Деактивация во время запроса: ответ запроса устарел для кэша
+    redirect_cache.invalidate("aaa")
+    link, loaded_epoch = await load
+    redirect_cache.put("aaa", link, epoch=loaded_epoch)
+
+    assert loaded_epoch == epoch
+    assert redirect_cache.get("aaa") is None
+    redirect_cache.configure(max_size=0, ttl=60)
+
+
+async def test_error_reaches_every_waiter_and_is_not_cached(fake_links):
+    fake = fake_links({"aaa"}, fail=True)
+    loader = LinkLoader(window=0.001)
+
+    results = await asyncio.gather(loader.load("aaa"), loader.load("aaa"), return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+    fake.fail = False
+    link, _ = await loader.load("aaa")
+    assert link is not None
+    assert len(fake.calls) == 2
+
+
+async def test_cancelled_caller_does_not_cancel_lookup(fake_links):
+    fake_links({"aaa"})
+    loader = LinkLoader(window=0.001)
+
+    first = asyncio.create_task(loader.load("aaa"))
+    second = asyncio.create_task(loader.load("aaa"))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    link, _ = await second
+    assert link.original_link == "https://example.com/aaa"
+    assert first.cancelled()
+
+
+async def test_cancelled_lookup_releases_waiters(monkeypatch):
+    started = asyncio.Event()
+
+    async def get_orig_links(tokens):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(URLRepository, "get_orig_links", get_orig_links)
+    loader = LinkLoader(window=0.001)
+
+    load = asyncio.create_task(loader.load("aaa"))
+    await started.wait()
+    for task in loader._tasks:
+        task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(load, timeout=1)
+    assert loader._in_flight == {}
@@ -0,0 +1,27 @@
+import pytest
+
+from app.src import metrics
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reset_query_is_not_counted(db):
+    stats = [0, 0.0]
+    token = metrics._request_db_stats.set(stats)
+    try:
+        # При возврате в пул asyncpg выполняет запрос сброса соединения
+        async with db.acquire_connection() as conn:
+            await conn.execute("SELECT 1")
+    finally:
+        metrics._request_db_stats.reset(token)
+
+    assert stats[0] == 1
+
+
+def test_histogram_total_sums_all_labels():
+    histogram = metrics.Histogram("test_total", "test", ("route",), buckets=metrics.COUNT_BUCKETS)
+    histogram.observe(2, "/a")
+    histogram.observe(3, "/b")
+    histogram.observe(1, "/a")
+
+    assert histogram.total() == 6
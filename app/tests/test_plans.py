@@ -0,0 +1,42 @@
+import pytest
+
+from app.bench import plans
+
+pytestmark = pytest.mark.anyio
+
+# Индексы, которыми должны читаться горячие запросы
+EXPECTED_INDEXES = {
+    "redirect_lookup": "urlinfo_link_key",
+    "deactivate_lookup": "urlinfo_link_key",
+    "expiring_links": "urlinfo_active_due_idx",
+    "deactivate_expired": "urlinfo_link_key",
+    "reuse_lookup": "urlinfo_active_url_hash_idx",
+    # Индекс модели URLClickBucket по bucket_start
+    "stats_buckets": "idx_urlclickbuc_bucket",
+    "links_version": "urlinfo_updated_at_idx",
+}
+
+
+@pytest.fixture
+async def hot_plans(db):
+    _, rows = await db.execute_query("SELECT EXISTS (SELECT 1 FROM urlinfo WHERE is_active) AS seeded")
+    if not rows[0]["seeded"]:
+        pytest.skip("нет активных ссылок(python -m app.bench seed)")
+    return await plans.explain_hot_queries()
+
+
+async def test_hot_queries_do_not_scan_tables(hot_plans):
+    seq_scans = {
+        name: [target for node_type, target in nodes if node_type == "Seq Scan"]
+        for name, nodes in hot_plans.items()
+    }
+
+    assert {name: targets for name, targets in seq_scans.items() if targets} == {}
+    assert await plans.check() == []
+
+
+@pytest.mark.parametrize("name, index", EXPECTED_INDEXES.items())
+async def test_hot_query_uses_index(hot_plans, name, index):
+    targets = [target for _, target in hot_plans[name]]
+
+    assert any(target.startswith(index) for target in targets), targets
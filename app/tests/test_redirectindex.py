@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.src.repository as URLRepository
+from app.src import services
+from app.src.cache import CachedLink, redirect_cache
+from app.src.redirectindex import CHANGES_OVERLAP, RedirectIndex
+
+pytestmark = pytest.mark.anyio
+
+TOKEN = "Abc123xyZ"
+
+
+@pytest.fixture
+async def shared_index(tmp_path, monkeypatch):
+    due_date = datetime.now(timezone.utc) + timedelta(days=1)
+
+    async def get_active_links(after_id=0):
+        return [(1, TOKEN, "https://example.com", due_date)] if after_id < 1 else []
+
+    async def get_inactive_tokens(after_id, until_id):
+        return []
+
+    async def get_last_update():
+        return None
+
+    async def get_deactivated_tokens(since):
+        return []
+
+    monkeypatch.setattr(URLRepository, "get_active_links", get_active_links)
+    monkeypatch.setattr(URLRepository, "get_inactive_tokens", get_inactive_tokens)
+    monkeypatch.setattr(URLRepository, "get_last_update", get_last_update)
+    monkeypatch.setattr(URLRepository, "get_deactivated_tokens", get_deactivated_tokens)
+    index = RedirectIndex(path=str(tmp_path / "redirects.idx"), enabled=True)
+    await index.rebuild()
+    monkeypatch.setattr(services, "redirect_index", index)
+    redirect_cache.configure(max_size=10, ttl=60)
+    yield index, due_date
+    redirect_cache.configure(max_size=0, ttl=60)
+
+
+async def test_cached_link_deactivated_in_other_worker(shared_index):
+    index, due_date = shared_index
+    redirect_cache.put(TOKEN, CachedLink(1, "https://example.com", True, due_date))
+
+    other_worker = RedirectIndex(path=index.path, enabled=True)
+    other_worker.deactivate(TOKEN)
+
+    assert index.inactive(TOKEN)
+    assert await services.get_original_url(TOKEN) is None
+    assert redirect_cache.get(TOKEN) is None
+
+
+async def test_unknown_token_is_not_inactive(shared_index):
+    index, _ = shared_index
+
+    assert not index.inactive("Zzz999zzZ")
+    assert not index.inactive(TOKEN)
+
+
+async def test_sync_applies_deactivation_made_elsewhere(shared_index, monkeypatch):
+    index, _ = shared_index
+    updated_at = datetime.now(timezone.utc)
+    calls = []
+
+    async def get_deactivated_tokens(since):
+        calls.append(since)
+        return [(TOKEN, updated_at)]
+
+    monkeypatch.setattr(URLRepository, "get_deactivated_tokens", get_deactivated_tokens)
+    assert await index.sync()
+    assert await index.sync()
+
+    assert index.inactive(TOKEN)
+    # Деактивации перечитываются с запасом после последней увиденной
+    assert calls[1] == updated_at - CHANGES_OVERLAP
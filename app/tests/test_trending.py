@@ -0,0 +1,102 @@
+import random
+from collections import Counter
+
+from app.src.trending import SlidingTopK, SpaceSaving, TrendingLinks
+
+
+def test_exact_while_keys_fit():
+    summary = SpaceSaving(capacity=3)
+    for key in "abacab":
+        summary.add(key)
+
+    assert summary.counts == {"a": 3, "b": 2, "c": 1}
+    assert summary.errors == {"a": 0, "b": 0, "c": 0}
+    assert summary.total == 6
+
+
+def test_error_bounds():
+    rng = random.Random(42)
+    capacity = 50
+    # Несколько частых ключей на фоне длинного хвоста
+    stream = [
+        f"hot{rng.randrange(5)}" if rng.random() < 0.3 else f"k{rng.randrange(5000)}"
+        for _ in range(20000)
+    ]
+    summary = SpaceSaving(capacity)
+    for key in stream:
+        summary.add(key)
+    true = Counter(stream)
+    bound = len(stream) / capacity
+
+    assert len(summary.counts) == capacity
+    for key, count in summary.counts.items():
+        assert count >= true[key]
+        assert count - summary.errors[key] <= true[key]
+        assert count - true[key] <= bound
+    assert [key for key, count in true.items() if count > bound and key not in summary.counts] == []
+
+
+def test_heap_stays_bounded():
+    summary = SpaceSaving(capacity=10)
+    for i in range(10000):
+        summary.add(f"k{i % 7}")
+
+    assert len(summary._heap) <= 4 * summary.capacity + 1
+
+
+def test_window_expires_old_slots():
+    window = SlidingTopK(window=60, slots=6, capacity=10)
+    for _ in range(5):
+        window.add("old", now=0)
+    window.add("new", now=30)
+
+    assert window.top(10, now=30) == (6, 0, [("old", 5, 0), ("new", 1, 0)])
+    assert window.top(10, now=75) == (1, 0, [("new", 1, 0)])
+
+
+def test_window_skips_empty_slots():
+    window = SlidingTopK(window=60, slots=6, capacity=10)
+    window.add("a", now=0)
+
+    assert window.top(10, now=10_000) == (0, 0, [])
+
+
+def test_merged_estimate_is_upper_bound_after_eviction():
+    window = SlidingTopK(window=60, slots=6, capacity=2)
+    # В первом интервале "a" вытеснен, во втором остаётся среди счётчиков
+    for key in "aabbbccc":
+        window.add(key, now=0)
+    for key in "aab":
+        window.add(key, now=10)
+    true = Counter("aabbbccc" + "aab")
+
+    total, error_bound, top = window.top(10, now=10)
+
+    assert "a" not in window._closed[0].counts
+    assert total == 11
+    assert error_bound == window._closed[0].floor + window._current.floor
+    estimates = {key: (count, error) for key, count, error in top}
+    assert set(estimates) == set(true)
+    for key, (count, error) in estimates.items():
+        assert count - error <= true[key] <= count
+        assert error <= error_bound
+
+
+def test_trending_links_caches_and_can_be_disabled(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.src.trending.time.time", lambda: now[0])
+    trending = TrendingLinks(capacity=10, refresh=1.0)
+    trending.record("abc")
+    first = trending.top("hour", 5)
+
+    trending.record("abc")
+    cached = trending.top("hour", 5)
+    now[0] += 1.5
+    refreshed = trending.top("hour", 5)
+
+    assert first == cached == {"total": 1, "error_bound": 0, "links": [("abc", 1, 0)]}
+    assert refreshed["links"] == [("abc", 2, 0)]
+
+    trending.configure(capacity=0, refresh=1.0)
+    trending.record("abc")
+    assert trending.top("day", 5)["total"] == 0